@@ -0,0 +1,373 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+PROVIDERS = ("groq", "openai")
+DEFAULT_TIMEOUT = 60.0
+# Hedge delay used until a backend has MIN_SAMPLES latencies of the kind being hedged
+DEFAULT_HEDGE_AFTER = 5.0
+HEDGE_PERCENTILE = 0.95
+MIN_SAMPLES = 20
+# Latencies kept per backend and kind ("complete" or "first_token")
+LATENCY_WINDOW = 200
+# Requests for one completion in flight at once: the current one and a single hedge
+MAX_IN_FLIGHT = 2
+_FIELDS = ("name", "model", "provider", "base_url", "api_key_env", "api_key", "timeout", "hedge_after")
+
+
+class Backend:
+    """
+    One OpenAI-compatible chat completions endpoint and the model asked there.
+    provider "groq" uses the groq SDK (Groq's API, or anything serving its /openai/v1 paths);
+    "openai" uses the openai package, for llama.cpp, Ollama, vLLM and the like.
+    `timeout` bounds one request; `hedge_after` fixes the hedge delay instead of the p95.
+    """
+
+    def __init__(self, name: str, model: str, provider: str = "groq", base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 hedge_after: Optional[float] = None):
+        self.name = name
+        self.model = model
+        self.provider = provider
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self._client = None
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def client(self):
+        """The SDK client, created on first use and shared by every thread. Raises ValueError if its package is missing."""
+        with self._lock:
+            if self._client is None:
+                if self.provider == "groq":
+                    from groq import Groq as Client
+                else:
+                    try:
+                        from openai import OpenAI as Client
+                    except ImportError:
+                        raise ValueError(f"backend {self.name} needs the openai package (pip install openai)") from None
+                # Retries are left to the router's other backends and to the scheduler
+                self._client = Client(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                      timeout=self.timeout)
+            return self._client
+
+    @property
+    def account(self) -> str:
+        """Whose rate limits apply: backends with the same endpoint and API key share them."""
+        return f"{self.base_url or self.provider}|{self.api_key}"
+
+    def record_latency(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def latencies(self, kind: str) -> List[float]:
+        with self._lock:
+            return list(self._latencies.get(kind, ()))
+
+    def hedge_delay(self, kind: str) -> float:
+        """Seconds to wait for this backend before hedging: its recent p95 once it has enough samples."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        samples = sorted(self.latencies(kind))
+        if len(samples) < MIN_SAMPLES:
+            return min(DEFAULT_HEDGE_AFTER, self.timeout)
+        return samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))]
+
+
+def load_backends(path: str) -> List[Backend]:
+    """
+    Backends from a JSON list of objects, in order of preference. Each needs "name" and
+    "model"; "provider", "base_url", "api_key_env" (an environment variable holding the
+    key), "api_key", "timeout" and "hedge_after" are optional.
+    Raises ValueError for an unreadable or invalid file and for a missing key.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read backends file {path}: {e}") from None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: expected a non-empty list of backends")
+
+    backends: List[Backend] = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("model"):
+            raise ValueError(f"{path}: backend {i + 1} needs a name and a model")
+        name = entry["name"]
+        unknown = set(entry).difference(_FIELDS)
+        if unknown:
+            raise ValueError(f"backend {name}: unknown fields {', '.join(sorted(unknown))}")
+        provider = entry.get("provider", "groq")
+        if provider not in PROVIDERS:
+            raise ValueError(f"backend {name}: provider must be one of {', '.join(PROVIDERS)}")
+        if any(backend.name == name for backend in backends):
+            raise ValueError(f"backend {name} is listed twice")
+        try:
+            timeout = float(entry.get("timeout", DEFAULT_TIMEOUT))
+            hedge_after = None if entry.get("hedge_after") is None else float(entry["hedge_after"])
+        except (TypeError, ValueError):
+            raise ValueError(f"backend {name}: timeout and hedge_after must be numbers of seconds") from None
+        if timeout <= 0:
+            raise ValueError(f"backend {name}: timeout must be positive")
+
+        key_env = entry.get("api_key_env", "GROQ_API_KEY" if provider == "groq" else None)
+        api_key = entry.get("api_key") or (os.getenv(key_env) if key_env else None)
+        if api_key is None:
+            if key_env:
+                raise ValueError(f"backend {name}: {key_env} environment variable not set.")
+            api_key = "unused"  # local servers ignore the key, but the SDK wants one
+        backends.append(Backend(name, entry["model"], provider, entry.get("base_url"), api_key,
+                                timeout, hedge_after))
+    return backends
+
+
+def api_errors() -> Tuple[Type[BaseException], ...]:
+    """What a completion that no backend answered can raise: the SDKs' API errors or TimeoutError."""
+    from groq import APIError
+    errors: Tuple[Type[BaseException], ...] = (APIError, TimeoutError)
+    try:
+        from openai import APIError as OpenAIError
+    except ImportError:
+        return errors
+    return errors + (OpenAIError,)
+
+
+class Outcome(NamedTuple):
+    backend: str  # the backend whose answer was used
+    attempts: int  # requests sent, hedges and fallbacks included
+    hedged: bool  # a hedge request was sent because the first one was slow
+    failed: Tuple[str, ...]  # backends that errored or timed out, in order
+
+
+class _Admission:
+    """One admitted request's hold on the rate limits, given back exactly once."""
+
+    def __init__(self, release: Optional[Callable[[], None]]):
+        self._release = release
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def release(self) -> None:
+        with self._lock:
+            release, self._release = self._release, None
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if release is not None:
+            release()
+
+    def release_after(self, seconds: float) -> None:
+        """Give the admission back in `seconds` unless it has been given back by then."""
+        if seconds <= 0:
+            self.release()
+            return
+        timer = threading.Timer(seconds, self.release)
+        timer.daemon = True
+        with self._lock:
+            if self._release is None:
+                return
+            self._timer = timer
+        timer.start()
+
+
+class HedgedRouter:
+    """
+    Sends each completion to an ordered list of backends. The first backend gets the
+    request; if it has not answered within its p95 latency, the next one gets it too and
+    the first answer wins. A backend that fails or exceeds its timeout hands over to the
+    next right away. At most MAX_IN_FLIGHT requests run for one completion, so hedging
+    costs about 5% more requests, and a completion takes at most the sum of the timeouts.
+    Losing requests are abandoned: `discard` releases a result that arrives late, and an
+    attempt should stop early once its `cancelled` event is set.
+    With `admit`, every request (hedges and fallbacks included) is only sent once its
+    backend's rate limits allow it, and the hedge is skipped when they do not right away.
+    The router gives each admission back through `release`; an abandoned request keeps
+    its admission until it ends, but no longer than its backend's timeout.
+    Latencies are kept in `state_path` between runs so the p95 is known from the start.
+    """
+
+    def __init__(self, backends: Sequence[Backend], state_path: Optional[str] = None):
+        self.backends = list(backends)
+        self.state_path = state_path
+        self.wins: Dict[str, int] = {}
+        self.hedges = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        for backend in self.backends:
+            saved = state.get(backend.name)
+            if not isinstance(saved, dict) or saved.get("model") != backend.model:
+                continue
+            for kind, samples in (saved.get("latencies") or {}).items():
+                for seconds in samples[-LATENCY_WINDOW:]:
+                    backend.record_latency(kind, float(seconds))
+
+    def save(self) -> None:
+        """Write the latency samples to `state_path` (atomically). Raises OSError."""
+        if not self.state_path:
+            return
+        state = {backend.name: {"model": backend.model,
+                                "latencies": {kind: [round(seconds, 4) for seconds in backend.latencies(kind)]
+                                              for kind in ("complete", "first_token")}}
+                 for backend in self.backends}
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def warm(self) -> None:
+        """Create every backend's client now rather than during the first request."""
+        for backend in self.backends:
+            backend.client()
+
+    def _start(self, attempt: Callable[[Backend, threading.Event], T], backend: Backend,
+               cancelled: threading.Event, admission: _Admission) -> Future:
+        # A daemon thread per request: an abandoned one may block until its timeout,
+        # and must neither hold up a pool shared with live requests nor process exit
+        future: Future = Future()
+
+        def run() -> None:
+            try:
+                result = attempt(backend, cancelled)
+            except BaseException as e:
+                admission.release()
+                future.set_exception(e)
+                return
+            future.set_result(result)
+
+        threading.Thread(target=run, name=f"llm-{backend.name}", daemon=True).start()
+        return future
+
+    def run(self, attempt: Callable[[Backend, threading.Event], T], kind: str = "complete",
+            discard: Optional[Callable[[T], None]] = None,
+            admit: Optional[Callable[[Backend, bool], bool]] = None,
+            release: Optional[Callable[[], None]] = None, keep_winner: bool = False) -> Tuple[T, Outcome]:
+        """
+        Call `attempt(backend, cancelled)` on backends as described above and return the
+        first result with its Outcome. `kind` names the latency being hedged on: the whole
+        completion, or the first token of a stream. Raises the first backend's error
+        (TimeoutError for a timeout) when none of them answers.
+        `admit(backend, wait)` is called before each request: with wait=True (the first
+        request and fallbacks) it blocks until the request may be sent; with wait=False (a
+        hedge) it returns False at once if it may not. `release()` gives one admission back:
+        the router calls it once for every admitted attempt, when the attempt raises, when
+        it is abandoned and ends or reaches its backend's timeout (whichever comes first),
+        and for the winner when `run` returns. With keep_winner=True the winner's admission
+        is left to the caller instead (e.g. a stream that holds it until it is closed).
+        """
+        queue = list(self.backends)
+        pending: Dict[Future, Tuple[Backend, float, threading.Event, _Admission]] = {}
+        errors: List[Tuple[Backend, BaseException]] = []
+        hedged = False
+        hedge_refused = False
+        attempts = 0
+
+        def launch(wait: bool = True) -> bool:
+            nonlocal attempts
+            if admit is not None and not admit(queue[0], wait):
+                return False
+            backend = queue.pop(0)
+            cancelled = threading.Event()
+            admission = _Admission(release if admit is not None else None)
+            # Timed from admission, so waiting for the rate limits never looks like a slow backend
+            pending[self._start(attempt, backend, cancelled, admission)] = (backend, time.monotonic(), cancelled,
+                                                                            admission)
+            attempts += 1
+            return True
+
+        def abandon(future: Future, backend: Backend, started: float, cancelled: threading.Event,
+                    admission: _Admission, timed_out: bool = False) -> None:
+            cancelled.set()
+            # A hung request must not hold the rate limits after its timeout
+            admission.release_after(started + backend.timeout - time.monotonic())
+
+            def finished(done: Future) -> None:
+                admission.release()
+                if done.exception() is not None:
+                    return
+                if not timed_out:
+                    # A late answer still tells how slow the backend really is
+                    backend.record_latency(kind, time.monotonic() - started)
+                if discard is not None:
+                    discard(done.result())
+
+            future.add_done_callback(finished)
+
+        while True:
+            if not pending:
+                if not queue:
+                    raise min(errors, key=lambda error: self.backends.index(error[0]))[1]
+                if errors:
+                    with self._lock:
+                        self.fallbacks += 1
+                launch()
+            now = time.monotonic()
+            oldest, oldest_started = min(pending.values(), key=lambda value: value[1])[:2]
+            can_hedge = bool(queue) and len(pending) < MAX_IN_FLIGHT and not hedge_refused
+            if can_hedge and now - oldest_started >= oldest.hedge_delay(kind):
+                if launch(wait=False):
+                    hedged = True
+                    with self._lock:
+                        self.hedges += 1
+                else:
+                    # No spare rate limit for a hedge; wait for the request in flight instead
+                    hedge_refused = True
+                continue
+
+            wake = min(started + backend.timeout for backend, started, _, _ in pending.values())
+            if can_hedge:
+                wake = min(wake, oldest_started + oldest.hedge_delay(kind))
+            done, _ = wait(list(pending), timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            winner = None
+            for future in done:
+                backend, started, cancelled, admission = pending.pop(future)
+                if winner is not None:
+                    abandon(future, backend, started, cancelled, admission)
+                elif future.exception() is not None:
+                    errors.append((backend, future.exception()))
+                else:
+                    backend.record_latency(kind, time.monotonic() - started)
+                    winner = backend, future.result()
+                    if not keep_winner:
+                        admission.release()
+            if winner is not None:
+                for future, (backend, started, cancelled, admission) in pending.items():
+                    abandon(future, backend, started, cancelled, admission)
+                with self._lock:
+                    self.wins[winner[0].name] = self.wins.get(winner[0].name, 0) + 1
+                return winner[1], Outcome(winner[0].name, attempts, hedged, tuple(backend.name for backend, _ in errors))
+
+            now = time.monotonic()
+            for future, (backend, started, cancelled, admission) in list(pending.items()):
+                if now - started >= backend.timeout:
+                    del pending[future]
+                    # Counted at the timeout: the p95 must not forget how slow this was
+                    backend.record_latency(kind, backend.timeout)
+                    abandon(future, backend, started, cancelled, admission, timed_out=True)
+                    errors.append((backend, TimeoutError(
+                        f"backend {backend.name} gave no answer within {backend.timeout:g}s")))
+
+    def summary(self) -> str:
+        with self._lock:
+            wins = ", ".join(f"{name} {count}" for name, count in sorted(self.wins.items(), key=lambda item: -item[1]))
+            return f"LLM backends: {wins or 'no answers'}; {self.hedges} hedged, {self.fallbacks} fallbacks"
@@ -0,0 +1,221 @@
+"""
+Local stand-in for the Groq/OpenAI chat completions API.
+
+    python bench/fake_groq.py --port 8765 --latency 0.5 --token-delay 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=test python main.py
+
+Serves POST /openai/v1/chat/completions (the path the Groq client uses) and
+/v1/chat/completions, with and without "stream": true.
+
+Rate limiting can be exercised with --rpm (a real sliding-window limit answered
+with 429 and retry-after) and --error-rate (a share of requests rejected at random):
+
+    python bench/fake_groq.py --rpm 20 --error-rate 0.1 --retry-after 2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+DEFAULT_ANSWER = (
+    "1. Your side had more of the ball but fewer clear-cut chances - was that by design?\n"
+    "2. How do you explain finishing so far below your expected goals?\n"
+    "3. The card count suggests a tense game; did discipline cost you control?\n"
+    "4. What does this result change about how you approach the next round?\n"
+    "5. Your pressing numbers dropped late on - was fitness a concern?\n"
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Split text into word-sized pieces that keep their trailing whitespace."""
+    pieces: List[str] = []
+    current = ""
+    for ch in text:
+        current += ch
+        if ch in " \n":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGroq/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict[str, object], headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip("/") in ("/health", "/openai/v1/models", "/v1/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/openai/v1/chat/completions", "/v1/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        retry_after = self.server.admit()
+        if retry_after is not None:
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests. Please try again later.",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, {"retry-after": f"{retry_after:.3f}"})
+            return
+        time.sleep(self.server.latency)
+
+        model = request.get("model", self.server.model)
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        answer = self.server.answer
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(answer.split()),
+            "total_tokens": prompt_tokens + len(answer.split()),
+        }
+
+        if not request.get("stream"):
+            time.sleep(self.server.token_delay * len(_tokenize(answer)))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def emit(delta: Dict[str, object], finish_reason=None, extra=None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit({"role": "assistant", "content": ""})
+        for piece in _tokenize(answer):
+            time.sleep(self.server.token_delay)
+            emit({"content": piece})
+        emit({}, finish_reason="stop", extra={"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, token_delay: float = 0.0,
+                 answer: str = DEFAULT_ANSWER, model: str = "llama-3.3-70b-versatile", verbose: bool = False,
+                 rpm: int = 0, error_rate: float = 0.0, retry_after: float = 1.0):
+        super().__init__(address, FakeGroqHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer = answer
+        self.model = model
+        self.verbose = verbose
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.rate_limited_count = 0
+        self._accepted = deque()
+        self._lock = threading.Lock()
+
+    def admit(self) -> Optional[float]:
+        """
+        Count a completion request. Returns None if it is served, or the retry-after
+        delay when it is rejected by the rpm window or by --error-rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            if self.rpm and len(self._accepted) >= self.rpm:
+                self.rate_limited_count += 1
+                return 60 - (now - self._accepted[0])
+            if self.error_rate and random.random() < self.error_rate:
+                self.rate_limited_count += 1
+                return self.retry_after
+            self._accepted.append(now)
+            self.request_count += 1
+            return None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq/OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first byte of each response.")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens.")
+    parser.add_argument("--rpm", type=int, default=0,
+                        help="Requests per minute to accept before answering 429 (default: unlimited).")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of requests rejected with a random 429 (0-1).")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="retry-after seconds sent with random 429s (default: 1).")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeGroqServer((args.host, args.port), args.latency, args.token_delay, verbose=args.verbose,
+                            rpm=args.rpm, error_rate=args.error_rate, retry_after=args.retry_after)
+    print(f"Fake Groq server on {server.base_url} (set GROQ_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
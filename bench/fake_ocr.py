@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the C++ OCR binary, for benchmarks without OpenCV or Tesseract.
+
+    bench/fake_ocr.py screenshot.png     # one-shot, like build/ocr screenshot.png
+    bench/fake_ocr.py --worker           # READY, then one image path per stdin line, END after each
+    FMNARRATIVE_OCR_BINARY=bench/fake_ocr.py python main.py extract any.png
+
+Prints HOME_TEAM/AWAY_TEAM/STAT records in the binary's format, confidences included.
+The image is never read: the match is derived from its file name, so a path always
+gets the same stats and different paths get different matches. main.py passes nothing
+but the image path, so the behaviour is set through environment variables:
+
+  FAKE_OCR_DELAY        seconds spent per image (default: 0.2)
+  FAKE_OCR_STARTUP      seconds of model loading before the first image (default: 0.3)
+  FAKE_OCR_STATS        stat rows per image, at most 18 plus total shots (default: all)
+  FAKE_OCR_DEBUG_LINES  stderr lines per image, as the real binary is chatty (default: 50)
+  FAKE_OCR_NO_WORKER    set to 1 to behave like an older build without --worker
+"""
+import hashlib
+import os
+import random
+import sys
+import time
+from typing import List
+
+TEAMS = ("Arsenal", "Chelsea", "Liverpool", "Manchester City", "Tottenham Hotspur", "Newcastle United",
+         "Aston Villa", "Brighton", "West Ham United", "Brentford", "Real Madrid", "Bayern Munich")
+
+# (OCR stat name, generator of one side's value) in the order the binary reads the rows
+_COUNTS = (
+    ("xg", lambda r: f"{r.uniform(0.2, 3.2):.2f}"),
+    ("clear cut chances", lambda r: str(r.randint(0, 5))),
+    ("long shots", lambda r: str(r.randint(0, 9))),
+    ("corners", lambda r: str(r.randint(0, 11))),
+    ("fouls", lambda r: str(r.randint(4, 18))),
+    ("offsides", lambda r: str(r.randint(0, 5))),
+    ("passes completed", lambda r: f"{r.randint(68, 92)}%"),
+    ("crosses completed", lambda r: f"{r.randint(10, 45)}%"),
+    ("tackles won", lambda r: f"{r.randint(45, 85)}%"),
+    ("headers won", lambda r: f"{r.randint(35, 70)}%"),
+    ("yellow cards", lambda r: str(r.randint(0, 5))),
+    ("red cards", lambda r: str(r.choice((0, 0, 0, 0, 1)))),
+    ("average rating", lambda r: f"{r.uniform(6.1, 7.6):.1f}"),
+    ("progressive passes", lambda r: str(r.randint(15, 70))),
+    ("high intensity sprints", lambda r: str(r.randint(60, 160))),
+)
+
+
+def records(image_path: str, stat_count: int = 18) -> List[str]:
+    """The record lines the OCR binary would print for a match stats screenshot."""
+    rng = random.Random(hashlib.sha256(os.path.basename(image_path).encode()).digest())
+    home, away = rng.sample(TEAMS, 2)
+    on_target = (rng.randint(1, 9), rng.randint(0, 7))
+    off_target = (rng.randint(1, 9), rng.randint(0, 8))
+    possession = rng.randint(35, 65)
+
+    stats = [
+        ("on target", str(on_target[0]), str(on_target[1])),
+        ("off target", str(off_target[0]), str(off_target[1])),
+        ("possession", f"{possession}%", f"{100 - possession}%"),
+    ]
+    stats += [(name, value(rng), value(rng)) for name, value in _COUNTS]
+    stats = stats[:max(0, stat_count)]
+
+    lines = [f"HOME_TEAM:{home}", f"AWAY_TEAM:{away}"]
+    shots = [0, 0]
+    for name, home_value, away_value in stats:
+        if name in ("on target", "off target"):
+            shots = [shots[0] + int(home_value), shots[1] + int(away_value)]
+    lines.append(f"STAT:shots|{shots[0]}|{shots[1]}|{rng.randint(70, 95)}")
+    lines += [f"STAT:{name}|{home_value}|{away_value}|{rng.randint(55, 96)}"
+              for name, home_value, away_value in stats]
+    return lines
+
+
+def _process(image_path: str) -> List[str]:
+    for i in range(int(os.environ.get("FAKE_OCR_DEBUG_LINES", "50"))):
+        print(f"Row {i}: debug output", file=sys.stderr)
+    time.sleep(float(os.environ.get("FAKE_OCR_DELAY", "0.2")))
+    return records(image_path, int(os.environ.get("FAKE_OCR_STATS", "18")))
+
+
+def main() -> int:
+    if len(sys.argv) != 2:
+        print("Usage: fake_ocr.py <image_path> | --worker", file=sys.stderr)
+        return 1
+    time.sleep(float(os.environ.get("FAKE_OCR_STARTUP", "0.3")))
+
+    if sys.argv[1] != "--worker":
+        if not os.path.isfile(sys.argv[1]):
+            print(f"Error: Could not load image: {sys.argv[1]}", file=sys.stderr)
+            return 1
+        print("\n".join(_process(sys.argv[1])))
+        return 0
+
+    if os.environ.get("FAKE_OCR_NO_WORKER") == "1":
+        print("Error: Could not load image: --worker", file=sys.stderr)
+        return 1
+    print("READY", flush=True)
+    for line in sys.stdin:
+        image_path = line.strip()
+        if not image_path:
+            continue
+        if os.path.isfile(image_path):
+            print("\n".join(_process(image_path)))
+        else:
+            print(f"ERROR:Could not load image: {image_path}")
+        print("END", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+"""
+Accuracy check for screenshot preprocessing (the --preprocess flag).
+
+    python bench/preprocess_check.py screenshots/*.png
+    python bench/preprocess_check.py --show-stats shots/4k_*.png
+
+Every screenshot is OCR'd twice with the real OCR binary and no OCR cache: once from
+the original file and once from the preprocessed copy. Team names and every stat must
+come out the same; the OCR time of both runs is reported too. Exits 1 if any
+screenshot differs, and 2 if OCR or OpenCV is not available.
+
+Both paths should read the same pixels: preprocessing writes the frame the OCR binary
+normalises every screenshot to. A difference means the two have drifted apart (or
+were built against different OpenCV versions).
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _timed_ocr(fmn, image_path: str, preprocess_image: bool) -> Tuple[Optional[Dict[str, object]], float]:
+    start = time.perf_counter()
+    ocr_data = fmn._try_run_ocr(image_path, preprocess_image=preprocess_image)
+    return ocr_data, time.perf_counter() - start
+
+
+def _differences(original: Optional[Dict[str, object]], prepared: Optional[Dict[str, object]]) -> List[str]:
+    if original is None or prepared is None:
+        if original is prepared:
+            return []
+        return ["OCR failed on the " + ("original" if original is None else "preprocessed copy")]
+    differences = []
+    for field in ("home_team", "away_team"):
+        if original.get(field) != prepared.get(field):
+            differences.append(f"{field}: {original.get(field)!r} -> {prepared.get(field)!r}")
+    original_stats, prepared_stats = original.get("stats", {}), prepared.get("stats", {})
+    for stat in sorted(set(original_stats) | set(prepared_stats)):
+        if original_stats.get(stat) != prepared_stats.get(stat):
+            differences.append(f"{stat}: {original_stats.get(stat)} -> {prepared_stats.get(stat)}")
+    return differences
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+", help="Reference screenshots.")
+    parser.add_argument("--show-stats", action="store_true", help="Print the stats read from each original.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO)
+    import main as fmn
+    import preprocess
+    if fmn._find_ocr_binary() is None:
+        print("OCR binary not found (build ./build/ocr or set FMNARRATIVE_OCR_BINARY)")
+        return 2
+    if not preprocess.available():
+        print("OpenCV is not installed; nothing to compare")
+        return 2
+
+    failed = 0
+    original_total = prepared_total = 0.0
+    for image_path in args.images:
+        size = preprocess.image_size(image_path)
+        label = f"{os.path.basename(image_path)} ({size[0]}x{size[1]})" if size else os.path.basename(image_path)
+        original, original_time = _timed_ocr(fmn, image_path, False)
+        prepared, prepared_time = _timed_ocr(fmn, image_path, True)
+        original_total += original_time
+        prepared_total += prepared_time
+        differences = _differences(original, prepared)
+        status = "DIFF" if differences else "same"
+        print(f"{status}  {label}  {original_time * 1000:.0f} ms -> {prepared_time * 1000:.0f} ms")
+        if args.show_stats and original is not None:
+            print(f"      {original.get('home_team')} v {original.get('away_team')}: {original.get('stats')}")
+        for difference in differences:
+            print(f"      {difference}")
+        if differences:
+            failed += 1
+
+    print(f"{len(args.images) - failed}/{len(args.images)} screenshots read the same; "
+          f"OCR time {original_total:.2f}s -> {prepared_total:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
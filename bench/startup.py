@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark for main.py.
+
+    python bench/startup.py --runs 10
+    python bench/startup.py --max-import-ms 150 --max-worker-ms 150
+
+Each measurement runs in a fresh interpreter without GROQ_API_KEY:
+
+  import        `import main`, over a bare interpreter start
+  --version     `main.py --version`, over a bare interpreter start
+  pool worker   `import main` timed inside a spawn-started process-pool worker, which
+                every OCR worker pays before its first task on macOS and Windows
+
+It also checks that importing main works without an API key and loads none of the
+heavy dependencies (groq, httpx, dotenv, numpy, cv2, asyncio). Exits 1 if that check
+fails or a median exceeds its limit.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("groq", "httpx", "dotenv", "numpy", "cv2", "asyncio")
+
+_IMPORT_CHECK = f"""
+import json, sys
+import main
+print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))
+"""
+
+# Prints the seconds a fresh spawned worker spends importing main
+_POOL_WORKER = """
+import multiprocessing, timeit
+from concurrent.futures import ProcessPoolExecutor
+if __name__ == "__main__":
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        print(pool.submit(timeit.timeit, "import main", number=1).result())
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("GROQ_API_KEY", None)
+    return env
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + args, cwd=REPO, env=_env(), capture_output=True, text=True)
+
+
+def _timed(args: List[str], runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = _run(args)
+        times.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(args)} failed:\n{proc.stderr}")
+    return times
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:7.1f} ms"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per measurement (default: 7).")
+    parser.add_argument("--max-import-ms", type=float, default=150.0,
+                        help="Limit for the median `import main` overhead (default: 150).")
+    parser.add_argument("--max-worker-ms", type=float, default=150.0,
+                        help="Limit for the median pool-worker import time (default: 150).")
+    args = parser.parse_args()
+
+    failed = False
+    check = _run(["-c", _IMPORT_CHECK])
+    if check.returncode != 0:
+        print(f"import main failed without GROQ_API_KEY:\n{check.stderr}")
+        return 1
+    heavy = json.loads(check.stdout.strip().splitlines()[-1])
+    if heavy:
+        print(f"FAIL import main loaded {', '.join(heavy)}")
+        failed = True
+
+    # Warm the bytecode caches so the first run is not an outlier
+    _run(["-c", "import main"])
+
+    baseline = statistics.median(_timed(["-c", "pass"], args.runs))
+    import_overhead = statistics.median(_timed(["-c", "import main"], args.runs)) - baseline
+    version_overhead = statistics.median(_timed(["main.py", "--version"], args.runs)) - baseline
+
+    worker_overheads = []
+    for _ in range(args.runs):
+        proc = _run(["-c", _POOL_WORKER])
+        if proc.returncode != 0:
+            print(f"pool worker benchmark failed:\n{proc.stderr}")
+            return 1
+        worker_overheads.append(float(proc.stdout.strip().splitlines()[-1]))
+    worker_overhead = statistics.median(worker_overheads)
+
+    print(f"interpreter start  {_ms(baseline)}")
+    print(f"import main       +{_ms(import_overhead)}  (limit {args.max_import_ms:.0f} ms)")
+    print(f"main.py --version +{_ms(version_overhead)}")
+    print(f"pool worker       +{_ms(worker_overhead)}  (limit {args.max_worker_ms:.0f} ms)")
+
+    if import_overhead * 1000 > args.max_import_ms:
+        print("FAIL import main is over its limit")
+        failed = True
+    if worker_overhead * 1000 > args.max_worker_ms:
+        print("FAIL pool worker start is over its limit")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
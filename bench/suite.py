@@ -0,0 +1,285 @@
+"""
+Offline benchmark suite: needs neither the OCR build, network access nor an API key.
+
+    python bench/suite.py                      # run every group and print the report
+    python bench/suite.py --save-baseline      # ...and keep the results as bench/baseline.json
+    python bench/suite.py --compare            # ...and compare with bench/baseline.json
+    python bench/suite.py --only micro --runs 3
+
+OCR is served by bench/fake_ocr.py and the Groq API by bench/fake_groq.py, both with
+configurable delays, in a throwaway state directory. Groups:
+
+  micro     _parse_ocr_output, _parse_numeric, MatchStats.from_ocr and build_prompt,
+            timed in-process (microseconds per call)
+  single    one match through OCR, prompt building and streamed question generation,
+            as in an interactive run: wall time, time to first token and every stage
+  batch     run_batch at several OCR worker / API concurrency settings (matches per
+            second), with the one-shot OCR fallback, and against a server answering
+            part of the requests with 429
+
+Every run is written to bench/results/<time>.json. With --compare, metrics that got
+worse by more than --tolerance are listed and the exit status is 1.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(BENCH)
+FAKE_OCR = os.path.join(BENCH, "fake_ocr.py")
+DEFAULT_BASELINE = os.path.join(BENCH, "baseline.json")
+RESULTS_DIR = os.path.join(BENCH, "results")
+GROUPS = ("micro", "single", "batch")
+
+# (OCR workers, API concurrency) settings the batch throughput is measured at
+BATCH_SETTINGS = ((1, 1), (2, 4), (4, 4), (4, 8))
+
+Metrics = Dict[str, Dict[str, object]]
+
+
+def _metric(metrics: Metrics, name: str, value: float, unit: str, better: str = "lower") -> None:
+    metrics[name] = {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def _per_call_us(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Best of `repeat` timeit rounds, each long enough to be measurable, in microseconds per call."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def _context_row(image: str, index: int) -> Dict[str, str]:
+    settings = (("ucl", "qf"), ("domestic cup", "sf"), ("derby", ""))
+    setting, stage = settings[index % len(settings)]
+    row = {"image": image, "setting": setting, "stage": stage,
+           "home_or_away": ("home", "away")[index % 2],
+           "home_scorers": "Saka;Rice", "away_scorers": "Palmer",
+           "home_goals": "2", "away_goals": "1"}
+    if setting == "derby":
+        row.update(home_points="40", away_points="38", match_number="25")
+    return row
+
+
+def _write_screenshots(directory: str, count: int) -> str:
+    """`count` placeholder screenshots (fake_ocr never reads them) and their context CSV."""
+    os.makedirs(directory, exist_ok=True)
+    rows = []
+    for i in range(count):
+        name = f"match{i:03d}.png"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + name.encode())
+        rows.append(_context_row(name, i))
+    context_path = os.path.join(directory, "context.csv")
+    with open(context_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=sorted({key for row in rows for key in row}))
+        writer.writeheader()
+        writer.writerows(rows)
+    return context_path
+
+
+def bench_micro(main, metrics: Metrics) -> None:
+    sys.path.insert(0, BENCH)
+    from fake_ocr import records
+
+    output = "\n".join(records("match000.png"))
+    stats = main._parse_ocr_output(output)["stats"]
+    values = [value for pair in stats.values() for value in pair] + ["12 (5/10)", "n/a", ""]
+    row = _context_row("match000.png", 0)
+
+    _metric(metrics, "micro.parse_ocr_output", _per_call_us(lambda: main._parse_ocr_output(output)), "us")
+    _metric(metrics, "micro.parse_numeric", _per_call_us(lambda: [main._parse_numeric(v) for v in values])
+            / len(values), "us")
+    _metric(metrics, "micro.match_stats_from_ocr", _per_call_us(lambda: main.MatchStats.from_ocr(stats, 2, 1)), "us")
+    context = main.context_from_row(row)
+    _metric(metrics, "micro.build_prompt", _per_call_us(
+        lambda: main.build_prompt("Arsenal", "Chelsea", 2, 1, stats, context,
+                                  budget=main.DEFAULT_PROMPT_BUDGET)), "us")
+
+
+def bench_single(main, metrics: Metrics, work_dir: str, runs: int) -> None:
+    _write_screenshots(os.path.join(work_dir, "single"), 1)
+    image = os.path.join(work_dir, "single", "match000.png")
+    row = _context_row("match000.png", 0)
+    walls: List[float] = []
+    first_tokens: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    for i in range(runs):
+        profile = main.RunProfile("single")
+        ocr_data = main.run_ocr(image, None, None, profile, preprocess_image=False)
+        if not ocr_data:
+            raise SystemExit("fake OCR produced no output")
+        _, prompt = main.analyze_match(ocr_data, row, None, None, profile, main.DEFAULT_PROMPT_BUDGET)
+        _, timings = main.stream_questions(prompt, on_question=lambda _: None, profile=profile)
+        profile.finish()
+        walls.append(profile.wall_seconds)
+        first_tokens.append(timings["time_to_first_token"])
+        for name, seconds in profile.stages.items():
+            stages.setdefault(name, []).append(seconds)
+
+    _metric(metrics, "single.wall", statistics.median(walls) * 1000, "ms")
+    _metric(metrics, "single.time_to_first_token", statistics.median(first_tokens) * 1000, "ms")
+    for name, values in stages.items():
+        _metric(metrics, f"single.stage.{name}", statistics.median(values) * 1000, "ms")
+
+
+def _batch_throughput(main, directory: str, context_path: str, ocr_workers: int,
+                      api_concurrency: int) -> Tuple[float, int]:
+    """Matches per second for one run_batch call, and the scheduler retries it needed."""
+    main.configure_scheduler(100000, 1e9, api_concurrency)
+    images = sum(1 for name in os.listdir(directory) if name.endswith(".png"))
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        failures = main.run_batch(directory, context_path, os.path.join(directory, "results"),
+                                  ocr_workers, api_concurrency, use_ocr_cache=False, fresh=True,
+                                  use_store=False, preprocess_image=False)
+    elapsed = time.perf_counter() - start
+    if failures:
+        raise SystemExit(f"batch benchmark: {failures} of {images} matches failed")
+    return images / elapsed, main.get_scheduler().retries
+
+
+def bench_batch(main, metrics: Metrics, server, work_dir: str, matches: int) -> None:
+    directory = os.path.join(work_dir, "batch")
+    context_path = _write_screenshots(directory, matches)
+
+    for ocr_workers, api_concurrency in BATCH_SETTINGS:
+        throughput, _ = _batch_throughput(main, directory, context_path, ocr_workers, api_concurrency)
+        _metric(metrics, f"batch.ocr{ocr_workers}_api{api_concurrency}", throughput, "matches/s", "higher")
+
+    os.environ["FAKE_OCR_NO_WORKER"] = "1"
+    try:
+        throughput, _ = _batch_throughput(main, directory, context_path, 4, 4)
+    finally:
+        del os.environ["FAKE_OCR_NO_WORKER"]
+    _metric(metrics, "batch.oneshot_ocr4_api4", throughput, "matches/s", "higher")
+
+    server.error_rate, server.retry_after = 0.25, 0.2
+    try:
+        throughput, retries = _batch_throughput(main, directory, context_path, 4, 4)
+    finally:
+        server.error_rate = 0.0
+    _metric(metrics, "batch.rate_limited_ocr4_api4", throughput, "matches/s", "higher")
+    _metric(metrics, "batch.rate_limited_retries", retries, "retries")
+
+
+def compare(current: Metrics, baseline: Metrics, tolerance: float) -> List[str]:
+    """Print current against baseline values; return the names that regressed beyond `tolerance`."""
+    regressions = []
+    print(f"\n{'metric':<36}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, metric in current.items():
+        before = baseline.get(name)
+        if before is None or not before["value"]:
+            print(f"{name:<36}{'-':>12}{metric['value']:>12.3f}{'new':>9}")
+            continue
+        change = (metric["value"] - before["value"]) / before["value"]
+        worse = change < -tolerance if metric["better"] == "higher" else change > tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<36}{before['value']:>12.3f}{metric['value']:>12.3f}{change * 100:>8.1f}%{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated groups (default: {','.join(GROUPS)}).")
+    parser.add_argument("--runs", type=int, default=5, help="Repetitions of the single-match run (default: 5).")
+    parser.add_argument("--matches", type=int, default=16, help="Screenshots per batch run (default: 16).")
+    parser.add_argument("--ocr-delay", type=float, default=0.1, help="Fake OCR seconds per image (default: 0.1).")
+    parser.add_argument("--ocr-startup", type=float, default=0.2,
+                        help="Fake OCR seconds of model loading per process (default: 0.2).")
+    parser.add_argument("--llm-latency", type=float, default=0.15,
+                        help="Fake API seconds before the first byte (default: 0.15).")
+    parser.add_argument("--token-delay", type=float, default=0.005,
+                        help="Fake API seconds between streamed tokens (default: 0.005).")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help="Also store the results as the baseline (default: bench/baseline.json).")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help="Compare with a saved baseline (default: bench/baseline.json).")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change counted as a regression with --compare (default: 0.2).")
+    args = parser.parse_args()
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    unknown = set(groups).difference(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    work_dir = tempfile.mkdtemp(prefix="fmn-bench-")
+    os.environ.update({
+        "FMNARRATIVE_HOME": os.path.join(work_dir, "state"),
+        "FMNARRATIVE_OCR_BINARY": FAKE_OCR,
+        "FAKE_OCR_DELAY": str(args.ocr_delay),
+        "FAKE_OCR_STARTUP": str(args.ocr_startup),
+        "GROQ_API_KEY": "bench",
+    })
+    sys.path.insert(0, BENCH)
+    from fake_groq import FakeGroqServer
+    server = FakeGroqServer(("127.0.0.1", 0), latency=args.llm_latency, token_delay=args.token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GROQ_BASE_URL"] = server.base_url
+
+    sys.path.insert(0, REPO)
+    import main as fmn
+    # The rate limiter's waits would swamp everything else; the 429 scenario measures retries
+    fmn.configure_scheduler(100000, 1e9)
+
+    metrics: Metrics = {}
+    try:
+        if "micro" in groups:
+            bench_micro(fmn, metrics)
+        if "single" in groups:
+            bench_single(fmn, metrics, work_dir, args.runs)
+        if "batch" in groups:
+            bench_batch(fmn, metrics, server, work_dir, args.matches)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("save_baseline", "compare", "tolerance")},
+        "metrics": metrics,
+    }
+    for name, metric in metrics.items():
+        print(f"{name:<36}{metric['value']:>12.3f} {metric['unit']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    for path in filter(None, (result_path, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    print(f"\nResults written to {os.path.relpath(result_path)}")
+
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Cannot read baseline {args.compare}: {e}")
+            return 1
+        if baseline.get("settings") != report["settings"]:
+            print("Note: the baseline was recorded with different settings")
+        regressions = compare(metrics, baseline["metrics"], args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,272 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    Content-addressed on-disk cache for parsed OCR results.
+    Entries are keyed by the image bytes plus the identity of the OCR binary (path,
+    mtime and size), so rebuilding the binary invalidates everything it produced.
+    Each entry is one compact JSON file; the least recently used entries are
+    evicted once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 16 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def key_for(self, image_path: str, binary: str, variant: str = "") -> str:
+        """
+        Cache key for an image as processed by a specific OCR binary. `variant` names any
+        preprocessing applied before OCR. Raises OSError if unreadable.
+        """
+        st = os.stat(binary)
+        identity = f"{os.path.abspath(binary)}:{st.st_mtime_ns}:{st.st_size}"
+        if variant:
+            identity = f"{identity}|{variant}"
+        return hashlib.sha256(f"{file_sha256(image_path)}|{identity}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        stats: Dict[str, Tuple[str, str]] = {name: (pair[0], pair[1]) for name, pair in entry["stats"].items()}
+        return {"home_team": entry["home_team"], "away_team": entry["away_team"], "stats": stats,
+                "confidence": entry.get("confidence", {})}
+
+    def put(self, key: str, ocr_data: Dict[str, object]) -> None:
+        path = self._path(key)
+        payload = json.dumps(
+            {
+                "home_team": ocr_data.get("home_team"),
+                "away_team": ocr_data.get("away_team"),
+                "stats": {name: list(pair) for name, pair in ocr_data.get("stats", {}).items()},
+                "confidence": ocr_data.get("confidence", {}),
+            },
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+
+        with self._lock:
+            # An overwritten entry no longer counts towards the total
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._entries())
+            else:
+                self._total_bytes += len(payload) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """Yield (mtime, path, size) for every entry on disk."""
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    yield st.st_mtime, entry.path, st.st_size
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def summary(self) -> str:
+        return f"OCR cache: {self.hits} hits, {self.misses} misses"
+
+
+class LLMResponseCache:
+    """
+    On-disk cache of LLM completions keyed by the full request (model, messages and
+    sampling parameters), with a TTL and a cap on the number of entries.
+    Concurrent identical requests are coalesced so only one of them reaches the API.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 500):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entry_count: Optional[int] = None
+        self._inflight: Dict[str, "Future"] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(request: Dict[str, object]) -> str:
+        """Key for a chat completion request; any change to model, prompt or params changes it."""
+        return hashlib.sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry["content"]
+
+    def lookup(self, key: str, fresh: bool = False) -> Optional[str]:
+        """
+        get() counted as a hit or a miss the way get_or_create counts them, for callers that
+        call the API and put() the result themselves (a streamed completion cannot be
+        coalesced). fresh=True skips the lookup and counts the miss.
+        """
+        content = None if fresh else self.get(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        existed = os.path.exists(path)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "content": content}, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._entry_count is None:
+                self._entry_count = sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+            elif not existed:
+                self._entry_count += 1
+            if self._entry_count > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the oldest ones until max_entries remain."""
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            entries.append((mtime, entry.path))
+        entries.sort()
+
+        keep = len(entries)
+        for mtime, path in entries:
+            if keep <= self.max_entries and now - mtime <= self.ttl_seconds:
+                break
+            try:
+                os.remove(path)
+                keep -= 1
+            except OSError:
+                pass
+        self._entry_count = keep
+
+    def get_or_create(self, request: Dict[str, object], create: Callable[[], str], fresh: bool = False,
+                      keep: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Return the cached completion for `request`, or call `create()` and cache its result
+        (unless `keep(result)` says otherwise).
+        fresh=True skips the cache lookup but still stores the new completion.
+        If an identical request is already in flight, wait for it instead of calling create().
+        """
+        key = self.key_for(request)
+        if not fresh:
+            cached = self.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                return cached
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = Future()
+                self._inflight[key] = inflight
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+
+        if not owner:
+            return inflight.result()
+
+        try:
+            content = create()
+            if keep is None or keep(content):
+                self.put(key, content)
+            inflight.set_result(content)
+            return content
+        except BaseException as e:
+            inflight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def summary(self) -> str:
+        return f"LLM cache: {self.hits} hits, {self.misses} misses, {self.coalesced} coalesced"
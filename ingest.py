@@ -0,0 +1,215 @@
+import math
+import os
+import re
+import tempfile
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cache import file_sha256
+
+try:
+    import cv2
+except ImportError:  # optional: without OpenCV recordings cannot be read
+    cv2 = None
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm", ".avi")
+# Seconds between the video frames that are looked at
+SAMPLE_INTERVAL = 0.5
+# Most distinct frames taken from one match, whatever the inputs
+MAX_FRAMES = 40
+# Hash grid: HASH_SIZE x HASH_SIZE horizontal brightness gradients, two bits each
+HASH_SIZE = 16
+# Gradients smaller than this many gray levels count as flat. FM's backgrounds are flat,
+# and a plain dHash lets compression noise there flip more bits than a different tab does.
+GRADIENT_MARGIN = 4
+# Hashes differing in at most this many of their 512 bits show the same screen. Noise
+# in a recording of a still screen flips a few; another tab or scroll position, dozens.
+DUPLICATE_DISTANCE = 24
+# Confidence assumed for records from OCR builds that do not report one
+DEFAULT_CONFIDENCE = 0.5
+_NUMBER = re.compile(r"\d+(?:\.\d+)?%?")
+
+
+class Frame(NamedTuple):
+    path: str
+    source: str  # the screenshot or recording it came from
+    position: Optional[float]  # seconds into the recording; None for screenshots
+
+
+def dhash(gray: np.ndarray) -> int:
+    """
+    Difference hash of a grayscale image, with a dead band: each horizontally adjacent
+    pair of cells sets one bit if brightness rises, another if it falls, none if flat.
+    """
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA).astype(np.int16)
+    gradient = small[:, 1:] - small[:, :-1]
+    bits = np.concatenate([(gradient > GRADIENT_MARGIN).ravel(), (gradient < -GRADIENT_MARGIN).ravel()])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class _Selector:
+    """Accepts a frame unless an already accepted one shows the same screen."""
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self.duplicates = 0
+        self._hashes: List[int] = []
+
+    def accept(self, frame_hash: int) -> bool:
+        if any(hamming(frame_hash, seen) <= self.max_distance for seen in self._hashes):
+            self.duplicates += 1
+            return False
+        self._hashes.append(frame_hash)
+        return True
+
+
+def _sample_video(path: str, out_dir: str, selector: _Selector, limit: int,
+                  interval: float) -> List[Frame]:
+    """
+    Distinct frames of a recording, written to `out_dir` as PNG. A sampled frame is only
+    used once the screen has held still for one interval, so frames caught mid-scroll or
+    mid-transition never reach OCR.
+    """
+    if cv2 is None:
+        raise ValueError(f"reading {os.path.basename(path)} needs OpenCV (pip install opencv-python)")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"cannot read video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, round(fps * interval))
+    frames: List[Frame] = []
+    previous: Optional[int] = None
+    index = 0
+    try:
+        # grab() skips frames without decoding them; only sampled frames are retrieved
+        while len(frames) < limit and capture.grab():
+            if index % step == 0:
+                ok, image = capture.retrieve()
+                if ok:
+                    frame_hash = dhash(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image)
+                    still = previous is not None and hamming(frame_hash, previous) <= selector.max_distance
+                    previous = frame_hash
+                    if still and selector.accept(frame_hash):
+                        fd, out_path = tempfile.mkstemp(prefix="fmn-frame-", suffix=".png", dir=out_dir)
+                        os.close(fd)
+                        if cv2.imwrite(out_path, image, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+                            frames.append(Frame(out_path, path, index / fps))
+            index += 1
+    finally:
+        capture.release()
+    return frames
+
+
+def collect_frames(inputs: Sequence[str], out_dir: str, interval: float = SAMPLE_INTERVAL,
+                   max_frames: int = MAX_FRAMES, max_distance: int = DUPLICATE_DISTANCE) -> Tuple[List[Frame], int]:
+    """
+    The distinct frames among screenshots and screen recordings of one match, and the
+    number of duplicates dropped. Screenshots are used in place and only dropped when
+    byte-identical to an earlier one: FM's stat tabs share their chrome and row layout,
+    so a perceptual hash cannot be trusted to tell two of them apart. Frames sampled
+    from recordings are deduplicated perceptually and written to `out_dir`, which the
+    caller cleans up. Raises ValueError for a recording that cannot be read.
+    """
+    selector = _Selector(max_distance)
+    digests = set()
+    duplicates = 0
+    frames: List[Frame] = []
+    for path in inputs:
+        if len(frames) >= max_frames:
+            break
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            frames.extend(_sample_video(path, out_dir, selector, max_frames - len(frames), interval))
+            continue
+        try:
+            digest = file_sha256(path)
+        except OSError:
+            digest = path
+        if digest in digests:
+            duplicates += 1
+            continue
+        digests.add(digest)
+        frames.append(Frame(path, path, None))
+    return frames, duplicates + selector.duplicates
+
+
+def _number(value: str) -> Optional[float]:
+    return float(value.rstrip("%")) if _NUMBER.fullmatch(value) else None
+
+
+def record_confidence(name: str, home: str, away: str, reported: Optional[float]) -> float:
+    """
+    Confidence in one frame's reading of a stat: what the OCR binary reported, lowered
+    for values that do not parse or do not add up.
+    """
+    confidence = DEFAULT_CONFIDENCE if reported is None else reported
+    home_number, away_number = _number(home), _number(away)
+    if home_number is None or away_number is None:
+        return confidence * 0.5
+    if reported is None and home == away == "0":
+        # The binary prints 0|0 when it found the row but could not read the values
+        confidence *= 0.5
+    if name == "possession" and abs(home_number + away_number - 100) > 2:
+        confidence *= 0.5
+    return confidence
+
+
+def _team(names: Sequence[Optional[str]]) -> str:
+    votes = Counter(name for name in names if name and name != "UNKNOWN")
+    return votes.most_common(1)[0][0] if votes else "UNKNOWN"
+
+
+def merge_ocr_results(results: Sequence[Optional[Dict[str, object]]]) -> Optional[Dict[str, object]]:
+    """
+    Combine the OCR results of several frames of the same match into one.
+    Each stat takes the reading with the highest summed confidence over the frames that
+    produced it, so agreeing frames outvote a single misread; its merged confidence
+    grows with every agreeing frame. Team names are majority votes. Total shots are
+    recomputed from the merged on/off target values, since each frame's total only
+    counts the parts that frame could see. Returns None if every frame failed.
+    """
+    results = [result for result in results if result]
+    if not results:
+        return None
+    if len(results) == 1:
+        return results[0]
+
+    # stat -> (home, away) -> confidence of every frame that read exactly that
+    readings: Dict[str, Dict[Tuple[str, str], List[float]]] = {}
+    for result in results:
+        reported = result.get("confidence") or {}
+        for name, (home, away) in result["stats"].items():
+            confidence = record_confidence(name, home, away, reported.get(name))
+            readings.setdefault(name, {}).setdefault((home, away), []).append(confidence)
+
+    stats: Dict[str, Tuple[str, str]] = {}
+    confidence: Dict[str, float] = {}
+    for name, candidates in readings.items():
+        # max() keeps the earliest frame's reading on ties
+        values, scores = max(candidates.items(), key=lambda item: (sum(item[1]), len(item[1])))
+        stats[name] = values
+        confidence[name] = round(1 - math.prod(1 - score for score in scores), 3)
+
+    if "on target" in stats and "off target" in stats:
+        parts = [stats["on target"], stats["off target"]]
+        numbers = [(_number(home), _number(away)) for home, away in parts]
+        if all(value is not None for pair in numbers for value in pair):
+            home_total = sum(int(home) for home, _ in numbers)
+            away_total = sum(int(away) for _, away in numbers)
+            stats["shots"] = (str(home_total), str(away_total))
+            confidence["shots"] = min(confidence["on target"], confidence["off target"])
+    if "shots" in stats:
+        # The OCR binary lists total shots first
+        stats = {"shots": stats.pop("shots"), **stats}
+
+    return {
+        "home_team": _team([result.get("home_team") for result in results]),
+        "away_team": _team([result.get("away_team") for result in results]),
+        "stats": stats,
+        "confidence": confidence,
+    }
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Stages in pipeline order; the summary table lists them in this order
+STAGES = ("ocr_cache", "frames", "preprocess", "ocr", "ocr_parse", "ocr_merge", "history", "stat_extraction", "prompt_render", "llm")
+
+
+class RunProfile:
+    """
+    Wall time per stage plus the OCR exit status, token usage and retries of one match.
+    Entering the same stage twice adds to its total. Profiles are plain attributes so
+    they can be returned from OCR process-pool workers and merged back.
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.wall_seconds: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+        self.status = "incomplete"
+        self.error: Optional[str] = None
+        self.ocr_source: Optional[str] = None  # "cache", "worker" or "process"
+        self.ocr_exit_status: Optional[int] = None
+        self.llm_source: Optional[str] = None  # "api" or "cache"
+        self.llm_backend: Optional[str] = None  # backend whose answer was used
+        self.llm_hedged = False
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.time_to_first_token: Optional[float] = None
+        self.prompt_estimate: Optional[int] = None  # local estimate before sending
+        self.prompt_saved = 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record_usage(self, usage) -> None:
+        """Add the token counts of a completion's `usage` object (or dict); None is ignored."""
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+        else:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def merge(self, other: "RunProfile") -> None:
+        """Fold in a profile recorded elsewhere (e.g. by an OCR worker process)."""
+        for name, seconds in other.stages.items():
+            self.add_stage(name, seconds)
+        self.ocr_source = other.ocr_source or self.ocr_source
+        if other.ocr_exit_status is not None:
+            self.ocr_exit_status = other.ocr_exit_status
+
+    def finish(self, status: str = "ok", error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.wall_seconds = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "label": self.label,
+            "started_at": round(self.started_at, 3),
+            "status": self.status,
+            "error": self.error,
+            "wall_seconds": None if self.wall_seconds is None else round(self.wall_seconds, 6),
+            "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "ocr_source": self.ocr_source,
+            "ocr_exit_status": self.ocr_exit_status,
+            "llm_source": self.llm_source,
+            "llm_backend": self.llm_backend,
+            "llm_hedged": self.llm_hedged,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "time_to_first_token": self.time_to_first_token,
+            "prompt_estimate": self.prompt_estimate,
+            "prompt_saved": self.prompt_saved,
+        }
+
+
+def timed(profile: Optional[RunProfile], name: str):
+    """profile.stage(name), or a no-op when profiling is off."""
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+_write_lock = threading.Lock()
+
+
+def append_run_log(path: str, mode: str, profiles: Sequence[RunProfile]) -> str:
+    """Append one JSON line per match, all sharing a run id. Returns the run id."""
+    run_id = uuid.uuid4().hex[:12]
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = [
+        json.dumps({"run_id": run_id, "mode": mode, **profile.to_dict()}, separators=(",", ":"))
+        for profile in profiles
+    ]
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write("".join(line + "\n" for line in lines))
+    return run_id
+
+
+def _ordered_stages(profiles: Sequence[RunProfile]) -> List[str]:
+    seen = {name for profile in profiles for name in profile.stages}
+    return [name for name in STAGES if name in seen] + sorted(seen.difference(STAGES))
+
+
+def write_prometheus(path: str, mode: str, profiles: Sequence[RunProfile], wall_seconds: float) -> None:
+    """
+    Write the last run in the Prometheus textfile-collector format (node_exporter
+    --collector.textfile). The file is replaced atomically so scrapes never see half of it.
+    """
+    label = f'mode="{mode}"'
+    lines = [
+        "# HELP fmnarrative_run_seconds Wall time of the last run.",
+        "# TYPE fmnarrative_run_seconds gauge",
+        f"fmnarrative_run_seconds{{{label}}} {wall_seconds:.6f}",
+        "# HELP fmnarrative_run_timestamp_seconds Unix time the last run finished.",
+        "# TYPE fmnarrative_run_timestamp_seconds gauge",
+        f"fmnarrative_run_timestamp_seconds{{{label}}} {time.time():.3f}",
+        "# HELP fmnarrative_matches Matches processed in the last run by status.",
+        "# TYPE fmnarrative_matches gauge",
+    ]
+    for status in sorted({profile.status for profile in profiles}):
+        count = sum(1 for profile in profiles if profile.status == status)
+        lines.append(f'fmnarrative_matches{{{label},status="{status}"}} {count}')
+
+    lines += [
+        "# HELP fmnarrative_stage_seconds Time spent per stage in the last run, summed over matches.",
+        "# TYPE fmnarrative_stage_seconds gauge",
+    ]
+    for name in _ordered_stages(profiles):
+        total = sum(profile.stages.get(name, 0.0) for profile in profiles)
+        lines.append(f'fmnarrative_stage_seconds{{{label},stage="{name}"}} {total:.6f}')
+
+    lines += [
+        "# HELP fmnarrative_tokens Tokens used in the last run.",
+        "# TYPE fmnarrative_tokens gauge",
+        f'fmnarrative_tokens{{{label},kind="prompt"}} {sum(p.prompt_tokens for p in profiles)}',
+        f'fmnarrative_tokens{{{label},kind="completion"}} {sum(p.completion_tokens for p in profiles)}',
+        "# HELP fmnarrative_llm_retries API retries in the last run.",
+        "# TYPE fmnarrative_llm_retries gauge",
+        f"fmnarrative_llm_retries{{{label}}} {sum(p.retries for p in profiles)}",
+    ]
+    backends = sorted({profile.llm_backend for profile in profiles if profile.llm_backend})
+    if backends:
+        lines += [
+            "# HELP fmnarrative_llm_answers Completions used in the last run by the backend that answered.",
+            "# TYPE fmnarrative_llm_answers gauge",
+        ]
+        lines += [f'fmnarrative_llm_answers{{{label},backend="{name}"}} '
+                  f'{sum(1 for p in profiles if p.llm_backend == name)}' for name in backends]
+    lines += [
+        "# HELP fmnarrative_ocr_failures OCR processes that exited non-zero in the last run.",
+        "# TYPE fmnarrative_ocr_failures gauge",
+        f"fmnarrative_ocr_failures{{{label}}} {sum(1 for p in profiles if p.ocr_exit_status)}",
+    ]
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def format_summary(profiles: Sequence[RunProfile], wall_seconds: float) -> str:
+    """Per-stage table (matches, total, mean, max, share of stage time) followed by token and OCR totals."""
+    stage_total = sum(sum(profile.stages.values()) for profile in profiles) or 1.0
+    rows = [f"{'stage':<16}{'n':>5}{'total s':>10}{'mean s':>10}{'max s':>10}{'share':>8}"]
+    for name in _ordered_stages(profiles):
+        values = [profile.stages[name] for profile in profiles if name in profile.stages]
+        total = sum(values)
+        rows.append(f"{name:<16}{len(values):>5}{total:>10.3f}{total / len(values):>10.3f}"
+                    f"{max(values):>10.3f}{total / stage_total * 100:>7.1f}%")
+
+    prompt_tokens = sum(profile.prompt_tokens for profile in profiles)
+    completion_tokens = sum(profile.completion_tokens for profile in profiles)
+    api_calls = sum(1 for profile in profiles if profile.llm_source == "api")
+    rows.append("")
+    rows.append(f"wall time {wall_seconds:.3f}s for {len(profiles)} match(es)")
+    rows.append(f"tokens: {prompt_tokens} prompt + {completion_tokens} completion over {api_calls} API call(s), "
+                f"{sum(profile.retries for profile in profiles)} retries")
+    estimates = [profile.prompt_estimate for profile in profiles if profile.prompt_estimate is not None]
+    if estimates:
+        rows.append(f"prompts: ~{sum(estimates)} tokens estimated locally, "
+                    f"{sum(profile.prompt_saved for profile in profiles)} saved by the prompt compiler")
+
+    backends: Dict[str, int] = {}
+    for profile in profiles:
+        if profile.llm_backend:
+            backends[profile.llm_backend] = backends.get(profile.llm_backend, 0) + 1
+    if backends:
+        rows.append("llm backends: " + ", ".join(f"{count} {name}" for name, count in sorted(backends.items()))
+                    + f", {sum(1 for profile in profiles if profile.llm_hedged)} hedged")
+
+    sources: Dict[str, int] = {}
+    for profile in profiles:
+        if profile.ocr_source:
+            sources[profile.ocr_source] = sources.get(profile.ocr_source, 0) + 1
+    failed = [profile.ocr_exit_status for profile in profiles if profile.ocr_exit_status]
+    if sources:
+        rows.append("ocr: " + ", ".join(f"{count} {source}" for source, count in sorted(sources.items()))
+                    + (f", non-zero exits {failed}" if failed else ""))
+    return "\n".join(rows)
@@ -1,45 +1,190 @@
 import os
-from groq import Groq
-from dotenv import load_dotenv
+import csv
+import json
+import time
+import base64
+import hashlib
+import itertools
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import subprocess
-from typing import Optional, Dict, Tuple
+from typing import TYPE_CHECKING, Optional, Dict, Tuple, List, Callable, Union
+from ocr_pool import OCRWorkerPool, WorkerModeUnsupported
+from cache import LLMResponseCache, OCRCache, file_sha256
+from instrumentation import RunProfile, append_run_log, format_summary, timed, write_prometheus
+from scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimitedScheduler, estimate_tokens
+from backends import Backend, HedgedRouter, api_errors, load_backends
+from prompt_compiler import CompiledPrompt, PromptLine, PromptSection, compile_prompt
+from store import MatchStore, describe_match, history_lines
+from watcher import DirectoryWatcher, Manifest
 
-load_dotenv()
+if TYPE_CHECKING:
+    import numpy as np
+    import preprocess
+    import service
 
-# Initialize Groq client
-api_key = os.getenv("GROQ_API_KEY")
-if api_key is None:
-    raise ValueError("GROQ_API_KEY environment variable not set.")
-client = Groq(api_key=api_key)
+# Importing this module has no side effects and stays cheap, so OCR process-pool workers
+# and tools that only need the parsers start fast. The heavy dependencies are imported
+# where they are first needed: groq and python-dotenv by get_router/load_env, numpy with
+# the metrics, OpenCV with preprocess, asyncio with the HTTP service.
 
+__version__ = "0.5.0"
 
-def _try_run_ocr(image_path: str) -> Optional[Dict[str, object]]:
+LLM_TIMEOUT = 60.0
+# Seconds OCR may spend on one image (--ocr-timeout), in a worker or a one-shot process
+OCR_TIMEOUT = 60.0
+LLM_MODEL = "llama-3.3-70b-versatile"
+# Approximate prompt tokens allowed per match before low-priority lines are dropped
+DEFAULT_PROMPT_BUDGET = 800
+# Questions in a multi-turn press conference (--session), and the completion cap per question
+DEFAULT_SESSION_TURNS = 20
+SESSION_MAX_TOKENS = 120
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+
+def _default_state_dir() -> str:
+    """Local state (caches) lives next to the script unless FMNARRATIVE_HOME says otherwise."""
+    return os.getenv("FMNARRATIVE_HOME") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fmnarrative")
+
+
+STATE_DIR = _default_state_dir()
+
+_env_loaded = False
+_router: Optional[HedgedRouter] = None
+_backends_path: Optional[str] = None
+_router_lock = threading.Lock()
+_scheduler: Optional[RateLimitedScheduler] = None
+_scheduler_limits: Dict[str, float] = {}
+_scheduler_lock = threading.Lock()
+
+
+def load_env() -> None:
+    """Read .env into the environment (once), then re-resolve STATE_DIR in case it set FMNARRATIVE_HOME."""
+    global _env_loaded, STATE_DIR
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+    STATE_DIR = _default_state_dir()
+
+
+def require_api_key() -> str:
+    load_env()
+    api_key = os.getenv("GROQ_API_KEY")
+    if api_key is None:
+        raise ValueError("GROQ_API_KEY environment variable not set.")
+    return api_key
+
+
+def configure_backends(path: Optional[str]) -> None:
     """
-    Run the C++ OCR binary (expected at ./build/ocr or ./ocr) and parse its output.
-    Returns a dict with keys: home_team, away_team, stats (mapping stat -> (home, away)).
-    On failure, returns None.
+    Ask the LLM backends listed in the JSON file at `path` (see backends.load_backends)
+    instead of FMNARRATIVE_BACKENDS, or Groq's LLM_MODEL alone when neither is set.
+    The router is (re)built on its next use.
+    """
+    global _router, _backends_path
+    with _router_lock:
+        _backends_path = path
+        _router = None
+
+
+def get_router() -> HedgedRouter:
+    """
+    The shared backend router, built on first use. Its clients keep their HTTP connections
+    open, so every later call in the process reuses them. Raises ValueError for a bad
+    backends file or a missing API key.
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            load_env()
+            path = _backends_path or os.getenv("FMNARRATIVE_BACKENDS")
+            if path:
+                backends = load_backends(path)
+            else:
+                backends = [Backend("groq", LLM_MODEL, api_key=require_api_key(), timeout=LLM_TIMEOUT)]
+            _router = HedgedRouter(backends, os.path.join(STATE_DIR, "backend_latency.json"))
+        return _router
+
+
+# Static system prefix of every reporter prompt. It never varies between matches,
+# so providers that cache prompt prefixes only process the match section each time.
+SYSTEM_PROMPT = """You are a football press conference reporter.
+
+For the match you are given, generate 5 realistic press conference questions a reporter might ask based on its comprehensive stats and the match importance.
+
+GUIDELINES:
+- You are an experienced, insightful football journalist who asks probing questions that reveal deeper truths
+- Use the detailed statistics to ask specific, data-driven questions about tactical decisions and performance
+- Focus on the psychological, tactical, and emotional aspects of the match rather than basic facts
+- Ask about decision-making, team mentality, pressure handling, and strategic choices
+- Consider the broader narrative: What does this result mean for the season? How does it change expectations?
+- DO NOT invent or assume details not provided (like the fashion in which goals were scored or specific incidents)
+- Base questions on the comprehensive stats provided, exploring their deeper tactical and psychological implications
+- Ask questions that would make a manager think deeply about their approach and decisions
+- Consider efficiency metrics (shot accuracy, xG efficiency) and what they reveal about performance
+- Make each question feel like it comes from someone who truly understands football's tactical complexities
+- Stats that are not listed were unavailable, zero for both teams or left out for length; do not ask about them
+
+QUESTION THEMES TO EXPLORE:
+- How tactical decisions influenced statistical outcomes (possession vs shots, defensive vs attacking approach)
+- The correlation between stats and result (high possession but low shots, good xG but poor finishing, etc.)
+- Physical and tactical intensity revealed by sprints, tackles, headers
+- Team discipline and its impact on the match flow
+- Efficiency in different phases of play (attacking, defending, set pieces)
+- The psychological impact of the statistical performance on team confidence
+
+Only ask the questions - no introduction or commentary.
+"""
+
+# Static system prefix of a multi-turn press conference (--session); see session.PressConference
+SESSION_PROMPT = """You are an experienced football journalist at a manager's post-match press conference.
+
+You are given the match briefing, then the press conference so far: earlier exchanges summarised, the most recent ones word for word, with the manager's answers.
+
+GUIDELINES:
+- Ask exactly one question per turn, in one or two sentences
+- Build on what the manager actually said: challenge evasive answers, pick up on admissions, connect answers to the stats
+- Use the detailed statistics for specific, data-driven questions about tactics, mentality and the season
+- DO NOT invent or assume details not provided in the briefing or the answers
+- Stats that are not listed were unavailable, zero for both teams or left out for length; do not ask about them
+- Never repeat a question that was already asked
+
+Only ask the question - no numbering, introduction or commentary.
+"""
+
+
+def _find_ocr_binary() -> Optional[str]:
     """
+    Locate the C++ OCR binary (expected at ./build/ocr or ./ocr). FMNARRATIVE_OCR_BINARY
+    points at another executable instead, such as bench/fake_ocr.py.
+    """
+    override = os.environ.get("FMNARRATIVE_OCR_BINARY")
+    if override:
+        return override if os.path.exists(override) and os.access(override, os.X_OK) else None
     candidates = [
         os.path.abspath(os.path.join(os.path.dirname(__file__), "build/ocr")),
         os.path.abspath(os.path.join(os.path.dirname(__file__), "ocr")),
     ]
-    binary = next((p for p in candidates if os.path.exists(p) and os.access(p, os.X_OK)), None)
-    if binary is None:
-        return None
+    return next((p for p in candidates if os.path.exists(p) and os.access(p, os.X_OK)), None)
 
-    try:
-        proc = subprocess.run([binary, image_path], capture_output=True, text=True, check=False)
-    except Exception:
-        return None
-
-    if proc.returncode != 0:
-        return None
 
+def _parse_ocr_output(output: str) -> Optional[Dict[str, object]]:
+    """
+    Parse HOME_TEAM:/AWAY_TEAM:/STAT: records printed by the OCR binary.
+    STAT records may carry a fourth field, the binary's 0-100 confidence in the values,
+    which ends up in "confidence" as a 0-1 fraction (older builds print none).
+    """
     home_team = None
     away_team = None
     stats: Dict[str, Tuple[str, str]] = {}
+    confidence: Dict[str, float] = {}
 
-    for raw_line in proc.stdout.splitlines():
+    for raw_line in output.splitlines():
         line = raw_line.strip()
         if not line:
             continue
@@ -55,6 +200,8 @@ def _try_run_ocr(image_path: str) -> Optional[Dict[str, object]]:
                 home_val = parts[1].strip()
                 away_val = parts[2].strip()
                 stats[stat_name] = (home_val, away_val)
+                if len(parts) >= 4 and parts[3].strip().isdigit():
+                    confidence[stat_name] = min(int(parts[3]), 100) / 100
 
     if not home_team and not away_team and not stats:
         return None
@@ -63,9 +210,200 @@ def _try_run_ocr(image_path: str) -> Optional[Dict[str, object]]:
         "home_team": home_team,
         "away_team": away_team,
         "stats": stats,
+        "confidence": confidence,
     }
 
 
+def start_ocr_pool(size: int, timeout: float = OCR_TIMEOUT) -> Optional[OCRWorkerPool]:
+    """
+    Start `size` persistent OCR workers.
+    Returns None when there is no binary or it does not support --worker, in which
+    case callers fall back to one-shot invocations of _try_run_ocr.
+    """
+    binary = _find_ocr_binary()
+    if binary is None:
+        return None
+    try:
+        return OCRWorkerPool(binary, size=size, timeout=timeout)
+    except (WorkerModeUnsupported, OSError):
+        return None
+
+
+def _try_run_ocr(image_path: str, pool: Optional[OCRWorkerPool] = None,
+                 profile: Optional[RunProfile] = None, preprocess_image: bool = False,
+                 timeout: float = OCR_TIMEOUT) -> Optional[Dict[str, object]]:
+    """
+    Run the C++ OCR binary (expected at ./build/ocr or ./ocr) and parse its output.
+    With a worker pool the image is handed to an already running worker instead of
+    spawning a new process, which is killed after `timeout` seconds (a pool applies its own).
+    With preprocess_image=True (and OpenCV installed) OCR reads a grayscale copy cropped
+    to the stats screen and scaled down to preprocess.TARGET_HEIGHT instead of the
+    original: the frame the binary would build from the original itself.
+    Returns a dict with keys: home_team, away_team, stats (mapping stat -> (home, away)) and
+    confidence (mapping stat -> 0-1, for the stats the binary reported a confidence for).
+    On failure, returns None.
+    """
+    if pool is None and _find_ocr_binary() is None:
+        return None
+
+    prepared = None
+    if preprocess_image:
+        import preprocess
+        if preprocess.available():
+            with timed(profile, "preprocess"):
+                prepared = preprocess.preprocess_screenshot(image_path, open_layout_cache())
+    try:
+        return _run_ocr_binary(prepared or image_path, pool, profile, timeout)
+    finally:
+        if prepared is not None:
+            try:
+                os.remove(prepared)
+            except OSError:
+                pass
+
+
+def _run_ocr_binary(image_path: str, pool: Optional[OCRWorkerPool],
+                    profile: Optional[RunProfile], timeout: float = OCR_TIMEOUT) -> Optional[Dict[str, object]]:
+    if pool is not None:
+        if profile is not None:
+            profile.ocr_source = "worker"
+        with timed(profile, "ocr"):
+            output = pool.run(image_path)
+        if output is None:
+            return None
+        with timed(profile, "ocr_parse"):
+            return _parse_ocr_output(output)
+
+    binary = _find_ocr_binary()
+    if binary is None:
+        return None
+
+    if profile is not None:
+        profile.ocr_source = "process"
+    try:
+        with timed(profile, "ocr"):
+            proc = subprocess.run([binary, image_path], capture_output=True, text=True, check=False,
+                                  timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # subprocess.run has killed it (SIGKILL); like a timed-out worker, the image has no result
+        if profile is not None:
+            profile.ocr_exit_status = -9
+        return None
+    except Exception:
+        return None
+
+    if profile is not None:
+        profile.ocr_exit_status = proc.returncode
+    if proc.returncode != 0:
+        return None
+
+    with timed(profile, "ocr_parse"):
+        return _parse_ocr_output(proc.stdout)
+
+
+def _profiled_ocr(image_path: str, pool: Optional[OCRWorkerPool] = None, preprocess_image: bool = False,
+                  timeout: float = OCR_TIMEOUT) -> Tuple[Optional[Dict[str, object]], RunProfile]:
+    """_try_run_ocr with its own profile, so timings survive a trip through a process pool."""
+    profile = RunProfile(os.path.basename(image_path))
+    return _try_run_ocr(image_path, pool, profile, preprocess_image, timeout), profile
+
+
+def open_ocr_cache() -> OCRCache:
+    return OCRCache(os.path.join(STATE_DIR, "ocr_cache"))
+
+
+_layout_cache: Optional["preprocess.LayoutCache"] = None
+
+
+def open_layout_cache() -> "preprocess.LayoutCache":
+    """Screen layouts learned per resolution, shared by every OCR call in this process."""
+    global _layout_cache
+    if _layout_cache is None:
+        import preprocess
+        _layout_cache = preprocess.LayoutCache(os.path.join(STATE_DIR, "layouts.json"))
+    return _layout_cache
+
+
+def _ocr_cache_key(image_path: str, cache: OCRCache, preprocess_image: bool = False) -> Optional[str]:
+    """Cache key for an image, or None when the binary or image cannot be read."""
+    binary = _find_ocr_binary()
+    if binary is None:
+        return None
+    variant = ""
+    if preprocess_image:
+        import preprocess
+        variant = preprocess.signature()
+    try:
+        return cache.key_for(image_path, binary, variant)
+    except OSError:
+        return None
+
+
+def run_ocr(image_path: str, cache: Optional[OCRCache] = None, pool: Optional[OCRWorkerPool] = None,
+            profile: Optional[RunProfile] = None, preprocess_image: bool = False,
+            timeout: float = OCR_TIMEOUT) -> Optional[Dict[str, object]]:
+    """_try_run_ocr behind the on-disk OCR cache. Pass cache=None to bypass it."""
+    with timed(profile, "ocr_cache"):
+        key = _ocr_cache_key(image_path, cache, preprocess_image) if cache is not None else None
+        cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        if profile is not None:
+            profile.ocr_source = "cache"
+        return cached
+
+    ocr_data = _try_run_ocr(image_path, pool, profile, preprocess_image, timeout)
+    if key is not None and ocr_data:
+        with timed(profile, "ocr_cache"):
+            cache.put(key, ocr_data)
+    return ocr_data
+
+
+def run_match_ocr(inputs: List[str], cache: Optional[OCRCache] = None, pool: Optional[OCRWorkerPool] = None,
+                  profile: Optional[RunProfile] = None, preprocess_image: bool = False,
+                  workers: Optional[int] = None) -> Optional[Dict[str, object]]:
+    """
+    OCR for one match captured in several screenshots and/or screen recordings.
+    Recordings are sampled, duplicate screenshots and frames are dropped before OCR (see
+    ingest.collect_frames), and the rest are read in parallel (`workers` at a time,
+    default one per CPU) and merged by ingest.merge_ocr_results. The result also has
+    "frames": the number of frames read and of duplicates skipped.
+    A single screenshot goes straight to run_ocr. Raises ValueError for an unreadable recording.
+    """
+    import ingest
+    if len(inputs) == 1 and not inputs[0].lower().endswith(ingest.VIDEO_EXTENSIONS):
+        return run_ocr(inputs[0], cache, pool, profile, preprocess_image)
+
+    with tempfile.TemporaryDirectory(prefix="fmn-frames-") as frame_dir:
+        with timed(profile, "frames"):
+            frames, duplicates = ingest.collect_frames(inputs, frame_dir)
+        if not frames:
+            return None
+        frame_profiles = [RunProfile(os.path.basename(frame.path)) for frame in frames]
+
+        def read(index: int) -> Optional[Dict[str, object]]:
+            return run_ocr(frames[index].path, cache, pool, frame_profiles[index], preprocess_image)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(frames), workers or os.cpu_count() or 1))) as executor:
+            results = list(executor.map(read, range(len(frames))))
+
+    if profile is not None:
+        # Stage times are summed over frames, so they can exceed the wall time
+        for frame_profile in frame_profiles:
+            profile.merge(frame_profile)
+    with timed(profile, "ocr_merge"):
+        merged = ingest.merge_ocr_results(results)
+    if merged is not None:
+        merged["frames"] = {"read": len(frames), "duplicates": duplicates}
+    return merged
+
+
+def inputs_hash(paths: List[str]) -> str:
+    """file_sha256 of a single input; for several, a hash over theirs in any order."""
+    if len(paths) == 1:
+        return file_sha256(paths[0])
+    return hashlib.sha256("|".join(sorted(file_sha256(path) for path in paths)).encode()).hexdigest()
+
+
 def _parse_numeric(value: str) -> Optional[float]:
     """Parse numeric values from OCR output, handling percentages and complex formats."""
     if not value:
@@ -94,19 +432,791 @@ def extract_score_from_stats(stats: Dict[str, Tuple[str, str]]) -> Optional[Tupl
     return None
 
 
-def main():
-    # Get screenshot - REQUIRED
-    image_path = input("Enter the path to your match screenshot: ").strip()
-    if not image_path:
+# Every stat read from the match stats screen:
+# (field, OCR stat names in priority order, default, cast to int, display label, shown as %)
+STAT_FIELDS = (
+    ("shots", ("shots",), 0, True, "Total Shots", False),
+    ("shots_target", ("on target",), 0, True, "Shots on Target", False),
+    ("xg", ("xg",), 0.0, False, "Expected Goals (xG)", False),
+    ("shots_off", ("off target",), 0, True, "Shots off Target", False),
+    ("clear_chances", ("clear cut chances",), 0, True, "Clear Cut Chances", False),
+    ("long_shots", ("long shots",), 0, True, "Long Shots", False),
+    ("possession", ("possession",), 50, True, "Possession", True),
+    ("corners", ("corners",), 0, True, "Corners", False),
+    ("fouls", ("fouls",), 0, True, "Fouls", False),
+    ("offsides", ("offsides",), 0, True, "Offsides", False),
+    ("passes_comp", ("passes completed",), 50, False, "Passes Completed", True),
+    ("crosses_comp", ("crosses completed",), 0, False, "Crosses Completed", True),
+    ("tackles_won", ("tackles won",), 50, False, "Tackles Won", True),
+    ("headers_won", ("headers won",), 50, False, "Headers Won", True),
+    ("yellow", ("yellow cards",), 0, True, "Yellow Cards", False),
+    ("red", ("red cards",), 0, True, "Red Cards", False),
+    ("rating", ("average rating",), 6.5, False, "Average Rating", False),
+    ("prog_passes", ("progressive passes",), 0, True, "Progressive Passes", False),
+    ("sprints", ("high intensity sprints",), 0, True, "High Intensity Sprints", False),
+)
+STAT_INDEX = {field[0]: i for i, field in enumerate(STAT_FIELDS)}
+# OCR stat name -> (field index, priority among that field's names)
+_STAT_ALIASES = {
+    alias: (i, rank)
+    for i, field in enumerate(STAT_FIELDS)
+    for rank, alias in enumerate(field[1])
+}
+
+
+class MatchStats:
+    """
+    Home and away columns for every field in STAT_FIELDS, plus the score.
+    Values are stored in two lists indexed by STAT_INDEX; `found` marks the fields
+    that were read from OCR rather than filled with their default.
+    """
+    __slots__ = ("home", "away", "found", "home_score", "away_score")
+
+    def __init__(self, home: List[float], away: List[float], found: List[bool],
+                 home_score: int = 0, away_score: int = 0):
+        self.home = home
+        self.away = away
+        self.found = found
+        self.home_score = home_score
+        self.away_score = away_score
+
+    @classmethod
+    def from_ocr(cls, stats: Dict[str, Tuple[str, str]], home_score: int = 0, away_score: int = 0) -> "MatchStats":
+        """Build from the OCR `stats` dict in a single pass, falling back to each field's default."""
+        home = [field[2] for field in STAT_FIELDS]
+        away = [field[2] for field in STAT_FIELDS]
+        found = [False] * len(STAT_FIELDS)
+        best_rank = [len(field[1]) for field in STAT_FIELDS]
+
+        for name, (raw_home, raw_away) in stats.items():
+            alias = _STAT_ALIASES.get(name)
+            if alias is None:
+                continue
+            i, rank = alias
+            if rank >= best_rank[i]:
+                continue
+            home_val = _parse_numeric(raw_home)
+            away_val = _parse_numeric(raw_away)
+            if home_val is None or away_val is None:
+                continue
+            best_rank[i] = rank
+            found[i] = True
+            home[i], away[i] = home_val, away_val
+
+        for i, field in enumerate(STAT_FIELDS):
+            if field[3]:
+                home[i], away[i] = int(home[i]), int(away[i])
+
+        return cls(home, away, found, home_score, away_score)
+
+    def for_manager(self, is_home: bool) -> "MatchStatsView":
+        return MatchStatsView(self, is_home)
+
+
+class MatchStatsView:
+    """A MatchStats seen from the manager's side; flipping perspective copies nothing."""
+    __slots__ = ("stats", "mine", "theirs", "is_home")
+
+    def __init__(self, stats: MatchStats, is_home: bool):
+        self.stats = stats
+        self.is_home = is_home
+        self.mine = stats.home if is_home else stats.away
+        self.theirs = stats.away if is_home else stats.home
+
+    def pair(self, field: str) -> Tuple[float, float]:
+        """(manager value, opponent value) for a STAT_FIELDS field."""
+        i = STAT_INDEX[field]
+        return self.mine[i], self.theirs[i]
+
+    def manager(self, field: str) -> float:
+        return self.mine[STAT_INDEX[field]]
+
+    def opponent(self, field: str) -> float:
+        return self.theirs[STAT_INDEX[field]]
+
+    @property
+    def manager_score(self) -> int:
+        return self.stats.home_score if self.is_home else self.stats.away_score
+
+    @property
+    def opponent_score(self) -> int:
+        return self.stats.away_score if self.is_home else self.stats.home_score
+
+
+def print_match_stats(view: MatchStatsView, manager_team: str, opponent_team: str) -> None:
+    """Print every stat from the manager's perspective."""
+    print(f"Your Team ({manager_team}) vs Opponent ({opponent_team})")
+    for i, (_, _, _, _, label, percent) in enumerate(STAT_FIELDS):
+        suffix = "%" if percent else ""
+        print(f"{label}: {view.mine[i]}{suffix} vs {view.theirs[i]}{suffix}")
+
+
+def stage_importance(setting: str, stage: str, home_or_away: str) -> Optional[float]:
+    """
+    Importance of a match from its setting and stage, before any derby adjustment.
+    Returns None for an unknown setting.
+    """
+    if setting == "ucl":
+        stage_scores = {
+            'league phase': 2, 'ro32': 4, 'ro16': 5, 
+            'qf': 6, 'sf': 8, 'final': 10
+        }
+        importance = stage_scores.get(stage, 2)
+        # Adjust importance for away UCL matches
+        if home_or_away == 'away' and stage not in ['league phase', 'final']:
+            importance *= 1.3
+        return importance
+    if setting == "domestic cup":
+        stage_scores = {'qf': 2, 'sf': 3, 'final': 4}
+        return stage_scores.get(stage, 2)
+    if setting == "derby":
+        return 5  # Will be calculated later based on points
+    return None
+
+
+def derby_importance(home_team_points: int, away_team_points: int, match_number: int) -> float:
+    """Importance of a league derby from the points gap before the match and the point in the season."""
+    point_diff_before = abs(home_team_points - away_team_points)
+    
+    if match_number <= 8:
+        season_multiplier = 0.8
+    elif match_number <= 24:
+        season_multiplier = 1.0
+    else:
+        season_multiplier = 1.3
+    
+    if point_diff_before <= 3:
+        base_importance = 7
+    elif point_diff_before <= 10:
+        base_importance = 5
+    else:
+        base_importance = 3
+    
+    return base_importance * season_multiplier
+
+
+def _match_columns(match: MatchStats, manager_is_home: bool, importance: float) -> Dict[str, "np.ndarray"]:
+    """Metrics input columns for a single match."""
+    import numpy as np
+    from metrics import perspective_columns
+    return perspective_columns(
+        np.array([match.home], dtype=np.float64), np.array([match.away], dtype=np.float64),
+        np.array([match.home_score]), np.array([match.away_score]),
+        np.array([manager_is_home]), np.array([importance], dtype=np.float64), STAT_INDEX,
+    )
+
+
+def stats_vector(match: MatchStats) -> bytes:
+    """Home then away values packed as float64, as kept in the match store."""
+    import numpy as np
+    return np.array(match.home + match.away, dtype=np.float64).tobytes()
+
+
+def load_season(store: MatchStore, manager_team: str, before: Optional[str] = None,
+                exclude_hash: Optional[str] = None) -> Optional[Dict[str, "np.ndarray"]]:
+    """
+    Metric table for every stored match managed by `manager_team`, or None if there are none.
+    The screenshot with `exclude_hash` (the match being analysed) is left out.
+    Packed stats vectors are stacked directly; older rows without one are re-parsed.
+    """
+    rows = store.season_rows(manager_team, before, exclude_hash)
+    if not rows:
+        return None
+    import numpy as np
+    from metrics import metric_table, perspective_columns
+
+    width = len(STAT_FIELDS)
+    blobs = [row["stats_vector"] for row in rows]
+    if all(blob is not None and len(blob) == 16 * width for blob in blobs):
+        matrix = np.frombuffer(b"".join(blobs), dtype=np.float64).reshape(len(rows), 2 * width)
+    else:
+        matrix = np.empty((len(rows), 2 * width))
+        for i, row in enumerate(rows):
+            if blobs[i] is not None and len(blobs[i]) == 16 * width:
+                matrix[i] = np.frombuffer(blobs[i], dtype=np.float64)
+            else:
+                match = MatchStats.from_ocr({name: tuple(pair) for name, pair in json.loads(row["stats"]).items()})
+                matrix[i] = match.home + match.away
+
+    columns = perspective_columns(
+        matrix[:, :width], matrix[:, width:],
+        np.array([row["home_score"] for row in rows]), np.array([row["away_score"] for row in rows]),
+        np.array([row["home_or_away"] != "away" for row in rows]),
+        np.array([row["importance"] or 0 for row in rows], dtype=np.float64), STAT_INDEX,
+    )
+    return metric_table(columns)
+
+
+def _vs(view: MatchStatsView, label: str, field: str, suffix: str = "") -> str:
+    """One "Label: manager vs opponent" prompt line."""
+    mine, theirs = view.pair(field)
+    return f"{label}: {mine}{suffix} vs {theirs}{suffix}"
+
+
+# Stat lines of the prompt in display order: (field, label, priority under a token budget).
+# "shot_accuracy" and "xg_efficiency" are derived from the fields listed before them.
+PROMPT_STATS = (
+    ("shots", "Total Shots", 80),
+    ("shots_target", "Shots on Target", 80),
+    ("shot_accuracy", "Shot Accuracy", 70),
+    ("xg", "Expected Goals (xG)", 85),
+    ("xg_efficiency", "xG Efficiency", 70),
+    ("clear_chances", "Clear Cut Chances", 65),
+    ("long_shots", "Long Shots", 35),
+    ("possession", "Possession", 75),
+    ("corners", "Corners", 35),
+    ("fouls", "Fouls", 40),
+    ("offsides", "Offsides", 30),
+    ("passes_comp", "Pass Completion", 55),
+    ("crosses_comp", "Cross Completion", 35),
+    ("tackles_won", "Tackles Won", 50),
+    ("headers_won", "Headers Won", 40),
+    ("yellow", "Yellow Cards", 45),
+    ("red", "Red Cards", 60),
+    ("rating", "Average Rating", 50),
+    ("prog_passes", "Progressive Passes", 45),
+    ("sprints", "High Intensity Sprints", 45),
+)
+
+
+def _stat_line(view: MatchStatsView, field: str, label: str, priority: int,
+               current: Dict[str, float]) -> PromptLine:
+    """
+    One stat line of the prompt. It is informative only when OCR actually read the
+    stat (not a default) and at least one side is non-zero.
+    """
+    found = view.stats.found
+    if field == "shot_accuracy":
+        i = STAT_INDEX["shots"]
+        text = (f"{label}: {current['manager_shot_accuracy']:.1f}% vs {current['opp_shot_accuracy']:.1f}%")
+        informative = found[i] and found[STAT_INDEX["shots_target"]] and (view.mine[i] or view.theirs[i]) > 0
+        return PromptLine(text, priority, bool(informative))
+    if field == "xg_efficiency":
+        i = STAT_INDEX["xg"]
+        text = (f"{label}: {current['manager_xg_efficiency']:.1f}% vs {current['opp_xg_efficiency']:.1f}%")
+        return PromptLine(text, priority, bool(found[i] and (view.mine[i] or view.theirs[i]) > 0))
+
+    i = STAT_INDEX[field]
+    suffix = "%" if STAT_FIELDS[i][5] else ""
+    informative = found[i] and (view.mine[i] != 0 or view.theirs[i] != 0)
+    return PromptLine(_vs(view, label, field, suffix), priority, bool(informative))
+
+
+def build_prompt(home_team: str, away_team: str, home_score: int, away_score: int,
+                 stats: Dict[str, Tuple[str, str]], context: Dict[str, object],
+                 verbose: bool = False, season: Optional[Dict[str, "np.ndarray"]] = None,
+                 profile: Optional[RunProfile] = None, budget: Optional[int] = None,
+                 compact: bool = True, system: str = SYSTEM_PROMPT) -> CompiledPrompt:
+    """
+    Build the press conference prompt for one match: `system` (SYSTEM_PROMPT, or
+    SESSION_PROMPT for a multi-turn session) as a static prefix and the match itself
+    as the user message.
+    `context` holds the answers that cannot be read from the screenshot: setting,
+    home_or_away, importance, home_goal_scorers and away_goal_scorers, plus optional
+    history lines from the match store. `season` is the metric table of the manager's
+    earlier matches (see load_season); when given, season rankings are added.
+    Stats OCR did not read, 0 vs 0 stats and empty scorer lines are left out unless
+    compact=False; with a `budget` (approximate tokens) the least important lines go next.
+    With verbose=True the extracted stats and the token savings are printed.
+    A profile records stat extraction and the rest of the rendering as separate stages.
+    """
+    from metrics import (AGGRESSION_GAP_LABELS, CARD_LABELS, ENTERTAINMENT_LABELS, IMPORTANCE_LABELS,
+                         metric_table, season_highlights)
+    setting = context["setting"]
+    home_or_away = context["home_or_away"]
+    importance = context["importance"]
+    home_goal_scorers = context.get("home_goal_scorers", [])
+    away_goal_scorers = context.get("away_goal_scorers", [])
+
+    manager_is_home = home_or_away != "away"
+    manager_team = home_team if manager_is_home else away_team
+    opponent_team = away_team if manager_is_home else home_team
+    score = f"{home_score}-{away_score}"
+    history = context.get("history") or []
+    
+    # EXTRACT ALL OTHER DATA FROM OCR (left=home, right=away), then view it from the manager's side
+    with timed(profile, "stat_extraction"):
+        match = MatchStats.from_ocr(stats, home_score, away_score)
+    render_start = time.perf_counter()
+    view = match.for_manager(manager_is_home)
+    
+    if verbose:
+        print("\n--- Extracting stats from screenshot ---")
+        print_match_stats(view, manager_team, opponent_team)
+    
+    # Calculate derived metrics with the same engine used for the season archive
+    metrics = metric_table(_match_columns(match, manager_is_home, importance))
+    current = {name: float(values[0]) for name, values in metrics.items()}
+    
+    match_entertainment = ENTERTAINMENT_LABELS[int(current["entertainment"])]
+    importance_level = IMPORTANCE_LABELS[int(current["importance_level"])]
+    match_heat = CARD_LABELS[int(current["match_aggression"])]
+    
+    # Team aggression analysis
+    if current["aggression_gap"] > 0:
+        aggr_team, calmer_team = manager_team, opponent_team
+    else:
+        aggr_team, calmer_team = opponent_team, manager_team
+    
+    aggression_band = int(current["aggression_band"])
+    if aggression_band == 0:
+        aggression_analysis = "Both teams showed similar discipline"
+    else:
+        aggression_analysis = (f"{aggr_team} was {AGGRESSION_GAP_LABELS[aggression_band]} "
+                               f"more aggressive than {calmer_team}")
+    
+    manager_scorers = home_goal_scorers if manager_is_home else away_goal_scorers
+    opponent_scorers = away_goal_scorers if manager_is_home else home_goal_scorers
+    
+    # Rank this match against the manager's earlier stored matches
+    highlights = season_highlights(season, current) if season is not None else []
+    
+    sections = [
+        PromptSection("MATCH CONTEXT:", [
+            PromptLine(f"Setting: {setting.upper()}"),
+            PromptLine(f"Importance: {importance:.1f}/10 ({importance_level})"),
+            PromptLine(f"Match: {home_team} {score} {away_team} ({home_or_away})"),
+            PromptLine(f"The manager is managing {manager_team}"),
+        ]),
+        PromptSection(f"COMPREHENSIVE MATCH STATS ({manager_team} vs {opponent_team}):", [
+            PromptLine(f"Goals: {view.manager_score} vs {view.opponent_score}"),
+            *(_stat_line(view, field, label, priority, current) for field, label, priority in PROMPT_STATS),
+        ]),
+        PromptSection("GOAL SCORERS:", [
+            PromptLine(f"{manager_team}: {', '.join(manager_scorers) if manager_scorers else 'None'}",
+                       90, bool(manager_scorers)),
+            PromptLine(f"{opponent_team}: {', '.join(opponent_scorers) if opponent_scorers else 'None'}",
+                       90, bool(opponent_scorers)),
+        ]),
+        PromptSection("MATCH CHARACTER:", [
+            PromptLine(f"Team Discipline: {aggression_analysis}", 50),
+            PromptLine(f"Match Atmosphere: {match_heat}", 50),
+            PromptLine(f"Entertainment Value: {match_entertainment}", 55),
+        ]),
+        PromptSection("SEASON CONTEXT:", [PromptLine(line, 60) for line in history]
+                      + [PromptLine(line, 25) for line in highlights]),
+    ]
+    prompt = compile_prompt(system, sections, budget, compact)
+    
+    if verbose:
+        print(prompt.savings_line())
+    if profile is not None:
+        profile.add_stage("prompt_render", time.perf_counter() - render_start)
+        profile.prompt_estimate = prompt.tokens
+        profile.prompt_saved = prompt.saved_tokens
+    return prompt
+
+
+def open_match_store() -> MatchStore:
+    return MatchStore(os.path.join(STATE_DIR, "matches.db"))
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def open_llm_cache() -> LLMResponseCache:
+    return LLMResponseCache(os.path.join(STATE_DIR, "llm_cache"))
+
+
+def _question_request(prompt: Union[str, CompiledPrompt, List[Dict[str, str]]],
+                      max_tokens: Optional[int] = None) -> Dict[str, object]:
+    """
+    Chat completion request for a compiled prompt (system prefix plus match section),
+    a ready list of chat messages or a plain prompt string (see _cache_request for its cache key).
+    """
+    if isinstance(prompt, CompiledPrompt):
+        messages = prompt.messages()
+    elif isinstance(prompt, list):
+        messages = prompt
+    else:
+        messages = [{"role": "user", "content": prompt}]
+    request = {
+        "messages": messages,
+        "model": LLM_MODEL,
+    }
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+    return request
+
+
+def _cache_request(request: Dict[str, object], backend: Backend) -> Dict[str, object]:
+    """LLM cache key material: the request as `backend` receives it, and where it is sent."""
+    return {**request, "model": backend.model, "provider": backend.provider, "base_url": backend.base_url}
+
+
+def configure_scheduler(requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                        max_concurrency: Optional[int] = None) -> None:
+    """
+    Set the limits of the shared API scheduler, keeping the current ones for anything not
+    given. The scheduler itself is (re)built on its next use.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        for name, value in (("requests_per_minute", requests_per_minute),
+                            ("tokens_per_minute", tokens_per_minute), ("max_concurrency", max_concurrency)):
+            if value:
+                _scheduler_limits[name] = value
+        _scheduler = None
+
+
+def get_scheduler() -> RateLimitedScheduler:
+    """The shared API scheduler, built with the configured limits on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from groq import APIConnectionError
+            _scheduler = RateLimitedScheduler(transient=(APIConnectionError,), **_scheduler_limits)
+        return _scheduler
+
+
+def _retry_counter(profile: Optional[RunProfile]) -> Optional[Callable[[BaseException, float], None]]:
+    """on_retry callback that counts scheduler retries in a profile."""
+    if profile is None:
+        return None
+
+    def on_retry(exc: BaseException, delay: float) -> None:
+        profile.retries += 1
+
+    return on_retry
+
+
+def _chunk_usage(chunk):
+    """Token usage carried by a stream chunk: OpenAI-style `usage` or Groq's `x_groq.usage`."""
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+    return usage
+
+
+def generate_questions(prompt: Union[str, CompiledPrompt, List[Dict[str, str]]], cache: Optional[LLMResponseCache] = None, fresh: bool = False,
+                       profile: Optional[RunProfile] = None, priority: int = PRIORITY_INTERACTIVE,
+                       max_tokens: Optional[int] = None) -> str:
+    """
+    Ask the LLM for press conference questions and return the raw completion text.
+    With a cache, a byte-identical request is answered from disk (unless fresh=True)
+    and concurrent identical requests share a single API call; only answers from the
+    first backend are stored, under a key naming its model and endpoint.
+    Every request, hedges and fallbacks included, is admitted by the shared scheduler
+    at `priority` (batch jobs pass PRIORITY_BATCH) against its backend's account limits.
+    A profile records the call time, token usage, how many retries were needed and which
+    backend answered (see get_router for hedging and fallback between backends).
+    `max_tokens` caps the completion, which also lowers what the scheduler reserves for it.
+    """
+    request = _question_request(prompt, max_tokens)
+    router = get_router()
+    primary = router.backends[0]
+    outcome = None
+
+    def create() -> str:
+        nonlocal outcome
+        estimated = estimate_tokens(request["messages"], max_tokens or 512)
+        scheduler = get_scheduler()
+
+        def attempt(backend: Backend, cancelled: threading.Event):
+            # A plain request cannot be interrupted; a losing one's answer is dropped
+            try:
+                raw = backend.client().chat.completions.with_raw_response.create(**{**request, "model": backend.model})
+                response = raw.parse()
+            except Exception as e:
+                scheduler.reject(e, estimated, backend.account)
+                raise
+            if response.usage is not None:
+                scheduler.settle_tokens(estimated, response.usage.total_tokens, backend.account)
+            return raw, response
+
+        (raw, response), outcome = scheduler.retrying(
+            lambda: router.run(attempt, admit=lambda backend, wait: scheduler.acquire(
+                priority, estimated, backend.account, wait), release=scheduler.release),
+            on_retry=_retry_counter(profile))
+        if profile is not None:
+            profile.llm_source = "api"
+            profile.llm_backend = outcome.backend
+            profile.llm_hedged = outcome.hedged
+            profile.retries += raw.retries_taken
+            profile.record_usage(response.usage)
+        return response.choices[0].message.content
+
+    with timed(profile, "llm"):
+        if cache is None:
+            return create()
+        if profile is not None:
+            profile.llm_source = "cache"  # overwritten if create() runs
+        # Only the primary's answers are cached: the key names its model and endpoint
+        return cache.get_or_create(_cache_request(request, primary), create, fresh=fresh,
+                                   keep=lambda content: outcome.backend == primary.name)
+
+
+def stream_questions(prompt: Union[str, CompiledPrompt], on_question: Callable[[str], None] = print,
+                     cache: Optional[LLMResponseCache] = None,
+                     fresh: bool = False, profile: Optional[RunProfile] = None,
+                     priority: int = PRIORITY_INTERACTIVE) -> Tuple[str, Dict[str, float]]:
+    """
+    Stream the completion and hand each question to `on_question` as soon as its line is complete.
+    Returns the full text and timings in seconds: time_to_first_token and total.
+    A cached completion (unless fresh=True) is replayed without calling the API; as in
+    generate_questions, only the first backend's answers are cached.
+    Each stream, hedges included, holds a scheduler admission on its backend's account until
+    it is closed, and the completion is only retried before its first token.
+    Backends are raced for the first token: the losing stream is closed as soon as it is known.
+    A profile records the same timings plus token usage from the final chunk and the backend used.
+    """
+    request = _question_request(prompt)
+    start = time.perf_counter()
+    router, scheduler = get_router(), get_scheduler()
+    primary = router.backends[0]
+    cache_key = cache.key_for(_cache_request(request, primary)) if cache is not None else None
+
+    if cache is not None:
+        cached = cache.lookup(cache_key, fresh)
+        if cached is not None:
+            for line in cached.splitlines():
+                if line.strip():
+                    on_question(line.strip())
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.llm_source = "cache"
+                profile.time_to_first_token = elapsed
+                profile.add_stage("llm", elapsed)
+            return cached, {"time_to_first_token": elapsed, "total": elapsed}
+
+    first_token_at = None
+    parts: List[str] = []
+    usage = None
+    outcome = None
+    estimated = estimate_tokens(request["messages"])
+
+    def open_stream(backend: Backend, cancelled: threading.Event):
+        """The stream once it has produced content (or ended), and the chunks read so far."""
+        try:
+            raw = backend.client().chat.completions.with_raw_response.create(
+                stream=True, **{**request, "model": backend.model})
+            stream = raw.parse()
+            chunks = iter(stream)
+            head = []
+            for chunk in chunks:
+                if cancelled.is_set():
+                    break
+                head.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    break
+        except Exception as e:
+            scheduler.reject(e, estimated, backend.account)
+            raise
+        # The winner's admission is held until consume() closes the stream; the router gives back the losers'
+        return backend, raw, stream, head, chunks
+
+    def close(opened) -> None:
+        opened[2].close()
+
+    def consume() -> None:
+        nonlocal first_token_at, usage, outcome
+        pending = ""
+        opened, outcome = router.run(open_stream, "first_token", discard=close,
+                                     admit=lambda backend, wait: scheduler.acquire(
+                                         priority, estimated, backend.account, wait),
+                                     release=scheduler.release, keep_winner=True)
+        backend, raw, stream, head, chunks = opened
+        if profile is not None:
+            profile.retries += raw.retries_taken
+        try:
+            for chunk in itertools.chain(head, chunks):
+                usage = _chunk_usage(chunk) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(delta)
+                pending += delta
+                # Every completed line is one question
+                while "\n" in pending:
+                    line, pending = pending.split("\n", 1)
+                    if line.strip():
+                        on_question(line.strip())
+            if pending.strip():
+                on_question(pending.strip())
+        finally:
+            close(opened)
+            scheduler.release()
+        if usage is not None:
+            scheduler.settle_tokens(estimated, usage.total_tokens, backend.account)
+
+    scheduler.retrying(consume, on_retry=_retry_counter(profile), retry_allowed=lambda: first_token_at is None)
+
+    end = time.perf_counter()
+    text = "".join(parts)
+    if cache is not None and text and outcome.backend == primary.name:
+        cache.put(cache_key, text)
+    if profile is not None:
+        profile.llm_source = "api"
+        profile.llm_backend = outcome.backend
+        profile.llm_hedged = outcome.hedged
+        profile.record_usage(usage)
+        profile.time_to_first_token = (first_token_at or end) - start
+        profile.add_stage("llm", end - start)
+    return text, {
+        "time_to_first_token": (first_token_at or end) - start,
+        "total": end - start,
+    }
+
+
+def report_run(mode: str, profiles: List[RunProfile], wall_seconds: float, show_profile: bool = False,
+               prometheus: Optional[str] = None) -> None:
+    """
+    Append the run to STATE_DIR/runs.jsonl, optionally write it as a Prometheus textfile
+    and print the per-stage summary. The backends' latencies are saved for the next run's
+    hedging. Failing to write metrics never fails the run.
+    """
+    try:
+        append_run_log(os.path.join(STATE_DIR, "runs.jsonl"), mode, profiles)
+        if _router is not None:
+            _router.save()
+        if prometheus:
+            write_prometheus(prometheus, mode, profiles, wall_seconds)
+    except OSError as e:
+        print(f"Could not write run metrics: {e}")
+    if show_profile:
+        print("\n--- Profile ---")
+        print(format_summary(profiles, wall_seconds))
+
+
+def run_press_conference(prompt: CompiledPrompt, max_turns: int = DEFAULT_SESSION_TURNS,
+                         show_profile: bool = False) -> str:
+    """
+    Hold a multi-turn press conference on the terminal: the reporter asks one question at
+    a time and the manager's answer shapes the next. An empty answer ends it early.
+    Each question is followed by its wait and request size, and the session's latency
+    summary is printed at the end; every turn is logged to runs.jsonl as mode "session".
+    `prompt` must be built with system=SESSION_PROMPT. Returns the transcript.
+    """
+    from session import PressConference
+
+    def ask(messages: List[Dict[str, str]], profile: RunProfile, speculative: bool) -> str:
+        # A prefetch yields to any question the manager is actually waiting for
+        return generate_questions(messages, profile=profile, max_tokens=SESSION_MAX_TOKENS,
+                                  priority=PRIORITY_BATCH if speculative else PRIORITY_INTERACTIVE)
+
+    conference = PressConference(prompt, ask, max_turns)
+    run_start = time.perf_counter()
+    print("\n=== PRESS CONFERENCE ===")
+    print("Answer each question as the manager; an empty answer ends the press conference.")
+    try:
+        for _ in range(max_turns):
+            question, turn = conference.next_question()
+            print(f"\nReporter: {question}")
+            print(f"  [turn {turn.number}, {turn.kind}: {turn.wait:.2f}s ({turn.source}), "
+                  f"~{turn.prompt_tokens} prompt tokens]")
+            try:
+                answer = input("Manager: ").strip()
+            except EOFError:
+                answer = ""
+            if not answer:
+                break
+            conference.answer(answer)
+    finally:
+        conference.close()
+        print(f"\n{conference.latency_summary()}")
+        report_run("session", conference.profiles, time.perf_counter() - run_start, show_profile)
+    return conference.transcript()
+
+
+def _in_background(fn: Callable[..., object], *args) -> Future:
+    """
+    Run fn(*args) on a daemon thread. Unlike executor threads, which are joined at exit,
+    work whose result is no longer wanted (e.g. after invalid input) never delays exit.
+    """
+    future: Future = Future()
+
+    def run() -> None:
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def main(use_ocr_cache: bool = True, fresh: bool = False, stream: bool = True, use_store: bool = True,
+         show_profile: bool = False, prometheus: Optional[str] = None,
+         prompt_budget: Optional[int] = DEFAULT_PROMPT_BUDGET, preprocess_image: bool = False,
+         session_turns: int = 0, use_llm_cache: bool = True):
+    profile = RunProfile("interactive")
+    try:
+        _interactive_session(profile, use_ocr_cache, fresh, stream, use_store, prompt_budget, preprocess_image,
+                             session_turns, show_profile, use_llm_cache)
+    finally:
+        if profile.wall_seconds is None:
+            profile.finish("incomplete")
+        report_run("interactive", [profile], profile.wall_seconds, show_profile, prometheus)
+
+
+def _interactive_session(profile: RunProfile, use_ocr_cache: bool, fresh: bool, stream: bool,
+                         use_store: bool, prompt_budget: Optional[int], preprocess_image: bool,
+                         session_turns: int = 0, show_profile: bool = False, use_llm_cache: bool = True) -> None:
+    # Get screenshot - REQUIRED (defaults to the newest one the watch daemon processed)
+    # Several screenshots (or a screen recording) of the same match are separated by ";"
+    latest = open_watch_manifest().latest()
+    hint = f" [Enter for {os.path.basename(latest)}]" if latest else ""
+    answer = input(f"Enter the path to your match screenshot(s) or recording{hint}: ").strip() or latest or ""
+    image_paths = [path.strip().strip('"') for path in answer.split(";") if path.strip()]
+    if not image_paths:
         print("Screenshot path is required!")
         return
     
-    # Run OCR
-    print("Processing screenshot...")
-    ocr_data = _try_run_ocr(image_path)
+    missing = [path for path in image_paths if not os.path.isfile(path)]
+    if missing:
+        print(f"File not found: {', '.join(missing)}")
+        return
+    profile.label = os.path.basename(image_paths[0])
+    
+    # Run OCR, and load the API client, in the background while the context questions
+    # that don't depend on them are asked
+    print("Processing screenshot in the background...")
+    ocr_cache = open_ocr_cache() if use_ocr_cache else None
+    ocr_future = _in_background(run_match_ocr, image_paths, ocr_cache, None, profile, preprocess_image)
+    _in_background(lambda: (get_router().warm(), get_scheduler()))
+    
+    # MINIMAL USER INPUTS - Only what can't be extracted from screenshot
+    
+    # 1. Match setting and stage
+    print("\n--- Match Context (cannot be determined from screenshot) ---")
+    setting = input("Match setting (ucl/domestic cup/derby): ").lower().strip()
+    
+    if setting == "ucl":
+        stage = input("UCL stage (league phase/ro32/ro16/qf/sf/final): ").lower().strip()
+    elif setting == "domestic cup":
+        stage = input("Cup stage (qf/sf/final): ").lower().strip()
+    elif setting == "derby":
+        stage = "league"
+    else:
+        print("Invalid setting")
+        return
+    
+    # 2. Home/away designation - CRITICAL FIX HERE
+    home_or_away = input("Is this a home, away, or neutral match for your team?: ").lower().strip()
+    
+    # Team names and score are needed from here on, so wait for OCR
+    if not ocr_future.done():
+        print("Waiting for screenshot processing to finish...")
+    try:
+        ocr_data = ocr_future.result()
+    except ValueError as e:
+        print(e)
+        profile.finish("failed", str(e))
+        return
+    if ocr_cache is not None and ocr_cache.hits:
+        print("Using cached OCR results for this screenshot.")
+    if ocr_data and "frames" in ocr_data:
+        print(f"Merged {ocr_data['frames']['read']} distinct frames "
+              f"({ocr_data['frames']['duplicates']} duplicates skipped).")
     
     if not ocr_data:
         print("Failed to extract data from screenshot. Please check the image path and OCR setup.")
+        profile.finish("failed", "failed to extract data from screenshot")
         return
     
     # Extract basic data from OCR
@@ -137,57 +1247,17 @@ def main():
             print("Invalid score input")
             return
     
-    total_goals = home_score + away_score
-    score = f"{home_score}-{away_score}"
-    
-    # MINIMAL USER INPUTS - Only what can't be extracted from screenshot
-    
-    # 1. Match setting and stage
-    print("\n--- Match Context (cannot be determined from screenshot) ---")
-    setting = input("Match setting (ucl/domestic cup/derby): ").lower().strip()
-    
-    if setting == "ucl":
-        stage = input("UCL stage (league phase/ro32/ro16/qf/sf/final): ").lower().strip()
-        stage_scores = {
-            'league phase': 2, 'ro32': 4, 'ro16': 5, 
-            'qf': 6, 'sf': 8, 'final': 10
-        }
-        importance = stage_scores.get(stage, 2)
-    elif setting == "domestic cup":
-        stage = input("Cup stage (qf/sf/final): ").lower().strip()
-        stage_scores = {'qf': 2, 'sf': 3, 'final': 4}
-        importance = stage_scores.get(stage, 2)
-    elif setting == "derby":
-        stage = "league"
-        importance = 5  # Will be calculated later based on points
-    else:
-        print("Invalid setting")
-        return
-    
-    # 2. Home/away designation - CRITICAL FIX HERE
-    home_or_away = input("Is this a home, away, or neutral match for your team?: ").lower().strip()
-    
     # Determine which team is "your team" (the manager's team)
-    if home_or_away == "home":
-        manager_team = home_team
-        opponent_team = away_team
-        manager_is_home = True
-    elif home_or_away == "away":
-        manager_team = away_team
-        opponent_team = home_team
-        manager_is_home = False
-    else:  # neutral
-        # For neutral, assume first team mentioned is manager's team
-        manager_team = home_team
-        opponent_team = away_team
-        manager_is_home = True
+    # For neutral, assume first team mentioned is manager's team
+    if home_or_away == "away":
+        manager_team, opponent_team = away_team, home_team
+    else:
+        manager_team, opponent_team = home_team, away_team
     
     print(f"\nYour team: {manager_team}")
     print(f"Opponent: {opponent_team}")
     
-    # Adjust importance for away UCL matches
-    if setting == 'ucl' and home_or_away == 'away' and stage not in ['league phase', 'final']:
-        importance *= 1.3
+    importance = stage_importance(setting, stage, home_or_away)
     
     # 3. Goal scorers (names not clearly visible in screenshot)
     home_goal_scorers = []
@@ -206,299 +1276,844 @@ def main():
         home_team_points = int(input(f"{home_team} points before the match: "))
         away_team_points = int(input(f"{away_team} points before the match: "))
         match_number = int(input("Match number in league (1-34): "))
-        
-        # Calculate derby importance
-        point_diff_before = abs(home_team_points - away_team_points)
-        
-        if match_number <= 8:
-            season_multiplier = 0.8
-        elif match_number <= 24:
-            season_multiplier = 1.0
-        else:
-            season_multiplier = 1.3
-        
-        if point_diff_before <= 3:
-            base_importance = 7
-        elif point_diff_before <= 10:
-            base_importance = 5
-        else:
-            base_importance = 3
-        
-        importance = base_importance * season_multiplier
-    
-    # EXTRACT ALL OTHER DATA FROM OCR
-    print("\n--- Extracting stats from screenshot ---")
-    
-    # Extract stats with fallbacks - now checking all available OCR stats
-    def get_stat(key_variations, default_home=0, default_away=0):
-        for key in key_variations:
-            if key in stats:
-                home_val = _parse_numeric(stats[key][0])
-                away_val = _parse_numeric(stats[key][1])
-                if home_val is not None and away_val is not None:
-                    return home_val, away_val
-        return default_home, default_away
-    
-    # All stats from OCR (these are always from screenshot perspective: left=home, right=away)
-    home_shots, away_shots = get_stat(['shots'], 0, 0)
-    home_shots_target, away_shots_target = get_stat(['on target'], 0, 0)
-    home_xg, away_xg = get_stat(['xg'], 0.0, 0.0)
-    home_shots_off, away_shots_off = get_stat(['off target'], 0, 0)
-    home_clear_chances, away_clear_chances = get_stat(['clear cut chances'], 0, 0)
-    home_long_shots, away_long_shots = get_stat(['long shots'], 0, 0)
-    pos_home, pos_away = get_stat(['possession'], 50, 50)
-    home_corners, away_corners = get_stat(['corners'], 0, 0)
-    home_fouls, away_fouls = get_stat(['fouls'], 0, 0)
-    home_offsides, away_offsides = get_stat(['offsides'], 0, 0)
-    home_passes_comp, away_passes_comp = get_stat(['passes completed'], 50, 50)
-    home_crosses_comp, away_crosses_comp = get_stat(['crosses completed'], 0, 0)
-    home_tackles_won, away_tackles_won = get_stat(['tackles won'], 50, 50)
-    home_headers_won, away_headers_won = get_stat(['headers won'], 50, 50)
-    home_yellow, away_yellow = get_stat(['yellow cards'], 0, 0)
-    home_red, away_red = get_stat(['red cards'], 0, 0)
-    home_rating, away_rating = get_stat(['average rating'], 6.5, 6.5)
-    home_prog_passes, away_prog_passes = get_stat(['progressive passes'], 0, 0)
-    home_sprints, away_sprints = get_stat(['high intensity sprints'], 0, 0)
-    
-    # Convert to integers where appropriate
-    home_shots, away_shots = int(home_shots), int(away_shots)
-    home_shots_target, away_shots_target = int(home_shots_target), int(away_shots_target)
-    home_shots_off, away_shots_off = int(home_shots_off), int(away_shots_off)
-    home_clear_chances, away_clear_chances = int(home_clear_chances), int(away_clear_chances)
-    home_long_shots, away_long_shots = int(home_long_shots), int(away_long_shots)
-    pos_home, pos_away = int(pos_home), int(pos_away)
-    home_corners, away_corners = int(home_corners), int(away_corners)
-    home_fouls, away_fouls = int(home_fouls), int(away_fouls)
-    home_offsides, away_offsides = int(home_offsides), int(away_offsides)
-    home_yellow, away_yellow = int(home_yellow), int(away_yellow)
-    home_red, away_red = int(home_red), int(away_red)
-    home_prog_passes, away_prog_passes = int(home_prog_passes), int(away_prog_passes)
-    home_sprints, away_sprints = int(home_sprints), int(away_sprints)
-    
-    # NOW: Remap stats to manager's team perspective
-    if manager_is_home:
-        # Manager is home team - stats are already correct
-        manager_shots, opp_shots = home_shots, away_shots
-        manager_shots_target, opp_shots_target = home_shots_target, away_shots_target
-        manager_xg, opp_xg = home_xg, away_xg
-        manager_shots_off, opp_shots_off = home_shots_off, away_shots_off
-        manager_clear_chances, opp_clear_chances = home_clear_chances, away_clear_chances
-        manager_long_shots, opp_long_shots = home_long_shots, away_long_shots
-        manager_possession, opp_possession = pos_home, pos_away
-        manager_corners, opp_corners = home_corners, away_corners
-        manager_fouls, opp_fouls = home_fouls, away_fouls
-        manager_offsides, opp_offsides = home_offsides, away_offsides
-        manager_passes_comp, opp_passes_comp = home_passes_comp, away_passes_comp
-        manager_crosses_comp, opp_crosses_comp = home_crosses_comp, away_crosses_comp
-        manager_tackles_won, opp_tackles_won = home_tackles_won, away_tackles_won
-        manager_headers_won, opp_headers_won = home_headers_won, away_headers_won
-        manager_yellow, opp_yellow = home_yellow, away_yellow
-        manager_red, opp_red = home_red, away_red
-        manager_rating, opp_rating = home_rating, away_rating
-        manager_prog_passes, opp_prog_passes = home_prog_passes, away_prog_passes
-        manager_sprints, opp_sprints = home_sprints, away_sprints
-        manager_score, opp_score = home_score, away_score
-    else:
-        # Manager is away team - SWAP ALL STATS
-        manager_shots, opp_shots = away_shots, home_shots
-        manager_shots_target, opp_shots_target = away_shots_target, home_shots_target
-        manager_xg, opp_xg = away_xg, home_xg
-        manager_shots_off, opp_shots_off = away_shots_off, home_shots_off
-        manager_clear_chances, opp_clear_chances = away_clear_chances, home_clear_chances
-        manager_long_shots, opp_long_shots = away_long_shots, home_long_shots
-        manager_possession, opp_possession = pos_away, pos_home
-        manager_corners, opp_corners = away_corners, home_corners
-        manager_fouls, opp_fouls = away_fouls, home_fouls
-        manager_offsides, opp_offsides = away_offsides, home_offsides
-        manager_passes_comp, opp_passes_comp = away_passes_comp, home_passes_comp
-        manager_crosses_comp, opp_crosses_comp = away_crosses_comp, home_crosses_comp
-        manager_tackles_won, opp_tackles_won = away_tackles_won, home_tackles_won
-        manager_headers_won, opp_headers_won = away_headers_won, home_headers_won
-        manager_yellow, opp_yellow = away_yellow, home_yellow
-        manager_red, opp_red = away_red, home_red
-        manager_rating, opp_rating = away_rating, home_rating
-        manager_prog_passes, opp_prog_passes = away_prog_passes, home_prog_passes
-        manager_sprints, opp_sprints = away_sprints, home_sprints
-        manager_score, opp_score = away_score, home_score
-    
-    # Display extracted stats from MANAGER'S PERSPECTIVE
-    print(f"Your Team ({manager_team}) vs Opponent ({opponent_team})")
-    print(f"Total Shots: {manager_shots} vs {opp_shots}")
-    print(f"Shots on Target: {manager_shots_target} vs {opp_shots_target}")
-    print(f"Expected Goals (xG): {manager_xg} vs {opp_xg}")
-    print(f"Shots off Target: {manager_shots_off} vs {opp_shots_off}")
-    print(f"Clear Cut Chances: {manager_clear_chances} vs {opp_clear_chances}")
-    print(f"Long Shots: {manager_long_shots} vs {opp_long_shots}")
-    print(f"Possession: {manager_possession}% vs {opp_possession}%")
-    print(f"Corners: {manager_corners} vs {opp_corners}")
-    print(f"Fouls: {manager_fouls} vs {opp_fouls}")
-    print(f"Offsides: {manager_offsides} vs {opp_offsides}")
-    print(f"Passes Completed: {manager_passes_comp}% vs {opp_passes_comp}%")
-    print(f"Crosses Completed: {manager_crosses_comp}% vs {opp_crosses_comp}%")
-    print(f"Tackles Won: {manager_tackles_won}% vs {opp_tackles_won}%")
-    print(f"Headers Won: {manager_headers_won}% vs {opp_headers_won}%")
-    print(f"Yellow Cards: {manager_yellow} vs {opp_yellow}")
-    print(f"Red Cards: {manager_red} vs {opp_red}")
-    print(f"Average Rating: {manager_rating} vs {opp_rating}")
-    print(f"Progressive Passes: {manager_prog_passes} vs {opp_prog_passes}")
-    print(f"High Intensity Sprints: {manager_sprints} vs {opp_sprints}")
-    
-    # Calculate derived metrics
-    
-    # Entertainment value
-    if total_goals == 0:
-        entertainment = 0
-    elif total_goals >= 7:
-        entertainment = 10
-    elif total_goals >= 4:
-        entertainment = 5
-    elif total_goals >= 2:
-        entertainment = 2
-    else:
-        entertainment = 1
-    
-    entertainment_labels = {0: "Boring", 1: "Alright", 2: "Decently fun", 5: "Great game", 10: "Incredible match"}
-    match_entertainment = entertainment_labels[entertainment]
-    
-    # Importance level
-    importance_labels = {
-        (0, 1): 'Low importance',
-        (1, 2): 'Moderate importance',
-        (2, 4): 'High importance',
-        (4, 7): 'Very high importance',
-        (7, float('inf')): 'Extremely high importance'
-    }
-    importance_level = next(label for (low, high), label in importance_labels.items() if low <= importance < high)
-    
-    # Match aggression
-    red_cards_total = manager_red + opp_red
-    yellow_cards_total = manager_yellow + opp_yellow
-    aggression_score = yellow_cards_total + (red_cards_total * 2)
-    
-    if aggression_score == 0:
-        match_aggression = 0
-    elif aggression_score >= 10:
-        match_aggression = 3
-    elif aggression_score >= 5:
-        match_aggression = 2
-    else:
-        match_aggression = 1
-    
-    card_labels = {0: "Peaceful", 1: "Regular", 2: "Heated", 3: "Brawl"}
-    match_heat = card_labels[match_aggression]
+        importance = derby_importance(home_team_points, away_team_points, match_number)
     
-    # Team aggression analysis
-    manager_aggression_score = manager_yellow + (manager_red * 3)
-    opp_aggression_score = opp_yellow + (opp_red * 3)
-    
-    if manager_aggression_score > opp_aggression_score:
-        aggr_team = manager_team
-        calmer_team = opponent_team
-        aggression_difference = manager_aggression_score - opp_aggression_score
-    elif opp_aggression_score > manager_aggression_score:
-        aggr_team = opponent_team
-        calmer_team = manager_team
-        aggression_difference = opp_aggression_score - manager_aggression_score
-    else:
-        aggr_team = "Both teams equally aggressive"
-        calmer_team = "Both teams equally calm"
-        aggression_difference = 0
-    
-    if aggression_difference == 0:
-        aggression_analysis = "Both teams showed similar discipline"
-    elif aggression_difference <= 2:
-        aggression_analysis = f"{aggr_team} was slightly more aggressive than {calmer_team}"
-    elif aggression_difference <= 5:
-        aggression_analysis = f"{aggr_team} was noticeably more aggressive than {calmer_team}"
-    else:
-        aggression_analysis = f"{aggr_team} was significantly more aggressive than {calmer_team}"
+    context = {
+        "setting": setting,
+        "stage": stage,
+        "home_or_away": home_or_away,
+        "importance": importance,
+        "home_goal_scorers": home_goal_scorers,
+        "away_goal_scorers": away_goal_scorers,
+    }
     
-    # Calculate shot efficiency
-    manager_shot_accuracy = (manager_shots_target / manager_shots * 100) if manager_shots > 0 else 0
-    opp_shot_accuracy = (opp_shots_target / opp_shots * 100) if opp_shots > 0 else 0
+    # Form and previous meetings from earlier runs
+    played_at = _now()
+    image_hash = inputs_hash(image_paths)
+    store = open_match_store() if use_store else None
+    season = None
+    if store is not None:
+        with profile.stage("history"):
+            context["history"] = history_lines(store, manager_team, opponent_team, before=played_at,
+                                               exclude_hash=image_hash)
+            season = load_season(store, manager_team, before=played_at, exclude_hash=image_hash)
     
-    # Calculate xG efficiency (goals vs expected goals)
-    manager_xg_efficiency = (manager_score / manager_xg * 100) if manager_xg > 0 else 0
-    opp_xg_efficiency = (opp_score / opp_xg * 100) if opp_xg > 0 else 0
+    prompt = build_prompt(home_team, away_team, home_score, away_score, stats, context, verbose=True,
+                          season=season, profile=profile, budget=prompt_budget,
+                          system=SESSION_PROMPT if session_turns else SYSTEM_PROMPT)
     
     # Generate press conference questions
     print("\n--- Generating press conference questions ---")
+    llm_cache = open_llm_cache() if use_llm_cache else None
+    try:
+        if session_turns:
+            questions = run_press_conference(prompt, session_turns, show_profile)
+        elif stream:
+            print("\n=== PRESS CONFERENCE QUESTIONS ===")
+            questions, timings = stream_questions(prompt, cache=llm_cache, fresh=fresh, profile=profile)
+            print(f"\n(first token after {timings['time_to_first_token']:.2f}s, "
+                  f"complete after {timings['total']:.2f}s)")
+        else:
+            questions = generate_questions(prompt, llm_cache, fresh=fresh, profile=profile)
+            
+            print("\n=== PRESS CONFERENCE QUESTIONS ===")
+            print(questions)
+    except api_errors() as e:
+        print(f"Question generation failed after {profile.retries} retries: {e}")
+        profile.finish("failed", f"question generation failed: {e}")
+        return
     
-    prompt = f"""
-You are a football press conference reporter.
-
-MATCH CONTEXT:
-Setting: {setting.upper()}
-Importance: {importance:.1f}/10 ({importance_level})
-Match: {home_team} {score} {away_team} ({home_or_away})
-The manager is managing {manager_team}
-
-COMPREHENSIVE MATCH STATS ({manager_team} vs {opponent_team}):
-Goals: {manager_score} vs {opp_score}
-Total Shots: {manager_shots} vs {opp_shots}
-Shots on Target: {manager_shots_target} vs {opp_shots_target}
-Shot Accuracy: {manager_shot_accuracy:.1f}% vs {opp_shot_accuracy:.1f}%
-Expected Goals (xG): {manager_xg} vs {opp_xg}
-xG Efficiency: {manager_xg_efficiency:.1f}% vs {opp_xg_efficiency:.1f}%
-Clear Cut Chances: {manager_clear_chances} vs {opp_clear_chances}
-Long Shots: {manager_long_shots} vs {opp_long_shots}
-Possession: {manager_possession}% vs {opp_possession}%
-Corners: {manager_corners} vs {opp_corners}
-Fouls: {manager_fouls} vs {opp_fouls}
-Offsides: {manager_offsides} vs {opp_offsides}
-Pass Completion: {manager_passes_comp}% vs {opp_passes_comp}%
-Cross Completion: {manager_crosses_comp}% vs {opp_crosses_comp}%
-Tackles Won: {manager_tackles_won}% vs {opp_tackles_won}%
-Headers Won: {manager_headers_won}% vs {opp_headers_won}%
-Yellow Cards: {manager_yellow} vs {opp_yellow}
-Red Cards: {manager_red} vs {opp_red}
-Average Rating: {manager_rating} vs {opp_rating}
-Progressive Passes: {manager_prog_passes} vs {opp_prog_passes}
-High Intensity Sprints: {manager_sprints} vs {opp_sprints}
-
-GOAL SCORERS:
-{manager_team}: {', '.join(home_goal_scorers if manager_is_home else away_goal_scorers) if (home_goal_scorers if manager_is_home else away_goal_scorers) else 'None'}
-{opponent_team}: {', '.join(away_goal_scorers if manager_is_home else home_goal_scorers) if (away_goal_scorers if manager_is_home else home_goal_scorers) else 'None'}
-
-MATCH CHARACTER:
-Team Discipline: {aggression_analysis}
-Match Atmosphere: {match_heat}
-Entertainment Value: {match_entertainment}
-
-Generate 5 realistic press conference questions a reporter might ask based on these comprehensive stats and the match importance.
+    if store is not None:
+        store.record_match(played_at, home_team, away_team, home_score, away_score, stats, context,
+                           questions, image_hash=image_hash,
+                           stats_vector=stats_vector(MatchStats.from_ocr(stats)))
+        store.close()
+    profile.finish()
 
-GUIDELINES:
-- You are an experienced, insightful football journalist who asks probing questions that reveal deeper truths
-- Use the detailed statistics to ask specific, data-driven questions about tactical decisions and performance
-- Focus on the psychological, tactical, and emotional aspects of the match rather than basic facts
-- Ask about decision-making, team mentality, pressure handling, and strategic choices
-- Consider the broader narrative: What does this result mean for the season? How does it change expectations?
-- DO NOT invent or assume details not provided (like the fashion in which goals were scored or specific incidents)
-- Base questions on the comprehensive stats provided, exploring their deeper tactical and psychological implications
-- Ask questions that would make a manager think deeply about their approach and decisions
-- Consider efficiency metrics (shot accuracy, xG efficiency) and what they reveal about performance
-- Make each question feel like it comes from someone who truly understands football's tactical complexities
 
-QUESTION THEMES TO EXPLORE:
-- How tactical decisions influenced statistical outcomes (possession vs shots, defensive vs attacking approach)
-- The correlation between stats and result (high possession but low shots, good xG but poor finishing, etc.)
-- Physical and tactical intensity revealed by sprints, tackles, headers
-- Team discipline and its impact on the match flow
-- Efficiency in different phases of play (attacking, defending, set pieces)
-- The psychological impact of the statistical performance on team confidence
+def _split_scorers(value: Optional[str]) -> List[str]:
+    """Split a sidecar scorers cell. Names are separated by ';' so the cell needs no CSV quoting."""
+    if not value:
+        return []
+    return [s.strip() for s in value.split(";") if s.strip()]
 
-Only ask the questions - no introduction or commentary.
-"""
-    
-    # Generate questions
-    response = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-versatile"
+
+def load_batch_context(context_path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Read the batch sidecar CSV and index its rows by screenshot file name.
+    Required columns: image, setting, home_or_away. Optional: date, stage, home_scorers,
+    away_scorers, home_points, away_points, match_number and the overrides
+    home_team, away_team, home_goals, away_goals.
+    """
+    rows: Dict[str, Dict[str, str]] = {}
+    with open(context_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            cleaned = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            image = cleaned.get("image")
+            if image:
+                rows[os.path.basename(image)] = cleaned
+    return rows
+
+
+def context_from_row(row: Dict[str, str]) -> Dict[str, object]:
+    """Turn one sidecar row into the context dict used by build_prompt. Raises ValueError on bad rows."""
+    setting = row.get("setting", "").lower()
+    stage = row.get("stage", "").lower() or ("league" if setting == "derby" else "")
+    home_or_away = row.get("home_or_away", "").lower().strip()
+    if home_or_away not in ("home", "away", "neutral"):
+        raise ValueError(f"Invalid home_or_away: {row.get('home_or_away', '')!r} (expected home, away or neutral)")
+
+    importance = stage_importance(setting, stage, home_or_away)
+    if importance is None:
+        raise ValueError(f"Invalid setting: {setting!r}")
+
+    if setting == "derby":
+        try:
+            importance = derby_importance(int(row["home_points"]), int(row["away_points"]),
+                                          int(row["match_number"]))
+        except (KeyError, ValueError):
+            raise ValueError("Derby rows need home_points, away_points and match_number")
+
+    return {
+        "setting": setting,
+        "stage": stage,
+        "home_or_away": home_or_away,
+        "importance": importance,
+        "home_goal_scorers": _split_scorers(row.get("home_scorers")),
+        "away_goal_scorers": _split_scorers(row.get("away_scorers")),
+    }
+
+
+def analyze_match(ocr_data: Dict[str, object], row: Dict[str, str], played_at: Optional[str] = None,
+                  store: Optional[MatchStore] = None,
+                  profile: Optional[RunProfile] = None, budget: Optional[int] = None,
+                  image_hash: Optional[str] = None) -> Tuple[Dict[str, object], CompiledPrompt]:
+    """
+    Combine OCR output with a sidecar row into a result record and its prompt.
+    Team names and goals in the row take precedence over what OCR detected.
+    With a store, form and previous meetings before `played_at` are added to the prompt,
+    leaving out the stored match with the screenshot's `image_hash`.
+    The prompt is fitted to `budget` approximate tokens; its size is kept in the result.
+    """
+    stats = ocr_data.get("stats", {})
+    home_team = row.get("home_team") or ocr_data.get("home_team") or "UNKNOWN"
+    away_team = row.get("away_team") or ocr_data.get("away_team") or "UNKNOWN"
+    if home_team == "UNKNOWN":
+        home_team = "Home Team"
+    if away_team == "UNKNOWN":
+        away_team = "Away Team"
+
+    if row.get("home_goals") and row.get("away_goals"):
+        try:
+            home_score, away_score = int(row["home_goals"]), int(row["away_goals"])
+        except ValueError:
+            raise ValueError("home_goals and away_goals must be integers")
+    else:
+        score_tuple = extract_score_from_stats(stats)
+        if score_tuple is None:
+            raise ValueError("Score not found in screenshot; add home_goals/away_goals to the context row")
+        home_score, away_score = score_tuple
+
+    context = context_from_row(row)
+    played_at = played_at or _now()
+    season = None
+    if store is not None:
+        manager_team, opponent_team = ((away_team, home_team) if context["home_or_away"] == "away"
+                                       else (home_team, away_team))
+        with timed(profile, "history"):
+            context["history"] = history_lines(store, manager_team, opponent_team, before=played_at,
+                                               exclude_hash=image_hash)
+            season = load_season(store, manager_team, before=played_at, exclude_hash=image_hash)
+    prompt = build_prompt(home_team, away_team, home_score, away_score, stats, context, season=season,
+                          profile=profile, budget=budget)
+    result = {
+        "played_at": played_at,
+        "home_team": home_team,
+        "away_team": away_team,
+        "score": f"{home_score}-{away_score}",
+        "home_score": home_score,
+        "away_score": away_score,
+        "context": context,
+        "stats": {name: list(values) for name, values in stats.items()},
+        "prompt_tokens": prompt.tokens,
+        "prompt_tokens_saved": prompt.saved_tokens,
+    }
+    return result, prompt
+
+
+def _write_batch_result(output_dir: str, image_path: str, result: Dict[str, object]) -> str:
+    """Write one match result as <image stem>.json and return its path."""
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    out_path = os.path.join(output_dir, f"{stem}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return out_path
+
+
+def run_batch(directory: str, context_path: str, output_dir: Optional[str] = None,
+              ocr_workers: Optional[int] = None, api_concurrency: int = 4,
+              ocr_timeout: float = OCR_TIMEOUT, use_ocr_cache: bool = True, fresh: bool = False,
+              use_store: bool = True, show_profile: bool = False, prometheus: Optional[str] = None,
+              prompt_budget: Optional[int] = DEFAULT_PROMPT_BUDGET, preprocess_image: bool = False,
+              use_llm_cache: bool = True) -> int:
+    """
+    Process every screenshot in `directory` without prompting.
+    OCR runs on a pool of persistent OCR workers (or a process pool when the binary
+    has no worker mode) while question generation runs on a thread pool capped at
+    `api_concurrency`; a match is handed to the LLM as soon as its OCR finishes.
+    API calls also pass through the shared rate-limit scheduler (see configure_scheduler).
+    Screenshots already in the OCR cache skip the OCR pool entirely, and prompts already
+    answered are served from the LLM cache unless `fresh` is set (use_llm_cache=False
+    neither reads nor writes it).
+    Matches are dated by the row's `date` or else the screenshot's mtime and analysed in
+    that order: each is recorded in the match store before the next one is analysed, so
+    every prompt sees the same earlier matches on a first run as on a rerun.
+    Every match is profiled and the run is reported through report_run.
+    Writes one JSON file per screenshot and returns the number of failed matches.
+    """
+    rows = load_batch_context(context_path)
+    output_dir = output_dir or os.path.join(directory, "results")
+    os.makedirs(output_dir, exist_ok=True)
+
+    images = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
     )
-    
-    print("\n=== PRESS CONFERENCE QUESTIONS ===")
-    print(response.choices[0].message.content)
+    if not images:
+        print(f"No screenshots found in {directory}")
+        return 0
+    played_at = {}
+    for image_path in images:
+        row = rows.get(os.path.basename(image_path), {})
+        played_at[image_path] = row.get("date") or datetime.fromtimestamp(
+            os.path.getmtime(image_path)).isoformat(timespec="seconds")
+    images.sort(key=lambda image_path: (played_at[image_path], image_path))
+
+    ocr_cache = open_ocr_cache() if use_ocr_cache else None
+    llm_cache = open_llm_cache() if use_llm_cache else None
+    store = open_match_store() if use_store else None
+
+    failures = 0
+    done = 0
+    run_start = time.perf_counter()
+    profiles = {image_path: RunProfile(os.path.basename(image_path)) for image_path in images}
+    image_hashes: Dict[str, str] = {}
+
+    def record(image_path: str, result: Dict[str, object]) -> None:
+        store.record_match(result["played_at"], result["home_team"], result["away_team"],
+                           result["home_score"], result["away_score"], result["stats"],
+                           result["context"], result.get("questions"), image_hash=image_hashes[image_path],
+                           stats_vector=stats_vector(MatchStats.from_ocr(result["stats"])))
+
+    def finish(image_path: str, result: Dict[str, object]) -> None:
+        nonlocal failures, done
+        done += 1
+        if "error" in result:
+            failures += 1
+            status = f"failed ({result['error']})"
+            profiles[image_path].finish("failed", result["error"])
+        else:
+            profiles[image_path].finish()
+            status = f"ok (prompt ~{result['prompt_tokens']} tokens, {result['prompt_tokens_saved']} saved)"
+            if store is not None:
+                record(image_path, result)
+        _write_batch_result(output_dir, image_path, result)
+        print(f"[{done}/{len(images)}] {os.path.basename(image_path)}: {status}")
+
+    # Resolve cache hits up front so they never wait on (or start) the OCR pool
+    cached_results: Dict[str, Dict[str, object]] = {}
+    cache_keys: Dict[str, Optional[str]] = {}
+    pending: List[str] = []
+    for image_path in images:
+        if os.path.basename(image_path) not in rows:
+            finish(image_path, {"error": "no context row for this screenshot"})
+            continue
+        with profiles[image_path].stage("ocr_cache"):
+            key = _ocr_cache_key(image_path, ocr_cache, preprocess_image) if ocr_cache is not None else None
+            cached = ocr_cache.get(key) if key is not None else None
+        if cached is not None:
+            profiles[image_path].ocr_source = "cache"
+            cached_results[image_path] = cached
+        else:
+            cache_keys[image_path] = key
+            pending.append(image_path)
+
+    # Prefer persistent workers; fall back to one OCR process per screenshot
+    worker_pool = start_ocr_pool(ocr_workers or os.cpu_count() or 1, ocr_timeout) if pending else None
+    if worker_pool is not None:
+        ocr_executor = ThreadPoolExecutor(max_workers=worker_pool.size)
+    else:
+        ocr_executor = ProcessPoolExecutor(max_workers=ocr_workers)
+
+    try:
+        with ocr_executor, ThreadPoolExecutor(max_workers=max(1, api_concurrency)) as llm_pool:
+            ocr_futures = {}
+            for image_path, cached in cached_results.items():
+                future = Future()
+                future.set_result((cached, None))
+                ocr_futures[image_path] = future
+            for image_path in pending:
+                if worker_pool is not None:
+                    future = ocr_executor.submit(_profiled_ocr, image_path, worker_pool, preprocess_image)
+                else:
+                    future = ocr_executor.submit(_profiled_ocr, image_path, None, preprocess_image, ocr_timeout)
+                ocr_futures[image_path] = future
+
+            # OCR runs ahead in parallel, but matches are analysed oldest first
+            llm_futures = {}
+            for image_path in [image_path for image_path in images if image_path in ocr_futures]:
+                future = ocr_futures[image_path]
+                profile = profiles[image_path]
+                try:
+                    ocr_data, ocr_profile = future.result()
+                except Exception:
+                    ocr_data, ocr_profile = None, None
+                if ocr_profile is not None:
+                    profile.merge(ocr_profile)
+                if ocr_data and cache_keys.get(image_path) is not None:
+                    with profile.stage("ocr_cache"):
+                        ocr_cache.put(cache_keys[image_path], ocr_data)
+                if not ocr_data:
+                    finish(image_path, {"error": "failed to extract data from screenshot"})
+                    continue
+                image_hashes[image_path] = file_sha256(image_path)
+                try:
+                    result, prompt = analyze_match(ocr_data, rows[os.path.basename(image_path)],
+                                                   played_at[image_path], store, profile, prompt_budget,
+                                                   image_hashes[image_path])
+                except ValueError as e:
+                    finish(image_path, {"error": str(e)})
+                    continue
+                if store is not None:
+                    # Questions are added when they arrive; later matches only need the result
+                    record(image_path, result)
+                future = llm_pool.submit(generate_questions, prompt, llm_cache, fresh, profile, PRIORITY_BATCH)
+                llm_futures[future] = (image_path, result)
+
+            for future in as_completed(llm_futures):
+                image_path, result = llm_futures[future]
+                try:
+                    result["questions"] = future.result()
+                except Exception as e:
+                    result["error"] = f"question generation failed: {e}"
+                finish(image_path, result)
+    finally:
+        if worker_pool is not None:
+            worker_pool.close()
+        if store is not None:
+            store.close()
+
+    print(f"\nProcessed {len(images)} screenshots, {failures} failed. Results in {output_dir}")
+    if ocr_cache is not None:
+        print(ocr_cache.summary())
+    if llm_cache is not None:
+        print(llm_cache.summary())
+    print(get_scheduler().summary())
+    print(get_router().summary())
+    report_run("batch", [profiles[image_path] for image_path in images], time.perf_counter() - run_start,
+               show_profile, prometheus)
+    return failures
+
+
+def open_watch_manifest() -> Manifest:
+    return Manifest(os.path.join(STATE_DIR, "watch_manifest.json"))
+
+
+def run_watch(directory: str, ocr_workers: int = 1, ocr_timeout: float = OCR_TIMEOUT, settle: float = 0.5,
+              poll_interval: float = 1.0, force_polling: bool = False, include_existing: bool = False,
+              show_profile: bool = False, preprocess_image: bool = False) -> int:
+    """
+    Watch `directory` and run OCR on every new screenshot as soon as it is completely
+    written, storing the result in the OCR cache. The interactive session then finds
+    the stats there and only the context questions and the LLM call remain.
+    Handled files are kept in a manifest, so a restart only processes screenshots that
+    arrived while the daemon was down. The first time a directory is watched, the
+    screenshots already in it are recorded without OCR unless `include_existing` is set.
+    Runs until interrupted; returns the number of screenshots OCR failed on.
+    """
+    if not os.path.isdir(directory):
+        print(f"Not a directory: {directory}")
+        return 1
+
+    manifest = open_watch_manifest()
+    watcher = DirectoryWatcher(directory, IMAGE_EXTENSIONS, settle, poll_interval, force_polling)
+    backlog = [path for path in watcher.existing() if not manifest.seen(path)]
+    if backlog and not include_existing and not manifest.covers(directory):
+        manifest.record(backlog, "baseline")
+        backlog = []
+
+    ocr_cache = open_ocr_cache()
+    worker_pool = start_ocr_pool(max(1, ocr_workers), ocr_timeout)
+    executor = ThreadPoolExecutor(max_workers=worker_pool.size if worker_pool is not None else max(1, ocr_workers))
+    inflight: Dict[str, Future] = {}
+    failures = 0
+
+    def process(image_path: str) -> None:
+        nonlocal failures
+        profile = RunProfile(os.path.basename(image_path))
+        try:
+            ocr_data = run_ocr(image_path, ocr_cache, worker_pool, profile, preprocess_image, ocr_timeout)
+        except Exception:
+            ocr_data = None
+        if ocr_data:
+            profile.finish()
+            manifest.record([image_path], "ok", home_team=ocr_data.get("home_team"),
+                            away_team=ocr_data.get("away_team"))
+            source = " (cached)" if profile.ocr_source == "cache" else ""
+            print(f"Ready: {os.path.basename(image_path)}: {ocr_data.get('home_team')} vs "
+                  f"{ocr_data.get('away_team')}, {len(ocr_data.get('stats', {}))} stats "
+                  f"in {profile.wall_seconds:.2f}s{source}")
+        else:
+            failures += 1
+            profile.finish("failed", "failed to extract data from screenshot")
+            manifest.record([image_path], "failed")
+            print(f"Failed: {os.path.basename(image_path)}: could not extract data from screenshot")
+        report_run("watch", [profile], profile.wall_seconds, show_profile)
+
+    def submit(image_path: str) -> None:
+        for path in [path for path, future in inflight.items() if future.done()]:
+            del inflight[path]
+        if image_path not in inflight:
+            inflight[image_path] = executor.submit(process, image_path)
+
+    print(f"Watching {directory} for new screenshots ({watcher.mode}, "
+          f"{'OCR workers' if worker_pool is not None else 'one OCR process per screenshot'}). "
+          "Press Ctrl+C to stop.")
+    if backlog:
+        print(f"Processing {len(backlog)} screenshot(s) added since the last run...")
+    try:
+        for image_path in backlog:
+            submit(image_path)
+        while True:
+            for image_path in watcher.poll():
+                if not manifest.seen(image_path):
+                    submit(image_path)
+    except KeyboardInterrupt:
+        print("\nStopping; letting running OCR finish...")
+    finally:
+        watcher.close()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if worker_pool is not None:
+            worker_pool.close()
+    print(ocr_cache.summary())
+    return failures
+
+
+def _context_row(context: object) -> Dict[str, str]:
+    """A service request's context JSON as a sidecar-style row (see load_batch_context)."""
+    from service import HTTPError
+    if not isinstance(context, dict):
+        raise HTTPError(400, "context must be a JSON object")
+    row: Dict[str, str] = {}
+    for key, value in context.items():
+        if isinstance(value, (list, tuple)):
+            value = ";".join(str(v) for v in value)
+        row[str(key).strip().lower()] = "" if value is None else str(value).strip()
+    return row
+
+
+def _read_upload(request: "service.Request") -> Tuple[bytes, str, Dict[str, str]]:
+    """
+    Screenshot bytes, a file suffix and the context row of a POST /analyze request.
+    Accepts multipart/form-data with a `screenshot` file and a `context` JSON field, or
+    a JSON body {"image": <base64>, "context": {...}}.
+    """
+    from service import HTTPError
+    if request.headers.get("content-type", "").lower().startswith("multipart/form-data"):
+        fields = request.form()
+        if "screenshot" not in fields:
+            raise HTTPError(400, "missing screenshot file field")
+        filename, image = fields["screenshot"]
+        try:
+            context = json.loads(fields.get("context", (None, b"{}"))[1] or b"{}")
+        except ValueError:
+            raise HTTPError(400, "context field is not valid JSON")
+    else:
+        payload = request.json()
+        if not isinstance(payload, dict) or "image" not in payload:
+            raise HTTPError(400, 'expected {"image": <base64>, "context": {...}}')
+        try:
+            image = base64.b64decode(payload["image"], validate=True)
+        except (ValueError, TypeError):
+            raise HTTPError(400, "image is not valid base64")
+        filename, context = payload.get("filename"), payload.get("context", {})
+    if not image:
+        raise HTTPError(400, "empty screenshot")
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return image, suffix if suffix in IMAGE_EXTENSIONS else ".png", _context_row(context)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, ocr_workers: int = 2, api_concurrency: int = 4,
+          ocr_timeout: float = OCR_TIMEOUT, use_ocr_cache: bool = True, use_store: bool = True,
+          prompt_budget: Optional[int] = DEFAULT_PROMPT_BUDGET, preprocess_image: bool = False,
+          use_llm_cache: bool = True) -> int:
+    """
+    Run the pipeline as a long-lived HTTP service until SIGINT/SIGTERM.
+    POST /analyze takes a screenshot plus a context object with the batch sidecar columns
+    and answers with the stats, the result record and the questions; GET /health reports
+    status and counters. The API clients (with their HTTP connection pools), the OCR workers,
+    caches and match store are set up once and shared by every request.
+    Concurrent requests with the same screenshot and context run the pipeline once.
+    """
+    import asyncio
+    asyncio.run(_serve(host, port, ocr_workers, api_concurrency, ocr_timeout, use_ocr_cache, use_store,
+                       prompt_budget, preprocess_image, use_llm_cache))
+    return 0
+
+
+async def _serve(host: str, port: int, ocr_workers: int, api_concurrency: int, ocr_timeout: float,
+                 use_ocr_cache: bool, use_store: bool, prompt_budget: Optional[int],
+                 preprocess_image: bool, use_llm_cache: bool = True) -> None:
+    import asyncio
+    from service import Coalescer, HTTPError, HTTPService, Request
+    get_router().warm()  # load the HTTP stack now rather than during the first request
+    worker_pool = start_ocr_pool(max(1, ocr_workers), ocr_timeout)
+    ocr_cache = open_ocr_cache() if use_ocr_cache else None
+    llm_cache = open_llm_cache() if use_llm_cache else None
+    store = open_match_store() if use_store else None
+    # The store's SQLite connection is shared by the pipeline threads
+    store_lock = threading.Lock()
+    ocr_executor = ThreadPoolExecutor(max_workers=max(1, ocr_workers), thread_name_prefix="ocr")
+    llm_executor = ThreadPoolExecutor(max_workers=max(1, api_concurrency), thread_name_prefix="llm")
+    service = HTTPService(host, port)
+    coalescer = Coalescer()
+
+    def ocr_upload(image: bytes, suffix: str, profile: RunProfile) -> Optional[Dict[str, object]]:
+        fd, image_path = tempfile.mkstemp(prefix="fmn-upload-", suffix=suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(image)
+            return run_ocr(image_path, ocr_cache, worker_pool, profile, preprocess_image, ocr_timeout)
+        finally:
+            os.remove(image_path)
+
+    def analyze(ocr_data: Dict[str, object], row: Dict[str, str], profile: RunProfile,
+                image_hash: str) -> Tuple[Dict[str, object], CompiledPrompt]:
+        with store_lock:
+            return analyze_match(ocr_data, row, row.get("date") or _now(), store, profile, prompt_budget,
+                                 image_hash)
+
+    def record(result: Dict[str, object], image_hash: str) -> None:
+        with store_lock:
+            store.record_match(result["played_at"], result["home_team"], result["away_team"],
+                               result["home_score"], result["away_score"], result["stats"],
+                               result["context"], result.get("questions"), image_hash=image_hash,
+                               stats_vector=stats_vector(MatchStats.from_ocr(result["stats"])))
+
+    async def pipeline(image: bytes, suffix: str, row: Dict[str, str], fresh: bool) -> Dict[str, object]:
+        loop = asyncio.get_running_loop()
+        image_hash = hashlib.sha256(image).hexdigest()
+        profile = RunProfile(image_hash[:12])
+        try:
+            ocr_data = await loop.run_in_executor(ocr_executor, ocr_upload, image, suffix, profile)
+            if not ocr_data:
+                raise HTTPError(422, "failed to extract data from screenshot")
+            try:
+                result, prompt = await loop.run_in_executor(llm_executor, analyze, ocr_data, row, profile,
+                                                             image_hash)
+            except ValueError as e:
+                raise HTTPError(422, str(e))
+            try:
+                result["questions"] = await loop.run_in_executor(
+                    llm_executor, generate_questions, prompt, llm_cache, fresh, profile, PRIORITY_INTERACTIVE)
+            except api_errors() as e:
+                raise HTTPError(502, f"question generation failed: {e}")
+            if store is not None:
+                await loop.run_in_executor(llm_executor, record, result, image_hash)
+            profile.finish()
+        except HTTPError as e:
+            profile.finish("failed", e.message)
+            raise
+        finally:
+            if profile.wall_seconds is None:
+                profile.finish("failed", "internal error")
+            await loop.run_in_executor(None, report_run, "serve", [profile], profile.wall_seconds)
+        result["image_hash"] = image_hash
+        result["timings"] = {"wall_seconds": round(profile.wall_seconds, 6), **profile.to_dict()["stages"]}
+        return result
+
+    async def handle_analyze(request: Request) -> Tuple[int, object]:
+        if service.draining:
+            raise HTTPError(503, "shutting down")
+        image, suffix, row = _read_upload(request)
+        fresh = request.query.get("fresh", "").lower() in ("1", "true", "yes")
+        key = hashlib.sha256(image).hexdigest() + json.dumps(row, sort_keys=True) + str(fresh)
+        result, shared = await coalescer.run(key, lambda: pipeline(image, suffix, row, fresh))
+        return 200, {**result, "coalesced": shared}
+
+    async def handle_health(request: Request) -> Tuple[int, object]:
+        payload = {
+            "status": "draining" if service.draining else "ok",
+            "uptime_seconds": round(time.time() - service.started_at, 1),
+            "requests": service.requests,
+            "active": service.active,
+            "pipelines": coalescer.inflight,
+            "coalesced": coalescer.coalesced,
+            "ocr": ({"mode": "workers", "size": worker_pool.size, "alive": worker_pool.alive}
+                    if worker_pool is not None else {"mode": "process"}),
+            "ocr_cache": ocr_cache.summary() if ocr_cache is not None else None,
+            "llm_cache": llm_cache.summary() if llm_cache is not None else None,
+            "scheduler": get_scheduler().summary(),
+            "backends": get_router().summary(),
+        }
+        return (503 if service.draining else 200), payload
+
+    service.route("POST", "/analyze", handle_analyze)
+    service.route("GET", "/health", handle_health)
+    try:
+        await service.serve(lambda bound: print(
+            f"Serving on http://{host}:{bound} "
+            f"({worker_pool.size if worker_pool is not None else 0} OCR workers). Press Ctrl+C to stop."))
+    finally:
+        print("Shutting down...")
+        ocr_executor.shutdown(wait=True)
+        llm_executor.shutdown(wait=True)
+        if worker_pool is not None:
+            worker_pool.close()
+        if store is not None:
+            store.close()
+
+
+def extract(image_paths: List[str], use_ocr_cache: bool = True, preprocess_image: bool = False,
+            show_profile: bool = False, merge: bool = False) -> int:
+    """
+    Run OCR only and print one JSON line per screenshot with the teams, score and stats.
+    A screen recording counts as one match; with merge=True all inputs do, and a
+    single line is printed for them (see run_match_ocr).
+    Never loads the API client, so it needs neither network access nor GROQ_API_KEY.
+    Returns the number of matches OCR failed on.
+    """
+    ocr_cache = open_ocr_cache() if use_ocr_cache else None
+    run_start = time.perf_counter()
+    profiles = []
+    failures = 0
+    for paths in [image_paths] if merge else [[path] for path in image_paths]:
+        source = {"image": paths[0]} if len(paths) == 1 else {"images": paths}
+        profile = RunProfile(os.path.basename(paths[0]))
+        profiles.append(profile)
+        error = "failed to extract data from screenshot"
+        ocr_data = None
+        if all(os.path.isfile(path) for path in paths):
+            try:
+                ocr_data = run_match_ocr(paths, ocr_cache, None, profile, preprocess_image)
+            except ValueError as e:
+                error = str(e)
+        if not ocr_data:
+            failures += 1
+            profile.finish("failed", error)
+            print(json.dumps({**source, "error": error}))
+            continue
+        profile.finish()
+        score = extract_score_from_stats(ocr_data["stats"])
+        line = {
+            **source,
+            "home_team": ocr_data.get("home_team"),
+            "away_team": ocr_data.get("away_team"),
+            "score": f"{score[0]}-{score[1]}" if score else None,
+            "stats": {name: list(values) for name, values in ocr_data["stats"].items()},
+        }
+        if ocr_data.get("confidence"):
+            line["confidence"] = ocr_data["confidence"]
+        if "frames" in ocr_data:
+            line["frames"] = ocr_data["frames"]
+        print(json.dumps(line, ensure_ascii=False))
+    report_run("extract", profiles, time.perf_counter() - run_start, show_profile)
+    return failures
+
+
+def show_history(team: str, opponent: Optional[str] = None, limit: int = 5) -> None:
+    """Print recent results for a team, or its meetings with an opponent, from the match store."""
+    with open_match_store() as store:
+        if opponent:
+            matches = store.head_to_head(team, opponent, limit)
+            title = f"Last {limit} meetings: {team} vs {opponent}"
+        else:
+            matches = store.recent_results(team, limit)
+            title = f"Last {limit} results for {team}"
+        print(title)
+        if not matches:
+            print("No stored matches.")
+        for match in matches:
+            print(f"  {describe_match(match)}")
+
+
+def _build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="FM24 press conference question generator.")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("--no-ocr-cache", action="store_true",
+                        help="Always run OCR, ignoring cached results for known screenshots.")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Generate new questions even if this exact prompt was answered before.")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Neither read nor write cached questions; every prompt goes to the API.")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Wait for the full completion instead of printing questions as they arrive.")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Neither read nor record match history in the local match store.")
+    parser.add_argument("--session", action="store_true",
+                        help="Hold a press conference: answer each question and get follow-ups.")
+    parser.add_argument("--turns", type=int, default=DEFAULT_SESSION_TURNS,
+                        help=f"Most questions in a --session press conference (default: {DEFAULT_SESSION_TURNS}).")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-stage timings, token counts and retries when the run ends.")
+    parser.add_argument("--prometheus", metavar="PATH",
+                        help="Also write the run's metrics to PATH in the Prometheus textfile format.")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Crop screenshots to the stats screen and scale them to 1080p before handing them to OCR.")
+    parser.add_argument("--prompt-budget", type=int, default=DEFAULT_PROMPT_BUDGET,
+                        help="Approximate prompt tokens per match; 0 disables the budget "
+                             f"(default: {DEFAULT_PROMPT_BUDGET}).")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="API requests per minute allowed by your Groq account (default: 30).")
+    parser.add_argument("--tpm", type=float, default=None,
+                        help="API tokens per minute allowed by your Groq account (default: 12000).")
+    parser.add_argument("--backends", metavar="PATH", default=None,
+                        help="JSON list of LLM backends to hedge and fall back between "
+                             "(default: $FMNARRATIVE_BACKENDS, else Groq alone).")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser("batch", help="Process a folder of match screenshots without prompting.")
+    batch.add_argument("directory", help="Folder containing the match screenshots.")
+    batch.add_argument("--context", required=True, help="CSV with one row of match context per screenshot.")
+    batch.add_argument("--output", help="Folder for the per-match JSON results (default: <directory>/results).")
+    batch.add_argument("--ocr-workers", type=int, default=None,
+                       help="OCR processes to run in parallel (default: number of CPUs).")
+    batch.add_argument("--ocr-timeout", type=float, default=OCR_TIMEOUT,
+                       help="Seconds allowed per screenshot before its OCR worker or process is stopped (default: 60).")
+    batch.add_argument("--api-concurrency", type=int, default=4,
+                       help="Maximum concurrent question-generation requests (default: 4).")
+    batch.add_argument("--no-ocr-cache", action="store_true", default=argparse.SUPPRESS,
+                       help="Always run OCR, ignoring cached results for known screenshots.")
+    batch.add_argument("--fresh", action="store_true", default=argparse.SUPPRESS,
+                       help="Generate new questions even if this exact prompt was answered before.")
+    batch.add_argument("--no-llm-cache", action="store_true", default=argparse.SUPPRESS,
+                       help="Neither read nor write cached questions; every prompt goes to the API.")
+    batch.add_argument("--no-store", action="store_true", default=argparse.SUPPRESS,
+                       help="Neither read nor record match history in the local match store.")
+    batch.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                       help="Print per-stage timings, token counts and retries when the run ends.")
+    batch.add_argument("--prometheus", metavar="PATH", default=argparse.SUPPRESS,
+                       help="Also write the run's metrics to PATH in the Prometheus textfile format.")
+    batch.add_argument("--preprocess", action="store_true", default=argparse.SUPPRESS,
+                       help="Crop screenshots to the stats screen and scale them to 1080p before handing them to OCR.")
+    batch.add_argument("--prompt-budget", type=int, default=argparse.SUPPRESS,
+                       help="Approximate prompt tokens per match; 0 disables the budget "
+                            f"(default: {DEFAULT_PROMPT_BUDGET}).")
+    batch.add_argument("--rpm", type=float, default=argparse.SUPPRESS,
+                       help="API requests per minute allowed by your Groq account (default: 30).")
+    batch.add_argument("--tpm", type=float, default=argparse.SUPPRESS,
+                       help="API tokens per minute allowed by your Groq account (default: 12000).")
+    batch.add_argument("--backends", metavar="PATH", default=argparse.SUPPRESS,
+                       help="JSON list of LLM backends to hedge and fall back between "
+                            "(default: $FMNARRATIVE_BACKENDS, else Groq alone).")
+
+    watch = subparsers.add_parser("watch", help="Run OCR on new screenshots in a folder as soon as they appear.")
+    watch.add_argument("directory", help="Folder FM saves screenshots to.")
+    watch.add_argument("--ocr-workers", type=int, default=1,
+                       help="Screenshots to OCR in parallel (default: 1).")
+    watch.add_argument("--ocr-timeout", type=float, default=OCR_TIMEOUT,
+                       help="Seconds allowed per screenshot before its OCR worker or process is stopped (default: 60).")
+    watch.add_argument("--settle", type=float, default=0.5,
+                       help="Seconds a file must stay unchanged before it is considered written (default: 0.5).")
+    watch.add_argument("--poll-interval", type=float, default=1.0,
+                       help="Seconds between directory scans when polling (default: 1).")
+    watch.add_argument("--poll", action="store_true",
+                       help="Poll the directory even where inotify is available.")
+    watch.add_argument("--include-existing", action="store_true",
+                       help="Also process screenshots already in a folder that was never watched before.")
+    watch.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                       help="Print per-stage timings after every screenshot.")
+    watch.add_argument("--preprocess", action="store_true", default=argparse.SUPPRESS,
+                       help="Crop screenshots to the stats screen and scale them to 1080p before handing them to OCR.")
+
+    serve_parser = subparsers.add_parser("serve", help="Run as a local HTTP service (POST /analyze, GET /health).")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    serve_parser.add_argument("--ocr-workers", type=int, default=2,
+                              help="Persistent OCR workers kept warm (default: 2).")
+    serve_parser.add_argument("--ocr-timeout", type=float, default=OCR_TIMEOUT,
+                              help="Seconds allowed per screenshot before its OCR worker or process is stopped (default: 60).")
+    serve_parser.add_argument("--api-concurrency", type=int, default=4,
+                              help="Maximum concurrent question-generation requests (default: 4).")
+    serve_parser.add_argument("--no-ocr-cache", action="store_true", default=argparse.SUPPRESS,
+                              help="Always run OCR, ignoring cached results for known screenshots.")
+    serve_parser.add_argument("--no-llm-cache", action="store_true", default=argparse.SUPPRESS,
+                              help="Neither read nor write cached questions; every prompt goes to the API.")
+    serve_parser.add_argument("--no-store", action="store_true", default=argparse.SUPPRESS,
+                              help="Neither read nor record match history in the local match store.")
+    serve_parser.add_argument("--preprocess", action="store_true", default=argparse.SUPPRESS,
+                              help="Crop screenshots to the stats screen and scale them to 1080p before handing them to OCR.")
+    serve_parser.add_argument("--prompt-budget", type=int, default=argparse.SUPPRESS,
+                              help="Approximate prompt tokens per match; 0 disables the budget "
+                                   f"(default: {DEFAULT_PROMPT_BUDGET}).")
+    serve_parser.add_argument("--rpm", type=float, default=argparse.SUPPRESS,
+                              help="API requests per minute allowed by your Groq account (default: 30).")
+    serve_parser.add_argument("--tpm", type=float, default=argparse.SUPPRESS,
+                              help="API tokens per minute allowed by your Groq account (default: 12000).")
+    serve_parser.add_argument("--backends", metavar="PATH", default=argparse.SUPPRESS,
+                              help="JSON list of LLM backends to hedge and fall back between "
+                                   "(default: $FMNARRATIVE_BACKENDS, else Groq alone).")
+
+    extract_parser = subparsers.add_parser("extract", help="Only run OCR and print the stats as JSON lines.")
+    extract_parser.add_argument("images", nargs="+", help="Screenshots or screen recordings to read.")
+    extract_parser.add_argument("--match", action="store_true",
+                                help="All inputs show the same match: merge them into one result.")
+    extract_parser.add_argument("--no-ocr-cache", action="store_true", default=argparse.SUPPRESS,
+                                help="Always run OCR, ignoring cached results for known screenshots.")
+    extract_parser.add_argument("--preprocess", action="store_true", default=argparse.SUPPRESS,
+                                help="Crop screenshots to the stats screen and scale them to 1080p before handing them to OCR.")
+    extract_parser.add_argument("--profile", action="store_true", default=argparse.SUPPRESS,
+                                help="Print per-stage timings when the run ends.")
+
+    history = subparsers.add_parser("history", help="Show stored results for a team.")
+    history.add_argument("team")
+    history.add_argument("--vs", dest="opponent", help="Only show meetings with this opponent.")
+    history.add_argument("--limit", type=int, default=5)
+    return parser
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    args = _build_arg_parser().parse_args(argv)
+    load_env()
+    if args.command in (None, "batch", "serve"):
+        configure_backends(args.backends)
+        get_router()  # fail on a bad backends file or missing key before any work, not at the first API call
+    if args.command == "batch":
+        configure_scheduler(args.rpm, args.tpm, args.api_concurrency)
+        failures = run_batch(args.directory, args.context, args.output,
+                             args.ocr_workers, args.api_concurrency, args.ocr_timeout,
+                             use_ocr_cache=not args.no_ocr_cache, fresh=args.fresh,
+                             use_store=not args.no_store, show_profile=args.profile,
+                             prometheus=args.prometheus, prompt_budget=args.prompt_budget or None,
+                             preprocess_image=args.preprocess, use_llm_cache=not args.no_llm_cache)
+        return 1 if failures else 0
+    if args.command == "watch":
+        failures = run_watch(args.directory, args.ocr_workers, args.ocr_timeout, args.settle,
+                             args.poll_interval, force_polling=args.poll,
+                             include_existing=args.include_existing, show_profile=args.profile,
+                             preprocess_image=args.preprocess)
+        return 1 if failures else 0
+    if args.command == "serve":
+        configure_scheduler(args.rpm, args.tpm, args.api_concurrency)
+        return serve(args.host, args.port, args.ocr_workers, args.api_concurrency, args.ocr_timeout,
+                     use_ocr_cache=not args.no_ocr_cache, use_store=not args.no_store,
+                     prompt_budget=args.prompt_budget or None, preprocess_image=args.preprocess,
+                     use_llm_cache=not args.no_llm_cache)
+    if args.command == "extract":
+        failures = extract(args.images, use_ocr_cache=not args.no_ocr_cache,
+                           preprocess_image=args.preprocess, show_profile=args.profile,
+                           merge=args.match)
+        return 1 if failures else 0
+    if args.command == "history":
+        show_history(args.team, args.opponent, args.limit)
+        return 0
+    configure_scheduler(args.rpm, args.tpm)
+    main(use_ocr_cache=not args.no_ocr_cache, fresh=args.fresh, stream=not args.no_stream,
+         use_store=not args.no_store, show_profile=args.profile, prometheus=args.prometheus,
+         prompt_budget=args.prompt_budget or None, preprocess_image=args.preprocess,
+         session_turns=max(1, args.turns) if args.session else 0, use_llm_cache=not args.no_llm_cache)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(cli())
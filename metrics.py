@@ -0,0 +1,194 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+ENTERTAINMENT_LABELS = {0: "Boring", 1: "Alright", 2: "Decently fun", 5: "Great game", 10: "Incredible match"}
+# Lower bounds of every importance band after the first
+IMPORTANCE_BOUNDS = (1, 2, 4, 7)
+IMPORTANCE_LABELS = (
+    'Low importance',
+    'Moderate importance',
+    'High importance',
+    'Very high importance',
+    'Extremely high importance',
+)
+CARD_LABELS = {0: "Peaceful", 1: "Regular", 2: "Heated", 3: "Brawl"}
+AGGRESSION_GAP_LABELS = ("similar", "slightly", "noticeably", "significantly")
+
+# Columns every metrics input needs, all from the manager's perspective
+INPUT_COLUMNS = (
+    "manager_score", "opp_score", "importance",
+    "manager_shots", "opp_shots", "manager_shots_target", "opp_shots_target",
+    "manager_xg", "opp_xg", "manager_yellow", "opp_yellow", "manager_red", "opp_red",
+)
+
+
+def _ratio_percent(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator * 100, or 0 where the denominator is not positive."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    # Multiply after dividing to match the scalar formula bit for bit
+    return out * 100
+
+
+def derived_metrics(m: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Entertainment, importance band, aggression and efficiency metrics for any number of matches.
+    `m` maps every name in INPUT_COLUMNS to an array with one entry per match.
+    Thresholds are the ones the single-match report has always used.
+    """
+    total_goals = m["manager_score"] + m["opp_score"]
+    entertainment = np.select(
+        [total_goals == 0, total_goals >= 7, total_goals >= 4, total_goals >= 2],
+        [0, 10, 5, 2],
+        default=1,
+    )
+
+    importance_level = np.digitize(m["importance"], IMPORTANCE_BOUNDS)
+
+    aggression_score = (m["manager_yellow"] + m["opp_yellow"]) + (m["manager_red"] + m["opp_red"]) * 2
+    match_aggression = np.select(
+        [aggression_score == 0, aggression_score >= 10, aggression_score >= 5],
+        [0, 3, 2],
+        default=1,
+    )
+
+    manager_aggression = m["manager_yellow"] + m["manager_red"] * 3
+    opp_aggression = m["opp_yellow"] + m["opp_red"] * 3
+    # Positive when the manager's team was the more aggressive side
+    aggression_gap = manager_aggression - opp_aggression
+    gap = np.abs(aggression_gap)
+    aggression_band = np.select([gap == 0, gap <= 2, gap <= 5], [0, 1, 2], default=3)
+
+    return {
+        "total_goals": total_goals,
+        "entertainment": entertainment,
+        "importance_level": importance_level,
+        "aggression_score": aggression_score,
+        "match_aggression": match_aggression,
+        "manager_aggression": manager_aggression,
+        "opp_aggression": opp_aggression,
+        "aggression_gap": aggression_gap,
+        "aggression_band": aggression_band,
+        "manager_shot_accuracy": _ratio_percent(m["manager_shots_target"], m["manager_shots"]),
+        "opp_shot_accuracy": _ratio_percent(m["opp_shots_target"], m["opp_shots"]),
+        "manager_xg_efficiency": _ratio_percent(m["manager_score"], m["manager_xg"]),
+        "opp_xg_efficiency": _ratio_percent(m["opp_score"], m["opp_xg"]),
+        # Goals minus expected goals; negative means the team underperformed its chances
+        "manager_xg_delta": np.asarray(m["manager_score"], dtype=np.float64) - m["manager_xg"],
+    }
+
+
+# STAT_FIELDS fields that feed the metrics, read from both sides
+PERSPECTIVE_FIELDS = ("shots", "shots_target", "xg", "yellow", "red", "possession")
+
+
+def perspective_columns(home: np.ndarray, away: np.ndarray, home_score: np.ndarray, away_score: np.ndarray,
+                        is_home: np.ndarray, importance: np.ndarray,
+                        field_index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """
+    Metrics input columns from (matches x stats) home/away matrices, flipped per match
+    so that every row is seen from the manager's side.
+    """
+    is_home = np.asarray(is_home, dtype=bool)
+    mine = np.where(is_home[:, None], home, away)
+    theirs = np.where(is_home[:, None], away, home)
+    columns = {
+        "manager_score": np.where(is_home, home_score, away_score),
+        "opp_score": np.where(is_home, away_score, home_score),
+        "importance": np.asarray(importance, dtype=np.float64),
+    }
+    for field in PERSPECTIVE_FIELDS:
+        columns[f"manager_{field}"] = mine[:, field_index[field]]
+        columns[f"opp_{field}"] = theirs[:, field_index[field]]
+    return columns
+
+
+def metric_table(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Input columns and derived metrics in one mapping, as used for season rankings."""
+    table = dict(columns)
+    table.update(derived_metrics(columns))
+    return table
+
+
+def _ordinal(n: int) -> str:
+    if 10 <= n % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def rank_of(values: np.ndarray, current: float, highest: bool = True) -> int:
+    """1-based rank of `current` among `values` plus itself (1 = highest, or lowest if highest=False)."""
+    values = np.asarray(values, dtype=np.float64)
+    better = np.count_nonzero(values > current) if highest else np.count_nonzero(values < current)
+    return int(better) + 1
+
+
+def percentile_of(values: np.ndarray, current: float) -> float:
+    """Share of `values` (in %) strictly below `current`, counting ties as half."""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return 50.0
+    below = np.count_nonzero(values < current)
+    ties = np.count_nonzero(values == current)
+    return float((below + 0.5 * ties) / values.size * 100)
+
+
+# (metric, description, rank the highest values first, superlative)
+SEASON_RANKINGS: Sequence = (
+    ("manager_xg_delta", "xG underperformance", False, "largest"),
+    ("manager_xg_delta", "xG overperformance", True, "largest"),
+    ("manager_shot_accuracy", "shot accuracy", True, "highest"),
+    ("manager_possession", "possession share", True, "highest"),
+    # More cards is worse: the match with the most card points has the worst record
+    ("manager_aggression", "disciplinary record (card points: yellow 1, red 3)", True, "worst"),
+)
+# (metric, label) reported as season percentiles
+SEASON_PERCENTILES: Sequence = (
+    ("manager_shot_accuracy", "shot accuracy"),
+    ("manager_xg_delta", "goals minus xG"),
+    ("manager_possession", "possession"),
+)
+
+
+def season_highlights(season: Dict[str, np.ndarray], current: Dict[str, float],
+                      top: int = 3, min_matches: int = 5) -> List[str]:
+    """
+    Prompt lines ranking the current match against earlier stored matches, e.g.
+    "This is the 2nd-largest xG underperformance in 14 stored matches", plus one
+    line of percentiles. `season` holds metric arrays for the earlier matches and
+    `current` the same metrics for this one. Empty until `min_matches` are stored.
+    """
+    count = len(season.get("manager_xg_delta", ()))
+    if count + 1 < min_matches:
+        return []
+
+    lines = []
+    for metric, description, highest, superlative in SEASON_RANKINGS:
+        if metric not in season or metric not in current:
+            continue
+        value = current[metric]
+        # Over/underperformance only counts in its own direction
+        if metric == "manager_xg_delta" and (value == 0 or (value > 0) != highest):
+            continue
+        # A match without cards cannot be the worst disciplinary record, however many tie
+        if metric == "manager_aggression" and value == 0:
+            continue
+        rank = rank_of(season[metric], value, highest=highest)
+        if rank > top:
+            continue
+        position = superlative if rank == 1 else f"{_ordinal(rank)}-{superlative}"
+        lines.append(f"This is the {position} {description} in {count + 1} stored matches")
+
+    percentiles = [
+        f"{label} {percentile_of(season[metric], current[metric]):.0f}"
+        for metric, label in SEASON_PERCENTILES
+        if metric in season and metric in current
+    ]
+    if percentiles:
+        lines.append(f"Season percentiles vs {count} earlier matches: {', '.join(percentiles)}")
+    return lines
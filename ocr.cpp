@@ -14,10 +14,18 @@
 #include <memory>
 #include <stdexcept>
 
+// Every screenshot is normalised to this many rows before any region is read, so the
+// pixel sizes below (header band, kernels, row heights) mean the same at any resolution.
+// preprocess.py produces the same frame (TARGET_HEIGHT) and must be kept in step.
+const int REFERENCE_HEIGHT = 1080;
+// Height of the team-name band in a REFERENCE_HEIGHT frame
+const int TEAM_HEADER_HEIGHT = 150;
+
 struct MatchStatistic {
     std::string statName;
     std::string homeValue;
     std::string awayValue;
+    int confidence = 0;  // 0-100: the lower of the two values' Tesseract confidences, 0 when defaulted
     std::string homeTeam;
     std::string awayTeam;
 };
@@ -110,12 +118,16 @@ public:
     OCRReader(OCRReader&&) noexcept = default;
     OCRReader& operator=(OCRReader&&) noexcept = default;
 
+    // Mean word confidence (0-100) Tesseract reported for the most recent OCR call
+    int lastConfidence = 0;
+
     // Perform OCR using general text recognition engine
     std::string performGeneralOCR(const cv::Mat& image) {
         ocrGeneral->SetImage(image.data, image.cols, image.rows, 1, image.cols);
         char* outText = ocrGeneral->GetUTF8Text();
         std::string result(outText);
         delete[] outText;
+        lastConfidence = ocrGeneral->MeanTextConf();
         return result;
     }
     
@@ -125,6 +137,7 @@ public:
         char* outText = ocrNumbers->GetUTF8Text();
         std::string result(outText);
         delete[] outText;
+        lastConfidence = ocrNumbers->MeanTextConf();
         return result;
     }
 
@@ -195,7 +208,7 @@ public:
             gray = image.clone();
         }
 
-        int headerHeight = std::min(150, gray.rows / 3);
+        int headerHeight = std::min(gray.rows * TEAM_HEADER_HEIGHT / REFERENCE_HEIGHT, gray.rows / 3);
         cv::Rect headerRegion(0, 0, gray.cols, headerHeight);
         cv::Mat header = gray(headerRegion);
         
@@ -210,6 +223,50 @@ public:
         return header;
     }
 
+    // Bounding box of the screen content: the frame minus edge rows and columns of a single
+    // colour (letterbox or window bars). Falls back to the whole frame if that leaves less
+    // than half of it. preprocess.content_box applies the same rule.
+    cv::Rect contentBox(const cv::Mat& gray) {
+        cv::Mat rowMin, rowMax, colMin, colMax;
+        cv::reduce(gray, rowMin, 1, cv::REDUCE_MIN);
+        cv::reduce(gray, rowMax, 1, cv::REDUCE_MAX);
+        cv::reduce(gray, colMin, 0, cv::REDUCE_MIN);
+        cv::reduce(gray, colMax, 0, cv::REDUCE_MAX);
+
+        int top = 0, bottom = gray.rows - 1, left = 0, right = gray.cols - 1;
+        while (top <= bottom && rowMin.at<uchar>(top, 0) == rowMax.at<uchar>(top, 0)) top++;
+        while (bottom >= top && rowMin.at<uchar>(bottom, 0) == rowMax.at<uchar>(bottom, 0)) bottom--;
+        while (left <= right && colMin.at<uchar>(0, left) == colMax.at<uchar>(0, left)) left++;
+        while (right >= left && colMin.at<uchar>(0, right) == colMax.at<uchar>(0, right)) right--;
+
+        cv::Rect whole(0, 0, gray.cols, gray.rows);
+        if (top > bottom || left > right) return whole;
+        cv::Rect box(left, top, right - left + 1, bottom - top + 1);
+        if (box.height * 2 < gray.rows || box.width * 2 < gray.cols) return whole;
+        return box;
+    }
+
+    // Grayscale screen content scaled to REFERENCE_HEIGHT rows, aspect ratio kept.
+    // Every region below is read from this frame; the later grayscale conversions are no-ops.
+    cv::Mat normalizeScreen(const cv::Mat& image) {
+        cv::Mat gray;
+        if (image.channels() > 1) {
+            cv::cvtColor(image, gray, cv::COLOR_BGR2GRAY);
+        } else {
+            gray = image.clone();
+        }
+
+        cv::Mat content = gray(contentBox(gray));
+        if (content.rows == REFERENCE_HEIGHT) {
+            return content.clone();
+        }
+        int width = (content.cols * REFERENCE_HEIGHT + content.rows / 2) / content.rows;
+        cv::Mat normalized;
+        cv::resize(content, normalized, cv::Size(std::max(1, width), REFERENCE_HEIGHT), 0, 0,
+                   content.rows > REFERENCE_HEIGHT ? cv::INTER_AREA : cv::INTER_CUBIC);
+        return normalized;
+    }
+
     // Split OCR text output into individual lines and trim whitespace
     std::vector<std::string> splitLines(const std::string& text) {
         std::vector<std::string> lines;
@@ -392,6 +449,7 @@ public:
             cv::imwrite("debug_full_row_" + std::to_string(row) + ".png", fullRowProcessed);
             
             std::string fullRowText = performGeneralOCR(fullRowProcessed);
+            int fullRowConf = lastConfidence;
             std::string lowerFullRowText = fullRowText;
             std::transform(lowerFullRowText.begin(), lowerFullRowText.end(), lowerFullRowText.begin(), ::tolower);
             lowerFullRowText = std::regex_replace(lowerFullRowText, std::regex("^\\s+|\\s+$"), "");
@@ -485,11 +543,17 @@ public:
             cv::resize(rightOriginalGray, rightOriginalGray, cv::Size(), 3.0, 3.0, cv::INTER_CUBIC);
             
             std::string leftText = performNumbersOCR(leftProcessed);
+            int leftConf = lastConfidence;
             std::string rightText = performNumbersOCR(rightProcessed);
+            int rightConf = lastConfidence;
             std::string leftTextOriginal = performNumbersOCR(leftOriginalGray);
+            int leftConfOriginal = lastConfidence;
             std::string rightTextOriginal = performNumbersOCR(rightOriginalGray);
+            int rightConfOriginal = lastConfidence;
             std::string leftTextGeneral = performGeneralOCR(leftProcessed);
+            int leftConfGeneral = lastConfidence;
             std::string rightTextGeneral = performGeneralOCR(rightProcessed);
+            int rightConfGeneral = lastConfidence;
             
             std::cerr << "Left numbers OCR (processed): '" << leftText << "'" << std::endl;
             std::cerr << "Left numbers OCR (original): '" << leftTextOriginal << "'" << std::endl;
@@ -505,13 +569,16 @@ public:
                                    foundStatName == "headers won");
             
             // Try all OCR results and pick the best number
+            // Each value's confidence is the one reported by the pass it came from
             std::string homeValue = extractBestNumber(leftText, expectPercentage);
-            if (homeValue.empty()) homeValue = extractBestNumber(leftTextOriginal, expectPercentage);
-            if (homeValue.empty()) homeValue = extractBestNumber(leftTextGeneral, expectPercentage);
+            int homeConf = leftConf;
+            if (homeValue.empty()) { homeValue = extractBestNumber(leftTextOriginal, expectPercentage); homeConf = leftConfOriginal; }
+            if (homeValue.empty()) { homeValue = extractBestNumber(leftTextGeneral, expectPercentage); homeConf = leftConfGeneral; }
             
             std::string awayValue = extractBestNumber(rightText, expectPercentage);
-            if (awayValue.empty()) awayValue = extractBestNumber(rightTextOriginal, expectPercentage);
-            if (awayValue.empty()) awayValue = extractBestNumber(rightTextGeneral, expectPercentage);
+            int awayConf = rightConf;
+            if (awayValue.empty()) { awayValue = extractBestNumber(rightTextOriginal, expectPercentage); awayConf = rightConfOriginal; }
+            if (awayValue.empty()) { awayValue = extractBestNumber(rightTextGeneral, expectPercentage); awayConf = rightConfGeneral; }
             
             // Fallback: extract first and last numbers from full row text
             if ((homeValue.empty() || awayValue.empty()) && !foundStatName.empty()) {
@@ -531,8 +598,9 @@ public:
                 std::cerr << std::endl;
                 
                 if (allNumbers.size() >= 2) {
-                    if (homeValue.empty()) homeValue = allNumbers[0];
-                    if (awayValue.empty()) awayValue = allNumbers[allNumbers.size() - 1];
+                    // Position in the full row is only a guess at which number is which
+                    if (homeValue.empty()) { homeValue = allNumbers[0]; homeConf = fullRowConf / 2; }
+                    if (awayValue.empty()) { awayValue = allNumbers[allNumbers.size() - 1]; awayConf = fullRowConf / 2; }
                     std::cerr << "Extracted from full row: Home=" << homeValue << ", Away=" << awayValue << std::endl;
                 } else if (allNumbers.size() == 1) {
                     std::cerr << "Only one number found, cannot extract both values" << std::endl;
@@ -550,13 +618,14 @@ public:
             cv::imwrite(rightDebug, rightProcessed);
             
             // Use "0" as default if value extraction completely failed
-            if (homeValue.empty()) homeValue = "0";
-            if (awayValue.empty()) awayValue = "0";
+            if (homeValue.empty()) { homeValue = "0"; homeConf = 0; }
+            if (awayValue.empty()) { awayValue = "0"; awayConf = 0; }
             
             MatchStatistic stat;
             stat.statName = foundStatName;
             stat.homeValue = homeValue;
             stat.awayValue = awayValue;
+            stat.confidence = std::min(homeConf, awayConf);
             statistics.push_back(stat);
             
             std::cerr << "*** ADDED: " << foundStatName << " = " << homeValue << " vs " << awayValue << " ***" << std::endl;
@@ -623,6 +692,7 @@ public:
             // OCR full row and extract stat name
             cv::Mat fullRowProcessed = preprocessForText(fullRowImage);
             std::string fullRowText = performGeneralOCR(fullRowProcessed);
+            int fullRowConf = lastConfidence;
             std::string lowerFullRowText = fullRowText;
             std::transform(lowerFullRowText.begin(), lowerFullRowText.end(), lowerFullRowText.begin(), ::tolower);
             lowerFullRowText = std::regex_replace(lowerFullRowText, std::regex("^\\s+|\\s+$"), "");
@@ -679,15 +749,21 @@ public:
                                        foundStatName == "headers won");
                 
                 std::string leftText = performNumbersOCR(leftProcessed);
+                int leftConf = lastConfidence;
                 std::string rightText = performNumbersOCR(rightProcessed);
+                int rightConf = lastConfidence;
                 std::string leftTextGeneral = performGeneralOCR(leftProcessed);
+                int leftConfGeneral = lastConfidence;
                 std::string rightTextGeneral = performGeneralOCR(rightProcessed);
+                int rightConfGeneral = lastConfidence;
                 
                 std::string homeValue = extractBestNumber(leftText, expectPercentage);
-                if (homeValue.empty()) homeValue = extractBestNumber(leftTextGeneral, expectPercentage);
+                int homeConf = leftConf;
+                if (homeValue.empty()) { homeValue = extractBestNumber(leftTextGeneral, expectPercentage); homeConf = leftConfGeneral; }
                 
                 std::string awayValue = extractBestNumber(rightText, expectPercentage);
-                if (awayValue.empty()) awayValue = extractBestNumber(rightTextGeneral, expectPercentage);
+                int awayConf = rightConf;
+                if (awayValue.empty()) { awayValue = extractBestNumber(rightTextGeneral, expectPercentage); awayConf = rightConfGeneral; }
                 
                 // Fallback: use first and last numbers from full row
                 if (homeValue.empty() || awayValue.empty()) {
@@ -701,18 +777,19 @@ public:
                     }
                     
                     if (allNumbers.size() >= 2) {
-                        if (homeValue.empty()) homeValue = allNumbers[0];
-                        if (awayValue.empty()) awayValue = allNumbers[allNumbers.size() - 1];
+                        if (homeValue.empty()) { homeValue = allNumbers[0]; homeConf = fullRowConf / 2; }
+                        if (awayValue.empty()) { awayValue = allNumbers[allNumbers.size() - 1]; awayConf = fullRowConf / 2; }
                     }
                 }
                 
-                if (homeValue.empty()) homeValue = "0";
-                if (awayValue.empty()) awayValue = "0";
+                if (homeValue.empty()) { homeValue = "0"; homeConf = 0; }
+                if (awayValue.empty()) { awayValue = "0"; awayConf = 0; }
                 
                 MatchStatistic stat;
                 stat.statName = foundStatName;
                 stat.homeValue = homeValue;
                 stat.awayValue = awayValue;
+                stat.confidence = std::min(homeConf, awayConf);
                 statistics.push_back(stat);
                 
                 // Save debug images for verification
@@ -728,12 +805,14 @@ public:
 
     // Main processing function: extracts team names and all statistics from screenshot
     void processScreenshot(const std::string& imagePath) {
-        cv::Mat image = cv::imread(imagePath);
-        if (image.empty()) {
+        cv::Mat original = cv::imread(imagePath);
+        if (original.empty()) {
             throw std::runtime_error("Could not load image: " + imagePath);
         }
+        cv::Mat image = normalizeScreen(original);
 
-        std::cerr << "Image size: " << image.cols << "x" << image.rows << std::endl;
+        std::cerr << "Image size: " << original.cols << "x" << original.rows
+                  << ", normalized to " << image.cols << "x" << image.rows << std::endl;
 
         auto teamNames = extractTeamNames(image);
         
@@ -746,14 +825,18 @@ public:
         // Calculate total shots by adding on-target and off-target shots
         std::string onTargetHome = "0", onTargetAway = "0";
         std::string offTargetHome = "0", offTargetAway = "0";
+        // Missing either part leaves the total wrong, which a confidence of 0 says
+        int onTargetConf = 0, offTargetConf = 0;
         
         for (const auto& stat : stats) {
             if (stat.statName == "on target") {
                 onTargetHome = stat.homeValue;
                 onTargetAway = stat.awayValue;
+                onTargetConf = stat.confidence;
             } else if (stat.statName == "off target") {
                 offTargetHome = stat.homeValue;
                 offTargetAway = stat.awayValue;
+                offTargetConf = stat.confidence;
             }
         }
         
@@ -765,6 +848,7 @@ public:
         totalShotsStat.statName = "shots";
         totalShotsStat.homeValue = std::to_string(totalShotsHome);
         totalShotsStat.awayValue = std::to_string(totalShotsAway);
+        totalShotsStat.confidence = std::min(onTargetConf, offTargetConf);
         totalShotsStat.homeTeam = teamNames.first.empty() ? "Home" : teamNames.first;
         totalShotsStat.awayTeam = teamNames.second.empty() ? "Away" : teamNames.second;
         
@@ -785,21 +869,50 @@ public:
         std::cout << "AWAY_TEAM:" << (teamNames.second.empty() ? "UNKNOWN" : teamNames.second) << std::endl;
 
         for (const auto& stat : stats) {
-            std::cout << "STAT:" << stat.statName << "|" << stat.homeValue << "|" << stat.awayValue << std::endl;
+            std::cout << "STAT:" << stat.statName << "|" << stat.homeValue << "|" << stat.awayValue
+                      << "|" << stat.confidence << std::endl;
         }
 
         std::cerr << "Total stats extracted: " << stats.size() << std::endl;
     }
 };
 
+// Long-lived mode: reads one image path per line from stdin and answers each with the
+// usual HOME_TEAM/AWAY_TEAM/STAT records followed by END, reusing the loaded Tesseract models
+int runWorker(OCRReader& reader) {
+    std::cout << "READY" << std::endl;
+
+    std::string imagePath;
+    while (std::getline(std::cin, imagePath)) {
+        if (!imagePath.empty() && imagePath[imagePath.size() - 1] == '\r') {
+            imagePath.erase(imagePath.size() - 1);
+        }
+        if (imagePath.empty()) {
+            continue;
+        }
+
+        try {
+            reader.processScreenshot(imagePath);
+        } catch (const std::exception& e) {
+            std::cout << "ERROR:" << e.what() << std::endl;
+        }
+        std::cout << "END" << std::endl;
+    }
+
+    return 0;
+}
+
 int main(int argc, char* argv[]) {
     if (argc != 2) {
-        std::cout << "Usage: " << argv[0] << " <screenshot_path>" << std::endl;
+        std::cout << "Usage: " << argv[0] << " <screenshot_path> | --worker" << std::endl;
         return 1;
     }
 
     try {
         OCRReader reader;
+        if (std::string(argv[1]) == "--worker") {
+            return runWorker(reader);
+        }
         reader.processScreenshot(argv[1]);
     } catch (const std::exception& e) {
         std::cerr << "Error: " << e.what() << std::endl;
@@ -0,0 +1,193 @@
+import queue
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+READY_MARKER = "READY"
+END_MARKER = "END"
+ERROR_PREFIX = "ERROR:"
+
+
+class WorkerModeUnsupported(RuntimeError):
+    """The OCR binary did not announce itself as a worker (older build or failed start)."""
+
+
+class OCRWorkerError(RuntimeError):
+    """A worker crashed while processing an image."""
+
+
+class OCRWorkerTimeout(OCRWorkerError):
+    """A worker took longer than the per-image timeout."""
+
+
+def _pump_lines(stream, lines: "queue.Queue[Optional[str]]") -> None:
+    """Forward stdout lines from a worker into a queue; None marks end of stream."""
+    for line in stream:
+        lines.put(line.rstrip("\r\n"))
+    lines.put(None)
+
+
+class OCRWorker:
+    """
+    One long-lived `ocr --worker` process.
+    The binary loads OpenCV and the Tesseract models once, then answers each image
+    path written to stdin with the usual records followed by an END marker.
+    """
+
+    def __init__(self, binary: str):
+        self.binary = binary
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def spawn(self) -> None:
+        """Start the process without waiting for it to finish loading."""
+        self.stop()
+        self._lines = queue.Queue()
+        self._proc = subprocess.Popen(
+            [self.binary, "--worker"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(target=_pump_lines, args=(self._proc.stdout, self._lines), daemon=True).start()
+
+    def wait_ready(self, timeout: float) -> None:
+        """Block until the worker reports READY. Raises WorkerModeUnsupported otherwise."""
+        try:
+            first = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            first = None
+        if first != READY_MARKER:
+            self.stop()
+            raise WorkerModeUnsupported(f"{self.binary} does not support --worker")
+
+    def start(self, timeout: float) -> None:
+        self.spawn()
+        self.wait_ready(timeout)
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def process(self, image_path: str, timeout: float) -> Optional[str]:
+        """
+        Run OCR on one image and return the raw record lines as text.
+        Returns None if the binary reported an error for this image.
+        Raises OCRWorkerError if the worker crashes, or OCRWorkerTimeout if it exceeds
+        `timeout`; the worker is stopped in either case and must be started again.
+        """
+        if not self.alive():
+            raise OCRWorkerError("worker is not running")
+
+        try:
+            self._proc.stdin.write(image_path + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.stop()
+            raise OCRWorkerError("worker exited before accepting the image")
+
+        deadline = time.monotonic() + timeout
+        records: List[str] = []
+        failed = False
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                self.stop()
+                raise OCRWorkerTimeout(f"timed out after {timeout:.0f}s on {image_path}")
+            if line is None:
+                self.stop()
+                raise OCRWorkerError(f"worker crashed on {image_path}")
+            if line == END_MARKER:
+                break
+            if line.startswith(ERROR_PREFIX):
+                failed = True
+            else:
+                records.append(line)
+
+        return None if failed else "\n".join(records)
+
+    def stop(self) -> None:
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+class OCRWorkerPool:
+    """
+    A fixed set of OCR workers shared between threads.
+    Crashed or timed-out workers are restarted the next time they are handed out.
+    """
+
+    def __init__(self, binary: str, size: int = 2, timeout: float = 60.0, startup_timeout: float = 30.0):
+        self.binary = binary
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self._idle: "queue.Queue[OCRWorker]" = queue.Queue()
+        self._workers = [OCRWorker(binary) for _ in range(max(1, size))]
+
+        # Spawn every worker first so the model loading happens in parallel
+        for worker in self._workers:
+            worker.spawn()
+        try:
+            for worker in self._workers:
+                worker.wait_ready(startup_timeout)
+        except WorkerModeUnsupported:
+            self.close()
+            raise
+
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    @property
+    def alive(self) -> int:
+        """Workers whose process is currently running."""
+        return sum(1 for worker in self._workers if worker.alive())
+
+    def run(self, image_path: str) -> Optional[str]:
+        """
+        Run OCR on one image using the next idle worker and return the raw output.
+        A crash is retried once on a fresh worker; a timeout is not.
+        Returns None on failure.
+        """
+        worker = self._idle.get()
+        try:
+            for attempt in range(2):
+                try:
+                    if not worker.alive():
+                        worker.start(self.startup_timeout)
+                    return worker.process(image_path, self.timeout)
+                except (WorkerModeUnsupported, OCRWorkerTimeout):
+                    return None
+                except OCRWorkerError:
+                    if attempt == 1:
+                        return None
+            return None
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.stop()
+
+    def __enter__(self) -> "OCRWorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
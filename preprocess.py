@@ -0,0 +1,241 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # optional: without OpenCV the OCR binary reads the original screenshot
+    cv2 = None
+
+# Height the stats screen is normalised to. The OCR binary normalises every screenshot
+# to this height itself (REFERENCE_HEIGHT in ocr.cpp) and the two must match: a copy
+# prepared here is then exactly the frame the binary would have built from the original.
+TARGET_HEIGHT = 1080
+# Bump when the produced images change meaning
+PREPROCESS_VERSION = 3
+# Bump when the learned layouts change meaning
+LAYOUT_VERSION = 2
+
+
+def _png_size(data) -> Optional[Tuple[int, int]]:
+    if data[:8] != b"\x89PNG\r\n\x1a\n" or len(data) < 24:
+        return None
+    return struct.unpack(">II", data[16:24])
+
+
+def _jpeg_size(data) -> Optional[Tuple[int, int]]:
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:  # markers without a length
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def _bmp_size(data) -> Optional[Tuple[int, int]]:
+    if data[:2] != b"BM" or len(data) < 26:
+        return None
+    width, height = struct.unpack("<ii", data[18:26])
+    return width, abs(height)
+
+
+def image_size(path: str) -> Optional[Tuple[int, int]]:
+    """(width, height) from the PNG, JPEG or BMP header, read through mmap without decoding."""
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _png_size(data) or _jpeg_size(data) or _bmp_size(data)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def content_box(gray: np.ndarray) -> Tuple[int, int, int, int]:
+    """
+    (x, y, w, h) of the screen content: the frame minus edge rows and columns of a single
+    colour (letterbox or window bars), or the whole frame if that leaves less than half
+    of it. Same rule as contentBox in ocr.cpp.
+    """
+    height, width = gray.shape
+    busy_rows = np.flatnonzero(gray.min(axis=1) != gray.max(axis=1))
+    busy_cols = np.flatnonzero(gray.min(axis=0) != gray.max(axis=0))
+    if busy_rows.size == 0 or busy_cols.size == 0:
+        return 0, 0, width, height
+    y, x = int(busy_rows[0]), int(busy_cols[0])
+    h, w = int(busy_rows[-1]) - y + 1, int(busy_cols[-1]) - x + 1
+    if h * 2 < height or w * 2 < width:
+        return 0, 0, width, height
+    return x, y, w, h
+
+
+def _uniform_rows(strip: np.ndarray) -> bool:
+    return bool((strip == strip[:, :1]).all())
+
+
+def _box_holds(gray: np.ndarray, box: Tuple[int, int, int, int]) -> bool:
+    """
+    True if content_box(gray) would return `box`: every margin row and column outside it
+    is a single colour and its own edge rows and columns are not. Reads only the margins
+    and the box edges instead of the whole frame.
+    """
+    height, width = gray.shape
+    x, y, w, h = box
+    if w <= 0 or h <= 0 or x + w > width or y + h > height:
+        return False
+    if h * 2 < height or w * 2 < width:
+        return False
+    if not (_uniform_rows(gray[:y]) and _uniform_rows(gray[y + h:])
+            and _uniform_rows(gray[:, :x].T) and _uniform_rows(gray[:, x + w:].T)):
+        return False
+    edges = (gray[[y]], gray[[y + h - 1]], gray[:, [x]].T, gray[:, [x + w - 1]].T)
+    return not any(_uniform_rows(edge) for edge in edges)
+
+
+def _normalized_width(w: int, h: int) -> int:
+    """Width of a w x h box scaled to TARGET_HEIGHT, rounded the way ocr.cpp does."""
+    return max(1, (w * TARGET_HEIGHT + h // 2) // h)
+
+
+class LayoutCache:
+    """
+    Content box per screenshot resolution, learned from the first screenshot seen at that
+    size and kept in a small JSON file. FM draws the match stats screen the same way at a
+    given resolution and UI scale, so later screenshots only confirm the box holds (a few
+    rows and columns) instead of scanning the whole frame; a box that no longer holds is
+    learned again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._layouts: Optional[Dict[str, Dict[str, object]]] = None
+        self.hits = 0
+        self.relearned = 0
+
+    @staticmethod
+    def _key(size: Tuple[int, int]) -> str:
+        return f"{size[0]}x{size[1]}"
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        if self._layouts is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    layouts = json.load(f)
+            except (OSError, ValueError):
+                layouts = {}
+            self._layouts = {k: v for k, v in layouts.items()
+                             if isinstance(v, dict) and v.get("version") == LAYOUT_VERSION}
+        return self._layouts
+
+    def get(self, size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        with self._lock:
+            layout = self._load().get(self._key(size))
+        return tuple(layout["box"]) if layout else None
+
+    def put(self, size: Tuple[int, int], box: Tuple[int, int, int, int]) -> None:
+        x, y, w, h = box
+        with self._lock:
+            layouts = self._load()
+            layouts[self._key(size)] = {
+                "version": LAYOUT_VERSION,
+                "box": [x, y, w, h],
+                # Informational: the size OCR reads the content at
+                "normalized": [_normalized_width(w, h), TARGET_HEIGHT],
+            }
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(layouts, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+    def box_for(self, gray: np.ndarray) -> Tuple[int, int, int, int]:
+        """The content box of `gray`, from the cache when the cached box still holds."""
+        size = (gray.shape[1], gray.shape[0])
+        box = self.get(size)
+        if box is not None and _box_holds(gray, box):
+            with self._lock:
+                self.hits += 1
+            return box
+        learned = content_box(gray)
+        if box is not None:
+            with self._lock:
+                self.relearned += 1
+        if learned != box:
+            self.put(size, learned)
+        return learned
+
+
+def available() -> bool:
+    return cv2 is not None
+
+
+def signature() -> str:
+    """Identifies the preprocessing applied, for OCR cache keys; empty when it is unavailable."""
+    return f"preprocess-v{PREPROCESS_VERSION}-{TARGET_HEIGHT}" if cv2 is not None else ""
+
+
+def preprocess_screenshot(image_path: str, layouts: Optional[LayoutCache] = None,
+                          out_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Write the screenshot as the OCR binary would normalise it (grayscale, cropped to its
+    content box, scaled down to TARGET_HEIGHT) and return its path; the caller deletes it
+    after OCR. The binary finds the copy already normalised and reads the same pixels it
+    would have read from the original, so the stats come out the same.
+    Returns None when OpenCV is missing, the image cannot be read, the content is already
+    no taller than TARGET_HEIGHT, or the copy would not be left as it is by the binary;
+    OCR should then read the original.
+    """
+    if cv2 is None:
+        return None
+    size = image_size(image_path)
+    if size is None or size[1] <= TARGET_HEIGHT:
+        return None
+
+    try:
+        # Mapped rather than read, so the compressed bytes never land on the Python heap
+        data = np.memmap(image_path, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+    try:
+        # Decoded in colour and converted, exactly as the binary's imread + cvtColor
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    finally:
+        del data
+    if image is None:
+        return None
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    del image
+
+    x, y, w, h = layouts.box_for(gray) if layouts is not None else content_box(gray)
+    if h <= TARGET_HEIGHT:
+        return None
+    normalized = cv2.resize(gray[y:y + h, x:x + w], (_normalized_width(w, h), TARGET_HEIGHT),
+                            interpolation=cv2.INTER_AREA)
+    # The binary runs contentBox again on the copy; if that would trim anything the copy
+    # would be cropped twice, so leave the original to it
+    if content_box(normalized) != (0, 0, normalized.shape[1], normalized.shape[0]):
+        return None
+
+    fd, out_path = tempfile.mkstemp(prefix="fmn-ocr-", suffix=".png", dir=out_dir)
+    os.close(fd)
+    if not cv2.imwrite(out_path, normalized, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+        os.remove(out_path)
+        return None
+    return out_path
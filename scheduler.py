@@ -0,0 +1,251 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+# Lower runs first; an interactive user should never queue behind a batch
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class TokenBucket:
+    """
+    A bucket of `per_minute` units that refills continuously.
+    The refill rate is lowered by the burst size so that no 60-second window can
+    ever admit more than `per_minute` units. A request larger than the burst waits
+    for a full bucket and then leaves it in debt.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None, now: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 10)
+        self.rate = max(per_minute - self.capacity, 1e-9) / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(needed, 0.0) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        """Return over-estimated units (or charge under-estimated ones when negative)."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Delay requested by the server through retry-after-ms / retry-after headers, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedScheduler:
+    """
+    Admission control for LLM API calls shared by every thread in the process.
+    A call needs a free concurrency slot, one request from the requests/minute bucket
+    and its estimated tokens from the tokens/minute bucket. Buckets are kept per account
+    (any string naming whose limits apply, such as an endpoint and API key), each with
+    the configured limits. Waiting calls are served strictly by priority, then arrival.
+    Failed calls are retried with jittered exponential backoff, or after the server's
+    retry-after; a 429 pauses every call to that account.
+    `clock` gives the time in seconds the buckets and pauses are measured in.
+    """
+
+    def __init__(self, requests_per_minute: float = 30, tokens_per_minute: float = 12000,
+                 max_concurrency: int = 4, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0, transient: Tuple[Type[BaseException], ...] = (),
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.transient = transient
+        self.clock = clock
+        self.retries = 0
+        self.rate_limited = 0
+        self._inflight = 0
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _account_buckets(self, account: str) -> Tuple[TokenBucket, TokenBucket]:
+        """(requests, tokens) buckets of an account, created full on first use. Needs the lock."""
+        buckets = self._buckets.get(account)
+        if buckets is None:
+            now = self.clock()
+            buckets = self._buckets[account] = (TokenBucket(self.requests_per_minute, now=now),
+                                                TokenBucket(self.tokens_per_minute, now=now))
+        return buckets
+
+    def acquire(self, priority: int = PRIORITY_BATCH, tokens: float = 0, account: str = "",
+                blocking: bool = True) -> bool:
+        """
+        Take one admission (concurrency slot plus bucket charges) on `account`; release() returns
+        the slot. Without `blocking`, returns False at once unless it can be taken right now.
+        """
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            # A new arrival may outrank the current head, which then has to step back
+            self._cond.notify_all()
+            try:
+                requests, token_bucket = self._account_buckets(account)
+                while True:
+                    if self._waiting[0] != ticket or self._inflight >= self.max_concurrency:
+                        if not blocking:
+                            return False
+                        self._cond.wait()
+                        continue
+                    now = self.clock()
+                    wait = max(self._paused_until.get(account, 0.0) - now, requests.wait_time(1, now),
+                               token_bucket.wait_time(tokens, now))
+                    if wait <= 0:
+                        requests.take(1, now)
+                        token_bucket.take(tokens, now)
+                        self._inflight += 1
+                        return True
+                    if not blocking:
+                        return False
+                    self._cond.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_BATCH, tokens: float = 0, account: str = "") -> Iterator[None]:
+        """Hold one admission on `account` for the duration of the block."""
+        self.acquire(priority, tokens, account)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def settle_tokens(self, estimated: float, actual: float, account: str = "") -> None:
+        """Correct an account's tokens bucket once a call's real usage is known."""
+        with self._cond:
+            self._account_buckets(account)[1].give_back(estimated - actual)
+            self._cond.notify_all()
+
+    def reject(self, exc: BaseException, tokens: float, account: str = "") -> None:
+        """
+        Book an admitted call that failed with `exc`: its tokens are refunded (it still
+        counts as a request), and after a 429 every call to the account waits for the
+        server's retry-after, or base_delay.
+        """
+        with self._cond:
+            self._account_buckets(account)[1].give_back(tokens)
+            if getattr(exc, "status_code", None) == 429:
+                # The limit is per account, so everyone waits, not just this caller
+                self.rate_limited += 1
+                requested = retry_after_seconds(exc)
+                pause = min(requested, self.max_delay) if requested is not None else self.base_delay
+                self._paused_until[account] = max(self._paused_until.get(account, 0.0), self.clock() + pause)
+            self._cond.notify_all()
+
+    def backoff(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after `exc`, or None if it should not be retried."""
+        status = getattr(exc, "status_code", None)
+        if status is None and not isinstance(exc, self.transient):
+            return None
+        if status is not None and status not in RETRY_STATUSES:
+            return None
+        requested = retry_after_seconds(exc)
+        if requested is not None:
+            # A little jitter so callers released together do not return together
+            return min(requested, self.max_delay) * (1 + random.random() * 0.1)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def retrying(self, fn: Callable[[], T], on_retry: Optional[Callable[[BaseException, float], None]] = None,
+                 retry_allowed: Optional[Callable[[], bool]] = None) -> T:
+        """
+        Run `fn`, retrying retryable failures up to max_retries times. `fn` takes (and
+        books through reject) its own admissions, e.g. one per backend it tries.
+        `on_retry(exc, delay)` is called before each retry; `retry_allowed()` can veto a
+        retry (e.g. once a streamed answer has been partly shown).
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                delay = self.backoff(e, attempt) if attempt < self.max_retries else None
+                if delay is None or (retry_allowed is not None and not retry_allowed()):
+                    raise
+                with self._cond:
+                    self.retries += 1
+                if on_retry is not None:
+                    on_retry(e, delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def call(self, fn: Callable[[], T], tokens: float = 0, priority: int = PRIORITY_BATCH,
+             on_retry: Optional[Callable[[BaseException, float], None]] = None,
+             retry_allowed: Optional[Callable[[], bool]] = None, account: str = "") -> T:
+        """
+        Run `fn` once admitted on `account`, with retries as in retrying().
+        `tokens` is the estimated token cost of one attempt.
+        """
+        def admitted() -> T:
+            with self.slot(priority, tokens, account):
+                try:
+                    return fn()
+                except Exception as e:
+                    self.reject(e, tokens, account)
+                    raise
+
+        return self.retrying(admitted, on_retry, retry_allowed)
+
+    def summary(self) -> str:
+        return f"API scheduler: {self.retries} retries, {self.rate_limited} rate limited"
+
+
+def estimate_tokens(messages: List[dict], completion_tokens: int = 512) -> int:
+    """Rough token cost of a chat request: ~4 characters per prompt token plus the expected completion."""
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + completion_tokens
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import signal
+import time
+from email import policy
+from email.parser import BytesParser
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Set, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlsplit
+
+T = TypeVar("T")
+
+# Largest request body accepted; FM screenshots are a few MB even at 4K
+MAX_BODY_BYTES = 32 * 1024 * 1024
+# Seconds a client may take to send the request line and headers
+HEADER_TIMEOUT = 30.0
+
+
+class HTTPError(Exception):
+    """Raised by handlers to answer with `status` and a JSON {"error": message} body."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]  # lower-case names
+    body: bytes
+
+    def json(self) -> object:
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(400, "request body is not valid JSON")
+
+    def form(self) -> Dict[str, Tuple[Optional[str], bytes]]:
+        """Fields of a multipart/form-data body as name -> (file name, content)."""
+        content_type = self.headers.get("content-type", "")
+        if not content_type.lower().startswith("multipart/form-data"):
+            raise HTTPError(415, "expected multipart/form-data")
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + self.body)
+        if not message.is_multipart():
+            raise HTTPError(400, "malformed multipart body")
+        fields: Dict[str, Tuple[Optional[str], bytes]] = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name:
+                fields[name] = (part.get_filename(), part.get_payload(decode=True) or b"")
+        return fields
+
+
+Handler = Callable[[Request], Awaitable[Tuple[int, object]]]
+
+
+class Coalescer:
+    """
+    Runs at most one job per key at a time. Callers arriving while a job for their key
+    is running wait for it and share its result (or exception) instead of starting
+    their own. A caller that goes away does not cancel the job for the others.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: str, job: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return the job's result and whether it was shared with an earlier caller."""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(job())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), shared
+
+
+class HTTPService:
+    """
+    A small asyncio HTTP/1.1 server for JSON APIs, with keep-alive connections.
+    Handlers are coroutines registered per (method, path) that return (status, payload).
+    serve() runs until SIGINT/SIGTERM or stop(); it then stops accepting connections,
+    lets requests in progress finish (up to `drain_timeout` seconds) and closes idle ones.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, drain_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.requests = 0
+        self.started_at = time.time()
+        self._routes: Dict[Tuple[str, str], Handler] = {}
+        self._active = 0
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self._routes[(method.upper(), path)] = handler
+
+    @property
+    def active(self) -> int:
+        """Requests being handled right now."""
+        return self._active
+
+    @property
+    def draining(self) -> bool:
+        return self._stopping is not None and self._stopping.is_set()
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def serve(self, on_ready: Optional[Callable[[int], None]] = None) -> None:
+        """Serve until stopped. `on_ready(port)` is called once the socket is listening."""
+        self._stopping = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows, or not the main thread: stop() is still available
+
+        server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        if on_ready is not None:
+            on_ready(self.port)
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+            for writer in list(self._writers):
+                writer.close()
+            await server.wait_closed()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.remove_signal_handler(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+
+    async def _read_request(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> Optional[Request]:
+        """The next request on the connection, or None when the client is done."""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "request headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"request body larger than {MAX_BODY_BYTES} bytes")
+        if length and headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+    async def _dispatch(self, request: Request) -> Tuple[int, object]:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                raise HTTPError(405, f"{request.method} not allowed on {request.path}")
+            raise HTTPError(404, f"no route for {request.path}")
+        return await handler(request)
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: object, keep_alive: bool) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        reason = HTTPStatus(status).phrase if status in HTTPStatus._value2member_map_ else ""
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while not self.draining:
+                try:
+                    request = await self._read_request(reader, writer)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"error": e.message}, False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                self.requests += 1
+                self._active += 1
+                self._idle.clear()
+                try:
+                    status, payload = await self._dispatch(request)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                finally:
+                    self._active -= 1
+                    if self._active == 0:
+                        self._idle.set()
+
+                keep_alive = request.headers.get("connection", "").lower() != "close" and not self.draining
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
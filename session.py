@@ -0,0 +1,210 @@
+import re
+import statistics
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from instrumentation import RunProfile
+from prompt_compiler import CompiledPrompt, approx_tokens
+
+# Exchanges sent word for word; older ones are folded into the rolling summary
+RECENT_EXCHANGES = 3
+# Approximate tokens allowed for the rolling summary, and for one answer sent verbatim
+SUMMARY_BUDGET = 250
+ANSWER_BUDGET = 150
+# Answers with at least this many words get a follow-up on the same topic (one per topic)
+FOLLOW_UP_WORDS = 12
+# A question prefetched before the answer was given is still used after answers shorter
+# than this ("No comment.", "Next question."); a longer answer may have changed the topic
+PREFETCH_KEEP_WORDS = 5
+
+FOLLOW_UP = "Ask one follow-up question that presses the manager on their last answer."
+NEW_TOPIC = "Ask your next question, on a topic not covered so far."
+
+_NUMBERING_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s")
+
+
+class Exchange:
+    __slots__ = ("question", "answer", "follow_up")
+
+    def __init__(self, question: str, follow_up: bool):
+        self.question = question
+        self.answer: Optional[str] = None
+        self.follow_up = follow_up
+
+
+class Turn(NamedTuple):
+    number: int
+    kind: str  # "new topic" or "follow-up"
+    source: str  # "prefetch" when the question was ready before the answer, else "live"
+    wait: float  # seconds between the answer and the question being available
+    prompt_tokens: int  # local estimate of the request the question came from
+
+
+def clip(text: str, budget: int) -> str:
+    """`text` cut to roughly `budget` tokens at a word boundary."""
+    if approx_tokens(text) <= budget:
+        return text
+    words = text.split()
+    # Bisect on the word count; approx_tokens only grows with more words
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if approx_tokens(" ".join(words[:middle])) < budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " ..."
+
+
+def clean_question(text: str) -> str:
+    """The first question in a completion, without list numbering or quotes."""
+    line = next((line for line in text.splitlines() if line.strip()), "")
+    return _NUMBERING_RE.sub("", line).strip().strip('"').strip()
+
+
+class PressConference:
+    """
+    A multi-turn press conference on one match, asking one question per turn.
+    Every request starts with the same system prompt and match briefing, byte for byte,
+    so providers that cache prompt prefixes process them once per session. The last
+    RECENT_EXCHANGES exchanges follow verbatim and older ones as a rolling extractive
+    summary of at most SUMMARY_BUDGET tokens, so the request size stays flat however
+    long the session runs.
+    While the manager types an answer the next new-topic question is already requested
+    in the background. It was asked without the answer, so it is only used when the
+    answer says next to nothing; any other answer drops it (counted in prefetch_wasted).
+    `ask(messages, profile, speculative)` performs one completion and returns its text.
+    """
+
+    def __init__(self, prompt: CompiledPrompt,
+                 ask: Callable[[List[Dict[str, str]], RunProfile, bool], str], max_turns: int = 20):
+        self.max_turns = max_turns
+        self.exchanges: List[Exchange] = []
+        self.turns: List[Turn] = []
+        self.profiles: List[RunProfile] = []
+        self.prefetch_wasted = 0
+        self._prefix = prompt.messages()
+        self._ask = ask
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._prefetched: Optional[Future] = None
+
+    def summary(self, exchanges: List[Exchange]) -> str:
+        """One line per exchange, keeping the newest lines that fit SUMMARY_BUDGET."""
+        lines: List[str] = []
+        tokens = 0
+        for exchange in reversed(exchanges):
+            answer = _SENTENCE_RE.split(exchange.answer.strip(), 1)[0] if exchange.answer else "(no answer)"
+            line = f"- Q: {clip(exchange.question, 30)} A: {clip(answer, 40)}"
+            tokens += approx_tokens(line) + 1
+            if tokens > SUMMARY_BUDGET:
+                lines.append(f"- ({len(exchanges) - len(lines)} earlier questions)")
+                break
+            lines.append(line)
+        return "\n".join(reversed(lines))
+
+    def messages(self, instruction: str) -> List[Dict[str, str]]:
+        """The request for the next question as things stand now."""
+        messages = [dict(message) for message in self._prefix]
+        older, recent = self.exchanges[:-RECENT_EXCHANGES], self.exchanges[-RECENT_EXCHANGES:]
+        if older:
+            messages.append({"role": "user", "content": "EARLIER IN THIS PRESS CONFERENCE:\n" + self.summary(older)})
+        for exchange in recent:
+            messages.append({"role": "assistant", "content": exchange.question})
+            if exchange.answer is not None:
+                messages.append({"role": "user", "content": f"Manager: {clip(exchange.answer, ANSWER_BUDGET)}"})
+        if len(messages) > len(self._prefix) and messages[-1]["role"] == "user":
+            messages[-1]["content"] += f"\n\n{instruction}"
+        else:
+            messages.append({"role": "user", "content": instruction})
+        return messages
+
+    def _request(self, instruction: str, speculative: bool) -> Tuple[str, RunProfile]:
+        messages = self.messages(instruction)
+        profile = RunProfile()
+        profile.prompt_estimate = sum(approx_tokens(message["content"]) for message in messages)
+
+        def run() -> Tuple[str, RunProfile]:
+            return clean_question(self._ask(messages, profile, speculative)), profile
+
+        if speculative:
+            self._prefetched = self._executor.submit(run)
+            return "", profile
+        return run()
+
+    def _wants_follow_up(self) -> bool:
+        if not self.exchanges:
+            return False
+        last = self.exchanges[-1]
+        return not last.follow_up and last.answer is not None and len(last.answer.split()) >= FOLLOW_UP_WORDS
+
+    def next_question(self) -> Tuple[str, Turn]:
+        """
+        Ask the next question: a follow-up when the last answer calls for one, otherwise a
+        new topic, taken from the prefetch if there is one. Errors from the API propagate.
+        """
+        start = time.perf_counter()
+        follow_up = self._wants_follow_up()
+        source = "live"
+        question, profile = "", None
+        if not follow_up and self._prefetched is not None:
+            prefetched, self._prefetched = self._prefetched, None
+            try:
+                question, profile = prefetched.result()
+                source = "prefetch"
+            except Exception:
+                question = ""  # the live request below reports the error, if it persists
+        if not question:
+            question, profile = self._request(FOLLOW_UP if follow_up else NEW_TOPIC, speculative=False)
+        wait = time.perf_counter() - start
+
+        self.exchanges.append(Exchange(question, follow_up))
+        profile.label = f"turn {len(self.turns) + 1}"  # a prefetch may be used a turn later than planned
+        turn = Turn(len(self.turns) + 1, "follow-up" if follow_up else "new topic", source, wait,
+                    profile.prompt_estimate or 0)
+        self.turns.append(turn)
+        profile.add_stage("turn_wait", wait)
+        profile.finish()
+        self.profiles.append(profile)
+
+        # Prefetch the next new-topic question unless one is still pending or this was the last turn
+        if self._prefetched is None and len(self.turns) < self.max_turns:
+            self._request(NEW_TOPIC, speculative=True)
+        return question, turn
+
+    def answer(self, text: str) -> None:
+        """
+        Record the manager's answer to the question asked last. A prefetched question did
+        not know it, so it is dropped unless the answer is shorter than PREFETCH_KEEP_WORDS.
+        """
+        self.exchanges[-1].answer = text
+        if len(text.split()) >= PREFETCH_KEEP_WORDS:
+            self._drop_prefetch()
+
+    def _drop_prefetch(self) -> None:
+        """Drop a prefetch that will not be used; one already in flight finishes in the background."""
+        if self._prefetched is not None:
+            self.prefetch_wasted += 1
+            self._prefetched.cancel()
+            self._prefetched = None
+
+    def close(self) -> None:
+        self._drop_prefetch()
+        self._executor.shutdown(wait=False)
+
+    def transcript(self) -> str:
+        return "\n".join(f"Q: {exchange.question}\nA: {exchange.answer or ''}" for exchange in self.exchanges)
+
+    def latency_summary(self) -> str:
+        """Per-session latency and request size: the numbers to compare between versions."""
+        if not self.turns:
+            return "No questions asked."
+        waits = sorted(turn.wait for turn in self.turns)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        hits = sum(1 for turn in self.turns if turn.source == "prefetch")
+        tokens = [turn.prompt_tokens for turn in self.turns]
+        return (f"{len(self.turns)} questions: wait median {statistics.median(waits):.2f}s, "
+                f"p95 {p95:.2f}s, max {waits[-1]:.2f}s; {hits} prefetched "
+                f"({self.prefetch_wasted} unused); prompt ~{tokens[0]} tokens on the first turn, "
+                f"~{tokens[-1]} on the last, ~{max(tokens)} at most")
@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    played_at TEXT NOT NULL,
+    image_hash TEXT UNIQUE,
+    competition TEXT NOT NULL COLLATE NOCASE,
+    stage TEXT,
+    home_team TEXT NOT NULL COLLATE NOCASE,
+    away_team TEXT NOT NULL COLLATE NOCASE,
+    home_score INTEGER NOT NULL,
+    away_score INTEGER NOT NULL,
+    manager_team TEXT COLLATE NOCASE,
+    home_or_away TEXT,
+    importance REAL,
+    stats TEXT NOT NULL,
+    stats_vector BLOB,
+    context TEXT NOT NULL,
+    questions TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_matches_home ON matches (home_team, played_at);
+CREATE INDEX IF NOT EXISTS idx_matches_away ON matches (away_team, played_at);
+CREATE INDEX IF NOT EXISTS idx_matches_competition ON matches (competition, played_at);
+CREATE INDEX IF NOT EXISTS idx_matches_played_at ON matches (played_at);
+CREATE INDEX IF NOT EXISTS idx_matches_manager ON matches (manager_team, played_at);
+"""
+
+_COLUMNS = (
+    "id, played_at, competition, stage, home_team, away_team, home_score, away_score, "
+    "manager_team, home_or_away, importance"
+)
+# Filter taking the hash to exclude twice; a None hash excludes nothing
+_NOT_HASH = "(? IS NULL OR image_hash IS NOT ?)"
+
+
+def result_for(match: Dict[str, object], team: str) -> str:
+    """'W', 'D' or 'L' for `team` in a stored match."""
+    if match["home_score"] == match["away_score"]:
+        return "D"
+    home_won = match["home_score"] > match["away_score"]
+    is_home = str(match["home_team"]).lower() == team.lower()
+    return "W" if home_won == is_home else "L"
+
+
+class MatchStore:
+    """
+    Embedded SQLite store of every processed match.
+    Matches are indexed by team, competition and date so form and head-to-head
+    queries stay in the millisecond range as the season archive grows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(matches)")}
+        if columns and "stats_vector" not in columns:
+            # Stores created before numeric vectors were kept
+            self._conn.execute("ALTER TABLE matches ADD COLUMN stats_vector BLOB")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "MatchStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def record_match(self, played_at: str, home_team: str, away_team: str, home_score: int, away_score: int,
+                     stats: Dict[str, Tuple[str, str]], context: Dict[str, object],
+                     questions: Optional[str] = None, image_hash: Optional[str] = None,
+                     stats_vector: Optional[bytes] = None) -> int:
+        """
+        Store one processed match and return its id.
+        `stats_vector` is an optional packed numeric copy of the stats for fast season queries.
+        A screenshot that was stored before (same image_hash) is updated in place.
+        """
+        home_or_away = context.get("home_or_away")
+        manager_team = away_team if home_or_away == "away" else home_team
+        values = (
+            played_at, image_hash, context.get("setting", ""), context.get("stage"),
+            home_team, away_team, home_score, away_score, manager_team, home_or_away,
+            context.get("importance"),
+            json.dumps({name: list(pair) for name, pair in stats.items()}, separators=(",", ":")),
+            stats_vector,
+            json.dumps({k: v for k, v in context.items() if k != "history"}, separators=(",", ":"), default=str),
+            questions,
+        )
+        with self._conn:
+            cur = self._conn.execute(
+                """
+                INSERT INTO matches (played_at, image_hash, competition, stage, home_team, away_team,
+                                     home_score, away_score, manager_team, home_or_away, importance,
+                                     stats, stats_vector, context, questions)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(image_hash) DO UPDATE SET
+                    played_at = excluded.played_at, competition = excluded.competition,
+                    stage = excluded.stage, home_team = excluded.home_team,
+                    away_team = excluded.away_team, home_score = excluded.home_score,
+                    away_score = excluded.away_score, manager_team = excluded.manager_team,
+                    home_or_away = excluded.home_or_away, importance = excluded.importance,
+                    stats = excluded.stats, stats_vector = excluded.stats_vector,
+                    context = excluded.context,
+                    questions = COALESCE(excluded.questions, matches.questions)
+                """,
+                values,
+            )
+            if image_hash is None:
+                return cur.lastrowid
+            # lastrowid is not reliable when the upsert took the UPDATE branch
+            row = self._conn.execute("SELECT id FROM matches WHERE image_hash = ?", (image_hash,)).fetchone()
+            return row["id"]
+
+    def recent_results(self, team: str, limit: int = 5, before: Optional[str] = None,
+                       exclude_hash: Optional[str] = None) -> List[Dict[str, object]]:
+        """
+        Most recent matches involving `team`, newest first, optionally only those before a date.
+        The screenshot with `exclude_hash` is left out, so a match re-analysed from a stored
+        screenshot does not count as its own history.
+        """
+        before = before or "9999"
+        # Two index-backed range scans rather than one OR that would scan the table
+        rows = self._conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT {_COLUMNS} FROM matches WHERE home_team = ? AND played_at < ? AND {_NOT_HASH}
+                UNION ALL
+                SELECT {_COLUMNS} FROM matches WHERE away_team = ? AND played_at < ? AND {_NOT_HASH}
+            ) ORDER BY played_at DESC, id DESC LIMIT ?
+            """,
+            (team, before, exclude_hash, exclude_hash, team, before, exclude_hash, exclude_hash, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def head_to_head(self, team: str, opponent: str, limit: int = 5, before: Optional[str] = None,
+                     exclude_hash: Optional[str] = None) -> List[Dict[str, object]]:
+        """Most recent meetings between two teams, newest first, without the `exclude_hash` screenshot."""
+        before = before or "9999"
+        rows = self._conn.execute(
+            f"""
+            SELECT * FROM (
+                SELECT {_COLUMNS} FROM matches
+                WHERE home_team = ? AND away_team = ? AND played_at < ? AND {_NOT_HASH}
+                UNION ALL
+                SELECT {_COLUMNS} FROM matches
+                WHERE home_team = ? AND away_team = ? AND played_at < ? AND {_NOT_HASH}
+            ) ORDER BY played_at DESC, id DESC LIMIT ?
+            """,
+            (team, opponent, before, exclude_hash, exclude_hash,
+             opponent, team, before, exclude_hash, exclude_hash, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def season_rows(self, manager_team: str, before: Optional[str] = None,
+                    exclude_hash: Optional[str] = None) -> List[sqlite3.Row]:
+        """Score, side, importance and stats of every stored match managed by `manager_team`."""
+        return self._conn.execute(
+            f"""
+            SELECT home_score, away_score, home_or_away, importance, stats, stats_vector
+            FROM matches WHERE manager_team = ? AND played_at < ? AND {_NOT_HASH} ORDER BY played_at
+            """,
+            (manager_team, before or "9999", exclude_hash, exclude_hash),
+        ).fetchall()
+
+    def competition_matches(self, competition: str, limit: int = 50) -> List[Dict[str, object]]:
+        """Most recent matches in a competition (ucl, domestic cup, derby), newest first."""
+        rows = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM matches WHERE competition = ? ORDER BY played_at DESC, id DESC LIMIT ?",
+            (competition, limit),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def describe_match(match: Dict[str, object]) -> str:
+    """One-line summary such as '2026-03-01 Bayern 2-1 Real (ucl qf)'."""
+    stage = f" {match['stage']}" if match.get("stage") else ""
+    return (f"{str(match['played_at'])[:10]} {match['home_team']} {match['home_score']}-{match['away_score']} "
+            f"{match['away_team']} ({match['competition']}{stage})")
+
+
+def history_lines(store: MatchStore, team: str, opponent: str, before: Optional[str] = None,
+                  form_length: int = 5, exclude_hash: Optional[str] = None) -> List[str]:
+    """
+    Prompt lines describing recent form, the current run and the last meeting. Empty without history.
+    Pass the current screenshot's `exclude_hash` so a stored copy of this match is not counted.
+    """
+    lines: List[str] = []
+    recent = store.recent_results(team, form_length, before, exclude_hash)
+    if recent:
+        form = [result_for(m, team) for m in recent]
+        lines.append(f"{team} form (last {len(form)}, newest first): {' '.join(form)}")
+        run = 1
+        while run < len(form) and form[run] == form[0]:
+            run += 1
+        if run >= 2:
+            label = {"W": "wins", "D": "draws", "L": "defeats"}[form[0]]
+            lines.append(f"{team} come into this on a run of {run} {label}")
+        lines.append(f"{team} last match: {describe_match(recent[0])}")
+
+    meetings = store.head_to_head(team, opponent, 1, before, exclude_hash)
+    if meetings and not (recent and meetings[0]["id"] == recent[0]["id"]):
+        lines.append(f"Previous meeting: {describe_match(meetings[0])}")
+    return lines
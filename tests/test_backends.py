@@ -0,0 +1,204 @@
+"""HedgedRouter with fake backends: hedging, fallback, timeouts and admissions."""
+import threading
+import time
+
+import pytest
+
+from backends import MIN_SAMPLES, Backend, HedgedRouter
+
+
+class APIError(Exception):
+    status_code = 500
+
+
+class Admissions:
+    """Counts what the router takes and gives back, like the scheduler's concurrency slots."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.taken = []
+        self.released = 0
+        self.refuse_hedges = False
+
+    def admit(self, backend, wait):
+        if not wait and self.refuse_hedges:
+            return False
+        with self.lock:
+            self.taken.append(backend.name)
+        return True
+
+    def release(self):
+        with self.lock:
+            self.released += 1
+
+    def held(self):
+        with self.lock:
+            return len(self.taken) - self.released
+
+
+def _backend(name, timeout=5.0, latency=None):
+    backend = Backend(name, f"model-{name}", api_key="key", timeout=timeout)
+    if latency is not None:
+        for _ in range(MIN_SAMPLES):
+            backend.record_latency("complete", latency)
+    return backend
+
+
+def _wait_for(condition, seconds=2.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_first_backend_answers_without_a_hedge():
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a", latency=1.0), _backend("b")])
+    result, outcome = router.run(lambda backend, cancelled: backend.name, admit=admissions.admit,
+                                 release=admissions.release)
+    assert result == "a"
+    assert outcome.backend == "a" and outcome.attempts == 1 and not outcome.hedged
+    assert admissions.taken == ["a"] and admissions.held() == 0
+
+
+def test_hedge_fires_once_the_primary_is_slower_than_its_p95():
+    hang = threading.Event()
+    admissions = Admissions()
+    discarded = []
+    router = HedgedRouter([_backend("a", latency=0.05), _backend("b")])
+    assert router.backends[0].hedge_delay("complete") == 0.05
+
+    def attempt(backend, cancelled):
+        if backend.name == "a":
+            hang.wait(2)
+            return "late"
+        return "hedge"
+
+    started = time.monotonic()
+    result, outcome = router.run(attempt, discard=discarded.append, admit=admissions.admit,
+                                 release=admissions.release)
+    assert result == "hedge"
+    assert outcome == ("b", 2, True, ())
+    assert 0.05 <= time.monotonic() - started < 1.0
+    assert router.hedges == 1 and router.wins == {"b": 1}
+    # The primary is still running: it keeps its admission until it ends
+    assert admissions.held() == 1
+    hang.set()
+    assert _wait_for(lambda: admissions.held() == 0)
+    assert _wait_for(lambda: discarded == ["late"])
+
+
+def test_hedge_is_skipped_without_spare_rate_limit():
+    admissions = Admissions()
+    admissions.refuse_hedges = True
+    router = HedgedRouter([_backend("a", latency=0.01), _backend("b")])
+
+    def attempt(backend, cancelled):
+        time.sleep(0.1)
+        return backend.name
+
+    result, outcome = router.run(attempt, admit=admissions.admit, release=admissions.release)
+    assert result == "a" and not outcome.hedged and outcome.attempts == 1
+    assert admissions.taken == ["a"] and admissions.held() == 0
+
+
+def test_api_error_falls_back_to_the_next_backend():
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a"), _backend("b")])
+
+    def attempt(backend, cancelled):
+        if backend.name == "a":
+            raise APIError("server error")
+        return "fallback"
+
+    result, outcome = router.run(attempt, admit=admissions.admit, release=admissions.release)
+    assert result == "fallback"
+    assert outcome == ("b", 2, False, ("a",))
+    assert router.fallbacks == 1
+    assert admissions.taken == ["a", "b"] and admissions.held() == 0
+
+
+def test_the_first_backends_error_is_raised_when_none_answers():
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a"), _backend("b")])
+
+    def attempt(backend, cancelled):
+        raise APIError(backend.name)
+
+    with pytest.raises(APIError, match="a"):
+        router.run(attempt, admit=admissions.admit, release=admissions.release)
+    assert admissions.held() == 0
+
+
+def test_timeout_hands_over_and_releases_the_hung_attempt():
+    hang = threading.Event()
+    admissions = Admissions()
+    discarded = []
+    router = HedgedRouter([_backend("a", timeout=0.1), _backend("b")])
+    router.backends[0].hedge_after = 10.0
+
+    def attempt(backend, cancelled):
+        if backend.name == "a":
+            hang.wait(5)
+            return "late"
+        return "fallback"
+
+    result, outcome = router.run(attempt, discard=discarded.append, admit=admissions.admit,
+                                 release=admissions.release)
+    assert result == "fallback"
+    assert outcome == ("b", 2, False, ("a",))
+    # The primary never returned, yet its admission was given back at its timeout
+    assert admissions.held() == 0
+    assert router.backends[0].latencies("complete") == [0.1]
+    hang.set()
+    assert _wait_for(lambda: discarded == ["late"])
+    assert admissions.released == 2
+
+
+def test_timeout_of_every_backend_raises_timeout_error():
+    hang = threading.Event()
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a", timeout=0.05)])
+    try:
+        with pytest.raises(TimeoutError):
+            router.run(lambda backend, cancelled: hang.wait(5), admit=admissions.admit, release=admissions.release)
+        assert admissions.held() == 0
+    finally:
+        hang.set()
+
+
+def test_abandoned_loser_is_released_at_its_timeout_even_if_it_never_ends():
+    hang = threading.Event()
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a", timeout=0.3, latency=0.02), _backend("b")])
+    cancelled_seen = []
+
+    def attempt(backend, cancelled):
+        if backend.name == "a":
+            hang.wait(5)
+            cancelled_seen.append(cancelled.is_set())
+            return "late"
+        return "hedge"
+
+    try:
+        result, _ = router.run(attempt, admit=admissions.admit, release=admissions.release)
+        assert result == "hedge"
+        assert admissions.held() == 1
+        assert _wait_for(lambda: admissions.held() == 0, seconds=1.0)
+    finally:
+        hang.set()
+    assert _wait_for(lambda: cancelled_seen == [True])
+    # Ending after the timeout does not give the admission back a second time
+    time.sleep(0.05)
+    assert admissions.released == 2
+
+
+def test_keep_winner_leaves_the_winners_admission_to_the_caller():
+    admissions = Admissions()
+    router = HedgedRouter([_backend("a")])
+    result, _ = router.run(lambda backend, cancelled: "stream", admit=admissions.admit, release=admissions.release,
+                           keep_winner=True)
+    assert result == "stream"
+    assert admissions.held() == 1
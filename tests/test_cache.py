@@ -0,0 +1,88 @@
+"""OCRCache size accounting and LRU eviction."""
+import os
+
+import pytest
+
+import main as fmn
+from backends import Backend, HedgedRouter
+from cache import LLMResponseCache, OCRCache
+
+
+def _ocr_data(team="Arsenal", shots="12"):
+    return {"home_team": team, "away_team": "Chelsea", "stats": {"shots": (shots, "7")}, "confidence": {}}
+
+
+def _disk_bytes(cache):
+    return sum(size for _, _, size in cache._entries())
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    assert cache.get("ab" * 32) is None
+    cache.put("ab" * 32, _ocr_data())
+    assert cache.get("ab" * 32) == _ocr_data()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_overwriting_a_key_keeps_the_total_in_step_with_the_disk(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    cache.put("aa" * 32, _ocr_data())
+    for i in range(50):
+        cache.put("bb" * 32, _ocr_data(shots=str(i)))
+    assert cache._total_bytes == _disk_bytes(cache)
+    cache.put("bb" * 32, _ocr_data(team="Manchester United"))
+    assert cache._total_bytes == _disk_bytes(cache)
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.put(key, _ocr_data())
+        # Oldest first; get() marks an entry as used again
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    entry_size = _disk_bytes(cache) // len(keys)
+    cache.max_bytes = entry_size * 3
+    os.utime(cache._path(keys[0]), (2000, 2000))
+
+    cache.put("ff" * 32, _ocr_data())
+    assert cache._total_bytes <= cache.max_bytes
+    assert cache._total_bytes == _disk_bytes(cache)
+    assert not os.path.exists(cache._path(keys[1]))
+    assert not os.path.exists(cache._path(keys[2]))
+    assert os.path.exists(cache._path(keys[0]))
+    assert os.path.exists(cache._path("ff" * 32))
+
+
+def test_llm_lookup_counts_hits_and_misses(tmp_path):
+    cache = LLMResponseCache(str(tmp_path))
+    key = cache.key_for({"messages": [{"role": "user", "content": "questions"}]})
+    assert cache.lookup(key) is None
+    cache.put(key, "1. Why?")
+    assert cache.lookup(key) == "1. Why?"
+    assert cache.lookup(key, fresh=True) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.fixture
+def cached_questions(tmp_path, monkeypatch):
+    """An LLM cache holding the answer to "Match: Arsenal 2-1 Chelsea" from the primary backend."""
+    primary = Backend("groq", fmn.LLM_MODEL, api_key="unused")
+    monkeypatch.setattr(fmn, "_router", HedgedRouter([primary]))
+    cache = LLMResponseCache(str(tmp_path))
+    request = fmn._question_request("Match: Arsenal 2-1 Chelsea")
+    cache.put(cache.key_for(fmn._cache_request(request, primary)), "1. Was it deserved?\n2. What changed?")
+    return cache
+
+
+def test_streamed_and_plain_cache_hits_are_counted_alike(cached_questions):
+    cache = cached_questions
+    assert fmn.generate_questions("Match: Arsenal 2-1 Chelsea", cache) == "1. Was it deserved?\n2. What changed?"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    shown = []
+    text, _ = fmn.stream_questions("Match: Arsenal 2-1 Chelsea", shown.append, cache)
+    assert shown == ["1. Was it deserved?", "2. What changed?"]
+    assert text == "1. Was it deserved?\n2. What changed?"
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert cache.summary() == "LLM cache: 2 hits, 0 misses, 0 coalesced"
@@ -0,0 +1,177 @@
+"""derived_metrics against the scalar thresholds the single-match report used before it was vectorized."""
+import random
+
+import numpy as np
+
+from metrics import (AGGRESSION_GAP_LABELS, CARD_LABELS, ENTERTAINMENT_LABELS, IMPORTANCE_LABELS, derived_metrics,
+                     percentile_of, rank_of, season_highlights)
+
+
+def _scalar_metrics(m):
+    """The pre-NumPy code from main.py, one match at a time."""
+    total_goals = m["manager_score"] + m["opp_score"]
+    if total_goals == 0:
+        entertainment = 0
+    elif total_goals >= 7:
+        entertainment = 10
+    elif total_goals >= 4:
+        entertainment = 5
+    elif total_goals >= 2:
+        entertainment = 2
+    else:
+        entertainment = 1
+
+    importance_labels = {
+        (0, 1): 'Low importance',
+        (1, 2): 'Moderate importance',
+        (2, 4): 'High importance',
+        (4, 7): 'Very high importance',
+        (7, float('inf')): 'Extremely high importance'
+    }
+    importance = m["importance"]
+    importance_level = next(label for (low, high), label in importance_labels.items() if low <= importance < high)
+
+    aggression_score = (m["manager_yellow"] + m["opp_yellow"]) + (m["manager_red"] + m["opp_red"]) * 2
+    if aggression_score == 0:
+        match_aggression = 0
+    elif aggression_score >= 10:
+        match_aggression = 3
+    elif aggression_score >= 5:
+        match_aggression = 2
+    else:
+        match_aggression = 1
+
+    manager_aggression = m["manager_yellow"] + (m["manager_red"] * 3)
+    opp_aggression = m["opp_yellow"] + (m["opp_red"] * 3)
+    difference = abs(manager_aggression - opp_aggression)
+    if difference == 0:
+        band = "similar"
+    elif difference <= 2:
+        band = "slightly"
+    elif difference <= 5:
+        band = "noticeably"
+    else:
+        band = "significantly"
+
+    return {
+        "entertainment": ENTERTAINMENT_LABELS[entertainment],
+        "importance_level": importance_level,
+        "match_aggression": CARD_LABELS[match_aggression],
+        "manager_aggression": manager_aggression,
+        "opp_aggression": opp_aggression,
+        "aggression_band": band,
+        "manager_shot_accuracy": (m["manager_shots_target"] / m["manager_shots"] * 100) if m["manager_shots"] > 0 else 0,
+        "opp_shot_accuracy": (m["opp_shots_target"] / m["opp_shots"] * 100) if m["opp_shots"] > 0 else 0,
+        "manager_xg_efficiency": (m["manager_score"] / m["manager_xg"] * 100) if m["manager_xg"] > 0 else 0,
+        "opp_xg_efficiency": (m["opp_score"] / m["opp_xg"] * 100) if m["opp_xg"] > 0 else 0,
+    }
+
+
+def _random_match(rng):
+    return {
+        "manager_score": rng.randint(0, 6), "opp_score": rng.randint(0, 6),
+        # Band edges and plenty of values around them
+        "importance": rng.choice([0, 0.99, 1, 1.5, 2, 3.999, 4, 6.99, 7, 10, rng.uniform(0, 10)]),
+        "manager_shots": rng.randint(0, 25), "opp_shots": rng.randint(0, 25),
+        "manager_shots_target": rng.randint(0, 12), "opp_shots_target": rng.randint(0, 12),
+        "manager_xg": rng.choice([0.0, round(rng.uniform(0, 4), 2)]),
+        "opp_xg": rng.choice([0.0, round(rng.uniform(0, 4), 2)]),
+        "manager_yellow": rng.randint(0, 6), "opp_yellow": rng.randint(0, 6),
+        "manager_red": rng.choice([0, 0, 0, 1, 2]), "opp_red": rng.choice([0, 0, 0, 1, 2]),
+    }
+
+
+def test_derived_metrics_match_scalar_code():
+    rng = random.Random(9)
+    matches = [_random_match(rng) for _ in range(5000)]
+    columns = {name: np.array([match[name] for match in matches]) for name in matches[0]}
+    derived = derived_metrics(columns)
+
+    for i, match in enumerate(matches):
+        expected = _scalar_metrics(match)
+        got = {
+            "entertainment": ENTERTAINMENT_LABELS[int(derived["entertainment"][i])],
+            "importance_level": IMPORTANCE_LABELS[int(derived["importance_level"][i])],
+            "match_aggression": CARD_LABELS[int(derived["match_aggression"][i])],
+            "manager_aggression": int(derived["manager_aggression"][i]),
+            "opp_aggression": int(derived["opp_aggression"][i]),
+            "aggression_band": AGGRESSION_GAP_LABELS[int(derived["aggression_band"][i])],
+        }
+        for name in ("manager_shot_accuracy", "opp_shot_accuracy", "manager_xg_efficiency", "opp_xg_efficiency"):
+            got[name] = float(derived[name][i])
+        assert got == expected, match
+
+
+def test_rank_of_counts_only_strictly_better_values():
+    values = np.array([1.0, 3.0, 3.0, 5.0])
+    assert rank_of(values, 6.0) == 1
+    assert rank_of(values, 5.0) == 1  # a tie shares the better rank
+    assert rank_of(values, 3.0) == 2
+    assert rank_of(values, 0.0) == 5
+    assert rank_of(values, 0.0, highest=False) == 1
+    assert rank_of(values, 3.0, highest=False) == 2
+    assert rank_of(np.array([]), 2.0) == 1
+
+
+def test_percentile_of_counts_ties_as_half():
+    values = np.array([10.0, 20.0, 30.0, 40.0])
+    assert percentile_of(values, 5.0) == 0.0
+    assert percentile_of(values, 45.0) == 100.0
+    assert percentile_of(values, 30.0) == 62.5
+    assert percentile_of(values, 25.0) == 50.0
+    assert percentile_of(np.array([]), 1.0) == 50.0
+
+
+def _season(**metrics):
+    return {name: np.array(values, dtype=np.float64) for name, values in metrics.items()}
+
+
+def test_season_highlights_need_min_matches():
+    season = _season(manager_xg_delta=[0.5, 0.2, -0.1], manager_shot_accuracy=[40, 50, 60])
+    current = {"manager_xg_delta": 1.0, "manager_shot_accuracy": 70}
+    # Three earlier matches plus this one is below the default minimum of five
+    assert season_highlights(season, current) == []
+    assert season_highlights(season, current, min_matches=4)
+
+
+def test_season_highlights_rank_within_top_only():
+    season = _season(manager_xg_delta=[0.0] * 9, manager_shot_accuracy=[10, 20, 30, 40, 50, 60, 70, 80, 90])
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_shot_accuracy": 95})
+    assert "This is the highest shot accuracy in 10 stored matches" in lines
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_shot_accuracy": 75})
+    assert "This is the 3rd-highest shot accuracy in 10 stored matches" in lines
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_shot_accuracy": 65})
+    assert not any("shot accuracy in" in line for line in lines)
+
+
+def test_season_highlights_xg_delta_counts_only_in_its_direction():
+    season = _season(manager_xg_delta=[-1.0, -0.5, 0.5, 1.0, 1.5])
+    lines = season_highlights(season, {"manager_xg_delta": 2.0})
+    assert lines[0] == "This is the largest xG overperformance in 6 stored matches"
+    assert not any("underperformance" in line for line in lines)
+    lines = season_highlights(season, {"manager_xg_delta": -2.0})
+    assert lines[0] == "This is the largest xG underperformance in 6 stored matches"
+    assert not any("overperformance" in line for line in lines)
+    lines = season_highlights(season, {"manager_xg_delta": 0.0})
+    assert not any("performance" in line for line in lines)
+
+
+def test_season_highlights_most_cards_is_the_worst_record():
+    season = _season(manager_xg_delta=[0.0] * 5, manager_aggression=[0, 1, 2, 4, 6])
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_aggression": 7})
+    assert "This is the worst disciplinary record (card points: yellow 1, red 3) in 6 stored matches" in lines
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_aggression": 5})
+    assert "This is the 2nd-worst disciplinary record (card points: yellow 1, red 3) in 6 stored matches" in lines
+    # The cleanest match is never reported, even when every match so far was card-free
+    clean = _season(manager_xg_delta=[0.0] * 5, manager_aggression=[0] * 5)
+    lines = season_highlights(clean, {"manager_xg_delta": 0.0, "manager_aggression": 0})
+    assert not any("disciplinary" in line for line in lines)
+
+
+def test_season_highlights_percentile_line():
+    season = _season(manager_xg_delta=[-1.0, 0.0, 1.0, 2.0], manager_shot_accuracy=[20, 40, 60, 80],
+                     manager_possession=[40, 45, 55, 60])
+    lines = season_highlights(season, {"manager_xg_delta": 0.0, "manager_shot_accuracy": 50,
+                                       "manager_possession": 60}, min_matches=5)
+    assert lines[-1] == ("Season percentiles vs 4 earlier matches: "
+                         "shot accuracy 50, goals minus xG 38, possession 88")
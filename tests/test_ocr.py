@@ -0,0 +1,39 @@
+"""One-shot OCR through bench/fake_ocr.py standing in for the binary."""
+import os
+import time
+
+import pytest
+
+import main as fmn
+from instrumentation import RunProfile
+
+FAKE_OCR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "fake_ocr.py")
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch, tmp_path):
+    monkeypatch.setenv("FMNARRATIVE_OCR_BINARY", FAKE_OCR)
+    monkeypatch.setenv("FAKE_OCR_STARTUP", "0")
+    monkeypatch.setenv("FAKE_OCR_DEBUG_LINES", "0")
+    image = tmp_path / "arsenal-chelsea.png"
+    image.write_bytes(b"not read")
+    return str(image)
+
+
+def test_one_shot_ocr_reads_the_image(fake_ocr, monkeypatch):
+    monkeypatch.setenv("FAKE_OCR_DELAY", "0")
+    profile = RunProfile()
+    ocr_data = fmn._try_run_ocr(fake_ocr, profile=profile, timeout=30)
+    assert ocr_data is not None and ocr_data["home_team"] and ocr_data["stats"]
+    assert (profile.ocr_source, profile.ocr_exit_status) == ("process", 0)
+
+
+def test_one_shot_ocr_is_stopped_at_the_timeout(fake_ocr, monkeypatch):
+    monkeypatch.setenv("FAKE_OCR_DELAY", "30")
+    profile = RunProfile()
+    start = time.monotonic()
+    assert fmn._try_run_ocr(fake_ocr, profile=profile, timeout=0.5) is None
+    assert time.monotonic() - start < 10
+    assert profile.ocr_exit_status == -9
+    # run_ocr passes the timeout on and caches nothing
+    assert fmn.run_ocr(fake_ocr, None, None, None, timeout=0.5) is None
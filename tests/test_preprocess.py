@@ -0,0 +1,184 @@
+"""preprocess_screenshot against the frame ocr.cpp normalises every screenshot to."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import main as fmn  # noqa: E402
+import preprocess  # noqa: E402
+from preprocess import LayoutCache, content_box, preprocess_screenshot  # noqa: E402
+
+REFERENCE_HEIGHT = 1080
+STAT_ROWS = ["Possession", "Shots", "On Target", "Corners", "Fouls", "Offsides", "Passes Completed",
+             "Yellow Cards", "Red Cards", "Expected Goals"]
+
+
+def _binary_frame(image):
+    """Transcription of normalizeScreen in ocr.cpp: the pixels every OCR region is read from."""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image.copy()
+    row_min, row_max = cv2.reduce(gray, 1, cv2.REDUCE_MIN), cv2.reduce(gray, 1, cv2.REDUCE_MAX)
+    col_min, col_max = cv2.reduce(gray, 0, cv2.REDUCE_MIN), cv2.reduce(gray, 0, cv2.REDUCE_MAX)
+    top, bottom, left, right = 0, gray.shape[0] - 1, 0, gray.shape[1] - 1
+    while top <= bottom and row_min[top, 0] == row_max[top, 0]:
+        top += 1
+    while bottom >= top and row_min[bottom, 0] == row_max[bottom, 0]:
+        bottom -= 1
+    while left <= right and col_min[0, left] == col_max[0, left]:
+        left += 1
+    while right >= left and col_min[0, right] == col_max[0, right]:
+        right -= 1
+    x, y, w, h = 0, 0, gray.shape[1], gray.shape[0]
+    if top <= bottom and left <= right:
+        box_w, box_h = right - left + 1, bottom - top + 1
+        if box_h * 2 >= gray.shape[0] and box_w * 2 >= gray.shape[1]:
+            x, y, w, h = left, top, box_w, box_h
+    content = gray[y:y + h, x:x + w]
+    if h == REFERENCE_HEIGHT:
+        return content.copy()
+    width = (w * REFERENCE_HEIGHT + h // 2) // h
+    return cv2.resize(content, (max(1, width), REFERENCE_HEIGHT),
+                      interpolation=cv2.INTER_AREA if h > REFERENCE_HEIGHT else cv2.INTER_CUBIC)
+
+
+def _stats_screen(width, height, seed=0):
+    """A colour match stats screen: team names on top, one stat per row, noisy background."""
+    rng = np.random.default_rng(seed)
+    screen = rng.integers(30, 70, size=(height, width, 3), dtype=np.uint8)
+    scale = height / REFERENCE_HEIGHT
+    font, thickness = cv2.FONT_HERSHEY_SIMPLEX, max(1, round(2 * scale))
+    cv2.putText(screen, "ARSENAL", (int(width * 0.1), int(90 * scale)), font, 2 * scale, (240, 240, 240), thickness)
+    cv2.putText(screen, "CHELSEA", (int(width * 0.65), int(90 * scale)), font, 2 * scale, (240, 240, 240), thickness)
+    row_height = (height - height // 6) / len(STAT_ROWS)
+    for i, name in enumerate(STAT_ROWS):
+        baseline = int(height // 6 + row_height * (i + 0.7))
+        cv2.putText(screen, str(i + 3), (int(width * 0.12), baseline), font, 1.2 * scale, (255, 255, 255), thickness)
+        cv2.putText(screen, name, (int(width * 0.4), baseline), font, 1.2 * scale, (200, 200, 200), thickness)
+        cv2.putText(screen, str(2 * i + 1), (int(width * 0.8), baseline), font, 1.2 * scale, (255, 255, 255),
+                    thickness)
+    return screen
+
+
+def _letterboxed(screen, top=0, bottom=0, left=0, right=0, colour=(0, 0, 0)):
+    return cv2.copyMakeBorder(screen, top, bottom, left, right, cv2.BORDER_CONSTANT, value=colour)
+
+
+def _write(tmp_path, name, image):
+    path = str(tmp_path / name)
+    assert cv2.imwrite(path, image)
+    return path
+
+
+@pytest.fixture(scope="module")
+def screenshots(tmp_path_factory):
+    """Stats screens at 4K and 1440p, full frame and letterboxed, as PNG and JPEG."""
+    tmp_path = tmp_path_factory.mktemp("screenshots")
+    return {
+        "4k.png": _write(tmp_path, "4k.png", _stats_screen(3840, 2160)),
+        "4k_letterboxed.png": _write(tmp_path, "4k_letterboxed.png",
+                                     _letterboxed(_stats_screen(3840, 1800, seed=1), top=180, bottom=180)),
+        "4k_window.jpg": _write(tmp_path, "4k_window.jpg",
+                                _letterboxed(_stats_screen(3400, 1900, seed=2), 200, 60, 240, 200, (35, 35, 35))),
+        "1440p.png": _write(tmp_path, "1440p.png", _stats_screen(2560, 1440, seed=3)),
+    }
+
+
+def test_content_box_trims_single_colour_bars():
+    frame = cv2.cvtColor(_letterboxed(_stats_screen(1600, 900), top=90, bottom=90, left=40), cv2.COLOR_BGR2GRAY)
+    assert content_box(frame) == (40, 90, 1600, 900)
+
+
+def test_content_box_keeps_the_frame_when_little_is_left():
+    frame = np.zeros((1000, 1000), dtype=np.uint8)
+    frame[400:600, 100:900] = np.arange(800, dtype=np.uint8)
+    assert content_box(frame) == (0, 0, 1000, 1000)
+    assert content_box(np.full((50, 80), 7, dtype=np.uint8)) == (0, 0, 80, 50)
+
+
+def test_a_cached_box_only_holds_where_content_box_would_find_it():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        height, width = rng.integers(2, 24, size=2)
+        frame = np.full((height, width), rng.integers(0, 3), dtype=np.uint8)
+        top, bottom = sorted(rng.integers(0, height, size=2))
+        left, right = sorted(rng.integers(0, width, size=2))
+        frame[top:bottom + 1, left:right + 1] = rng.integers(0, 3, size=(bottom - top + 1, right - left + 1))
+        learned = content_box(frame)
+        for box in (learned, (left, top, right - left + 1, bottom - top + 1), (0, 0, width, height)):
+            if preprocess._box_holds(frame, box):
+                assert box == learned
+
+
+@pytest.mark.parametrize("name",["4k.png", "4k_letterboxed.png", "4k_window.jpg", "1440p.png"])
+def test_preprocessed_copy_is_the_frame_the_binary_reads(screenshots, tmp_path, name):
+    original = screenshots[name]
+    prepared = preprocess_screenshot(original, LayoutCache(str(tmp_path / "layouts.json")), out_dir=str(tmp_path))
+    assert prepared is not None
+
+    expected = _binary_frame(cv2.imread(original))
+    copy = cv2.imread(prepared)
+    assert copy.shape[0] == REFERENCE_HEIGHT
+    # The binary leaves the copy as it is, so it reads exactly what it would read from the original
+    assert np.array_equal(_binary_frame(copy), expected)
+
+
+def test_screens_no_taller_than_the_reference_are_left_to_the_binary(tmp_path):
+    path = _write(tmp_path, "1080p.png", _stats_screen(1920, 1080))
+    assert preprocess_screenshot(path, out_dir=str(tmp_path)) is None
+    # Letterboxed 1440p whose content is only 1080 rows high
+    path = _write(tmp_path, "1440p_bars.png", _letterboxed(_stats_screen(1920, 1080), top=180, bottom=180, left=320,
+                                                         right=320))
+    assert preprocess_screenshot(path, out_dir=str(tmp_path)) is None
+
+
+def test_layout_cache_reuses_a_box_that_holds_and_relearns_one_that_does_not(tmp_path):
+    layouts_path = str(tmp_path / "layouts.json")
+    layouts = LayoutCache(layouts_path)
+    first = _write(tmp_path, "a.png", _letterboxed(_stats_screen(3840, 1800), top=180, bottom=180))
+    same_layout = _write(tmp_path, "b.png", _letterboxed(_stats_screen(3840, 1800, seed=5), top=180, bottom=180))
+    other_layout = _write(tmp_path, "c.png", _letterboxed(_stats_screen(3600, 2160, seed=6), left=120, right=120))
+
+    for path in (first, same_layout, other_layout):
+        prepared = preprocess_screenshot(path, layouts, out_dir=str(tmp_path))
+        assert np.array_equal(cv2.imread(prepared, cv2.IMREAD_GRAYSCALE), _binary_frame(cv2.imread(path)))
+        os.remove(prepared)
+
+    assert layouts.hits == 1
+    assert layouts.relearned == 1
+    with open(layouts_path, encoding="utf-8") as f:
+        stored = json.load(f)
+    assert stored["3840x2160"]["box"] == [120, 0, 3600, 2160]
+    assert LayoutCache(layouts_path).get((3840, 2160)) == (120, 0, 3600, 2160)
+
+
+def test_layout_cache_ignores_layouts_from_another_version(tmp_path):
+    layouts_path = tmp_path / "layouts.json"
+    layouts_path.write_text(json.dumps({"3840x2160": {"version": preprocess.LAYOUT_VERSION - 1, "box": [1, 2, 3, 4]}}))
+    assert LayoutCache(str(layouts_path)).get((3840, 2160)) is None
+
+
+def _real_ocr_binary(monkeypatch):
+    monkeypatch.delenv("FMNARRATIVE_OCR_BINARY", raising=False)
+    binary = fmn._find_ocr_binary()
+    if binary is None:
+        pytest.skip("OCR binary not built")
+    return binary
+
+
+def test_preprocessed_and_original_screenshots_give_the_same_match_stats(screenshots, tmp_path, monkeypatch):
+    _real_ocr_binary(monkeypatch)
+    monkeypatch.setattr(fmn, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(fmn, "_layout_cache", None)
+    for name, path in screenshots.items():
+        original = fmn._try_run_ocr(path)
+        if original is None:
+            pytest.skip("OCR binary cannot read screenshots here")
+        prepared = fmn._try_run_ocr(path, preprocess_image=True)
+        assert prepared is not None, name
+        assert (prepared["home_team"], prepared["away_team"]) == (original["home_team"], original["away_team"]), name
+        original_stats = fmn.MatchStats.from_ocr(original["stats"])
+        prepared_stats = fmn.MatchStats.from_ocr(prepared["stats"])
+        assert (prepared_stats.home, prepared_stats.away, prepared_stats.found) == \
+               (original_stats.home, original_stats.away, original_stats.found), name
@@ -0,0 +1,89 @@
+"""compile_prompt budgets and the order in which build_prompt's lines are dropped."""
+import main as fmn
+from prompt_compiler import PromptLine, PromptSection, approx_tokens, compile_prompt
+
+SYSTEM = "You are a football journalist."
+
+
+def _sections():
+    return [
+        PromptSection("MATCH:", [PromptLine("Match: Arsenal 2-1 Chelsea"), PromptLine("Setting: PREMIER LEAGUE")]),
+        PromptSection("STATS:", [
+            PromptLine("Expected Goals (xG): 1.8 vs 0.9", 85),
+            PromptLine("Corners: 7 vs 3", 35),
+            PromptLine("Offsides: 2 vs 1", 30),
+            PromptLine("Long Shots: 5 vs 6", 35),
+            PromptLine("Red Cards: 0 vs 0", 60, informative=False),
+        ]),
+        PromptSection("SEASON:", [PromptLine("Best xG of the season", 25)]),
+    ]
+
+
+def test_without_a_budget_only_uninformative_lines_go():
+    prompt = compile_prompt(SYSTEM, _sections())
+    assert prompt.dropped == ["Red Cards: 0 vs 0"]
+    assert "Corners: 7 vs 3" in prompt.user and "SEASON:" in prompt.user
+    assert prompt.tokens == approx_tokens(SYSTEM) + approx_tokens(prompt.user)
+    assert compile_prompt(SYSTEM, _sections(), compact=False).dropped == []
+
+
+def test_lowest_priority_and_later_lines_are_dropped_first():
+    prompt = compile_prompt(SYSTEM, _sections(), budget=1)
+    assert prompt.dropped == ["Red Cards: 0 vs 0", "Best xG of the season", "Offsides: 2 vs 1",
+                              "Long Shots: 5 vs 6", "Corners: 7 vs 3", "Expected Goals (xG): 1.8 vs 0.9"]
+    # A budget below the required lines keeps them anyway; emptied sections lose their header
+    assert prompt.user == "MATCH:\nMatch: Arsenal 2-1 Chelsea\nSetting: PREMIER LEAGUE\n"
+
+
+def test_budget_is_respected_whenever_the_required_lines_fit():
+    tightest = compile_prompt(SYSTEM, _sections(), budget=1)
+    order, required = tightest.dropped, tightest.tokens
+    full = compile_prompt(SYSTEM, _sections())
+    assert required < full.tokens
+    for budget in range(required, full.tokens + 2):
+        prompt = compile_prompt(SYSTEM, _sections(), budget=budget)
+        assert prompt.tokens <= budget
+        assert prompt.tokens == approx_tokens(SYSTEM) + approx_tokens(prompt.user)
+        # Tighter budgets only ever drop further along the same order
+        assert prompt.dropped == order[:len(prompt.dropped)]
+        assert prompt.full_tokens == full.full_tokens
+
+
+# Every stat FM shows, so nothing is left out as uninformative
+MATCH_STATS = {
+    "shots": ("14", "9"), "on target": ("6", "3"), "xg": ("1.84", "0.92"), "off target": ("8", "6"),
+    "clear cut chances": ("3", "1"), "long shots": ("5", "4"), "possession": ("58%", "42%"),
+    "corners": ("7", "3"), "fouls": ("11", "14"), "offsides": ("2", "1"), "passes completed": ("88%", "81%"),
+    "crosses completed": ("31%", "22%"), "tackles won": ("72%", "65%"), "headers won": ("55%", "45%"),
+    "yellow cards": ("2", "3"), "red cards": ("1", "0"), "average rating": ("7.1", "6.6"),
+    "progressive passes": ("41", "30"), "high intensity sprints": ("120", "98"),
+}
+
+
+def _match_prompt(budget):
+    context = {"setting": "Premier League", "home_or_away": "home", "importance": 7.0,
+               "home_goal_scorers": ["Saka", "Havertz"], "away_goal_scorers": ["Palmer"],
+               "history": ["Last 5: W W D L W"]}
+    return fmn.build_prompt("Arsenal", "Chelsea", 2, 1, MATCH_STATS, context, budget=budget)
+
+
+def test_build_prompt_keeps_to_the_budget_and_drops_minor_stats_first():
+    full = _match_prompt(None)
+    assert full.dropped == []
+    order = [text.split(":")[0] for text in _match_prompt(1).dropped]
+    assert order[:4] == ["Offsides", "Cross Completion", "Corners", "Long Shots"]
+    # Scorers and headline stats are the last to go
+    assert order[-3:] == ["Expected Goals (xG)", "Chelsea", "Arsenal"]
+
+    budget = full.tokens - 20
+    prompt = _match_prompt(budget)
+    assert prompt.tokens <= budget
+    assert 0 < len(prompt.dropped) < len(order)
+    assert [text.split(":")[0] for text in prompt.dropped] == order[:len(prompt.dropped)]
+    for kept in ("Total Shots", "Expected Goals (xG)", "Possession", "Saka, Havertz", "Last 5: W W D L W"):
+        assert kept in prompt.user
+
+
+def test_system_prompts_do_not_claim_missing_stats_were_zero():
+    for system in (fmn.SYSTEM_PROMPT, fmn.SESSION_PROMPT):
+        assert "left out for length" in system
@@ -0,0 +1,193 @@
+"""RateLimitedScheduler and TokenBucket on an injected clock."""
+import threading
+import time
+
+import pytest
+
+from scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimitedScheduler, TokenBucket
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.response = Response(headers or {})
+
+
+def _scheduler(clock, **limits):
+    """A scheduler on `clock`; limits that are not given are too high to matter."""
+    limits.setdefault("requests_per_minute", 60000)
+    limits.setdefault("tokens_per_minute", 6000000)
+    limits.setdefault("max_concurrency", 8)
+    return RateLimitedScheduler(clock=clock, **limits)
+
+
+def _try(scheduler, tokens=0, account=""):
+    """Take an admission without waiting; give the concurrency slot straight back."""
+    if scheduler.acquire(PRIORITY_BATCH, tokens, account, blocking=False):
+        scheduler.release()
+        return True
+    return False
+
+
+def test_token_bucket_refills_at_the_rate_that_keeps_any_minute_under_the_limit():
+    bucket = TokenBucket(600, burst=60, now=0.0)
+    assert bucket.rate == pytest.approx(9.0)
+    bucket.take(60, 0.0)
+    assert bucket.wait_time(9, 0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(9, 1.0) == 0
+    # Larger than the burst: waits for a full bucket
+    assert bucket.wait_time(500, 1.0) == pytest.approx(51 / 9)
+
+
+def test_each_account_has_its_own_request_bucket():
+    clock = Clock()
+    # 10 requests/minute: a burst of one, then one every 60 / 9 seconds
+    scheduler = _scheduler(clock, requests_per_minute=10)
+    assert _try(scheduler, account="a")
+    assert not _try(scheduler, account="a")
+    assert _try(scheduler, account="b")
+    clock.advance(60 / 9 - 0.01)
+    assert not _try(scheduler, account="a")
+    clock.advance(0.02)
+    assert _try(scheduler, account="a")
+
+
+def test_each_account_has_its_own_token_bucket():
+    clock = Clock()
+    scheduler = _scheduler(clock, tokens_per_minute=600)
+    assert _try(scheduler, tokens=50, account="a")
+    assert not _try(scheduler, tokens=30, account="a")
+    assert _try(scheduler, tokens=50, account="b")
+    clock.advance(20 / 9 - 0.01)
+    assert not _try(scheduler, tokens=30, account="a")
+    clock.advance(0.02)
+    assert _try(scheduler, tokens=30, account="a")
+
+
+def test_concurrency_slots_are_shared_by_every_account():
+    scheduler = _scheduler(Clock(), max_concurrency=1)
+    assert scheduler.acquire(account="a", blocking=False)
+    assert not scheduler.acquire(account="b", blocking=False)
+    scheduler.release()
+    assert scheduler.acquire(account="b", blocking=False)
+
+
+def test_settle_tokens_refunds_an_over_estimate():
+    scheduler = _scheduler(Clock(), tokens_per_minute=600)
+    assert _try(scheduler, tokens=50, account="a")
+    assert not _try(scheduler, tokens=30, account="a")
+    scheduler.settle_tokens(50, 10, "a")
+    assert _try(scheduler, tokens=30, account="a")
+
+
+def test_settle_tokens_charges_an_under_estimate():
+    clock = Clock()
+    scheduler = _scheduler(clock, tokens_per_minute=600)
+    assert _try(scheduler, tokens=10, account="a")
+    scheduler.settle_tokens(10, 50, "a")
+    # 60 - 50 tokens left, so 20 more need 10 / 9 seconds of refill
+    assert not _try(scheduler, tokens=20, account="a")
+    clock.advance(10 / 9 - 0.01)
+    assert not _try(scheduler, tokens=20, account="a")
+    clock.advance(0.02)
+    assert _try(scheduler, tokens=20, account="a")
+
+
+def test_429_pauses_the_account_for_the_retry_after():
+    clock = Clock()
+    scheduler = _scheduler(clock, tokens_per_minute=600)
+    assert scheduler.acquire(tokens=40, account="a", blocking=False)
+    scheduler.reject(RateLimited({"retry-after": "3"}), 40, "a")
+    scheduler.release()
+    assert scheduler.rate_limited == 1
+
+    # Refunded, but paused; other accounts carry on
+    assert not _try(scheduler, tokens=60, account="a")
+    assert _try(scheduler, account="b")
+    clock.advance(2.99)
+    assert not _try(scheduler, account="a")
+    clock.advance(0.02)
+    assert _try(scheduler, tokens=60, account="a")
+
+
+def test_429_without_retry_after_pauses_for_base_delay():
+    clock = Clock()
+    scheduler = _scheduler(clock, base_delay=0.5)
+    scheduler.reject(RateLimited(), 0, "a")
+    assert not _try(scheduler, account="a")
+    clock.advance(0.5)
+    assert _try(scheduler, account="a")
+
+
+def test_other_errors_refund_tokens_without_pausing():
+    clock = Clock()
+    scheduler = _scheduler(clock, tokens_per_minute=600)
+    assert _try(scheduler, tokens=60, account="a")
+    scheduler.reject(ValueError("bad request"), 60, "a")
+    assert scheduler.rate_limited == 0
+    assert _try(scheduler, tokens=60, account="a")
+
+
+def test_waiting_calls_are_admitted_by_priority_then_arrival():
+    scheduler = _scheduler(Clock(), max_concurrency=1)
+    assert scheduler.acquire(blocking=False)
+    order = []
+
+    def wait_for_slot(name, priority):
+        scheduler.acquire(priority)
+        order.append(name)
+        scheduler.release()
+
+    threads = []
+    for name, priority in (("batch-1", PRIORITY_BATCH), ("batch-2", PRIORITY_BATCH),
+                           ("interactive", PRIORITY_INTERACTIVE)):
+        thread = threading.Thread(target=wait_for_slot, args=(name, priority), daemon=True)
+        thread.start()
+        threads.append(thread)
+        deadline = time.monotonic() + 2
+        while len(scheduler._waiting) < len(threads):
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+
+    # A non-blocking call never jumps the queue
+    assert not scheduler.acquire(PRIORITY_INTERACTIVE, blocking=False)
+    scheduler.release()
+    for thread in threads:
+        thread.join(2)
+    assert order == ["interactive", "batch-1", "batch-2"]
+
+
+def test_call_retries_after_a_429_and_books_the_retry():
+    # Real time: the retry waits out the 1 ms pause
+    scheduler = RateLimitedScheduler(requests_per_minute=6000, base_delay=0.001)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RateLimited({"retry-after-ms": "1"})
+        return "ok"
+
+    retried = []
+    assert scheduler.call(flaky, tokens=10, account="a", on_retry=lambda e, delay: retried.append(delay)) == "ok"
+    assert len(calls) == 2 and len(retried) == 1
+    assert scheduler.retries == 1 and scheduler.rate_limited == 1
+    assert scheduler._inflight == 0
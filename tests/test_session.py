@@ -0,0 +1,79 @@
+"""PressConference turn logic with a fake completion function."""
+import threading
+
+from prompt_compiler import CompiledPrompt
+from session import FOLLOW_UP, NEW_TOPIC, PressConference
+
+
+class FakeReporter:
+    """Answers every request with a numbered question and remembers what it was sent."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def __call__(self, messages, profile, speculative):
+        with self.lock:
+            self.requests.append((messages, speculative))
+            return f"{len(self.requests)}. Question {len(self.requests)}?"
+
+    def last_live(self):
+        with self.lock:
+            return [messages for messages, speculative in self.requests if not speculative][-1]
+
+
+def _conference(max_turns=5):
+    prompt = CompiledPrompt("You are a reporter.", "MATCH: Arsenal 2-1 Chelsea\n", 10, 10, 5, [])
+    reporter = FakeReporter()
+    return PressConference(prompt, reporter, max_turns), reporter
+
+
+def test_short_answer_uses_the_prefetched_question():
+    conference, reporter = _conference()
+    question, turn = conference.next_question()
+    assert (question, turn.source) == ("Question 1?", "live")
+    conference.answer("No comment.")
+    question, turn = conference.next_question()
+    assert (question, turn.source, turn.kind) == ("Question 2?", "prefetch", "new topic")
+    assert reporter.requests[1][1] is True
+    conference.close()
+    assert conference.prefetch_wasted == 1
+
+
+def test_an_answer_drops_the_prefetch_asked_without_it():
+    conference, reporter = _conference()
+    conference.next_question()
+    prefetched = conference._prefetched
+    prefetched.result()
+    conference.answer("We pressed well early on.")
+    assert conference.prefetch_wasted == 1
+    assert conference._prefetched is None
+
+    question, turn = conference.next_question()
+    assert turn.source == "live" and turn.kind == "new topic"
+    messages = reporter.last_live()
+    assert "Manager: We pressed well early on." in messages[-1]["content"]
+    assert messages[-1]["content"].endswith(NEW_TOPIC)
+    conference.close()
+
+
+def test_a_long_answer_gets_a_live_follow_up_that_sees_it():
+    conference, reporter = _conference()
+    conference.next_question()
+    answer = "We changed shape at half time because their full backs kept getting forward down both flanks."
+    conference.answer(answer)
+    question, turn = conference.next_question()
+    assert turn.kind == "follow-up" and turn.source == "live"
+    messages = reporter.last_live()
+    assert answer in messages[-1]["content"] and messages[-1]["content"].endswith(FOLLOW_UP)
+    assert conference.prefetch_wasted == 1
+    conference.close()
+
+
+def test_no_prefetch_after_the_last_turn():
+    conference, reporter = _conference(max_turns=1)
+    conference.next_question()
+    assert conference._prefetched is None
+    conference.close()
+    assert conference.prefetch_wasted == 0
+    assert len(reporter.requests) == 1
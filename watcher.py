@@ -0,0 +1,260 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Last bytes of a completely written PNG (the IEND chunk and its CRC) and JPEG
+_PNG_TRAILER = b"IEND\xaeB`\x82"
+_JPEG_TRAILER = b"\xff\xd9"
+
+
+class _Inotify:
+    """Minimal inotify binding through libc; raises OSError where inotify is unavailable."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(_IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def read(self, timeout: float) -> Optional[Set[str]]:
+        """Names of files touched within `timeout` seconds; None if the kernel queue overflowed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names: Set[str] = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _scan(directory: str, extensions: Tuple[str, ...]) -> Dict[str, Tuple[int, int]]:
+    """(size, mtime_ns) of every image file directly in `directory`."""
+    found: Dict[str, Tuple[int, int]] = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return found
+    for entry in entries:
+        if entry.name.lower().endswith(extensions):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.is_file():
+                found[entry.name] = (st.st_size, st.st_mtime_ns)
+    return found
+
+
+def looks_complete(path: str) -> bool:
+    """
+    False while a PNG or JPEG is visibly still being written (its end marker is missing).
+    Other formats have no such marker and count as complete.
+    """
+    lower = path.lower()
+    if lower.endswith(".png"):
+        trailer = _PNG_TRAILER
+    elif lower.endswith((".jpg", ".jpeg")):
+        trailer = _JPEG_TRAILER
+    else:
+        return True
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size < len(trailer):
+                return False
+            # JPEG writers may pad after the EOI marker, so look at a small tail window
+            f.seek(max(0, size - 32))
+            tail = f.read()
+    except OSError:
+        return False
+    return tail.endswith(trailer) if trailer is _PNG_TRAILER else trailer in tail
+
+
+class DirectoryWatcher:
+    """
+    Reports image files in a directory once they have been completely written.
+    Uses inotify on Linux and falls back to polling the directory elsewhere (or with
+    force_polling). A file is reported only after its size and mtime have not changed
+    for `settle` seconds and, for PNG and JPEG, its end marker is present, so a
+    screenshot the game is still writing is never handed to OCR half-finished.
+    """
+
+    def __init__(self, directory: str, extensions: Tuple[str, ...], settle: float = 0.5,
+                 poll_interval: float = 1.0, force_polling: bool = False):
+        self.directory = directory
+        self.extensions = extensions
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self._inotify: Optional[_Inotify] = None
+        if not force_polling:
+            try:
+                self._inotify = _Inotify(directory)
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._known = _scan(directory, extensions)
+        # name -> (size, mtime_ns, monotonic time of the last change)
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def existing(self) -> List[str]:
+        """Paths of the images that were already in the directory when watching began."""
+        return sorted(os.path.join(self.directory, name) for name in self._known)
+
+    def _changed_names(self, timeout: float) -> Set[str]:
+        if self._inotify is not None:
+            names = self._inotify.read(timeout)
+            if names is not None:
+                return {name for name in names if name.lower().endswith(self.extensions)}
+            # Overflowed: some events were lost, rescan everything
+        else:
+            time.sleep(timeout)
+        current = _scan(self.directory, self.extensions)
+        changed = {name for name, sig in current.items() if self._known.get(name) != sig}
+        self._known = current
+        return changed
+
+    def _settled(self, now: float) -> List[str]:
+        ready = []
+        for name, (size, mtime_ns, changed_at) in list(self._pending.items()):
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._pending[name]  # deleted or renamed away before it settled
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self._pending[name] = (st.st_size, st.st_mtime_ns, now)
+            elif now - changed_at >= self.settle and st.st_size > 0 and looks_complete(path):
+                del self._pending[name]
+                ready.append(path)
+        return sorted(ready)
+
+    def poll(self) -> List[str]:
+        """
+        Wait up to one poll interval (less while files are settling) and return the
+        paths of files that finished being written since the last call.
+        """
+        timeout = min(self.poll_interval, self.settle / 2) if self._pending else self.poll_interval
+        changed = self._changed_names(timeout)
+        now = time.monotonic()
+        for name in changed:
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self._pending[name] = (st.st_size, st.st_mtime_ns, now)
+        return self._settled(now)
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class Manifest:
+    """
+    Persistent record of the screenshots the watcher has handled, keyed by absolute
+    path and stamped with the size and mtime seen, so a restart only picks up files
+    that are new or were overwritten since. Saved atomically after every change.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries: Dict[str, Dict[str, object]] = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def covers(self, directory: str) -> bool:
+        """True if any file in `directory` has been recorded, i.e. it was watched before."""
+        directory = os.path.abspath(directory)
+        with self._lock:
+            return any(os.path.dirname(path) == directory for path in self._entries)
+
+    def seen(self, path: str) -> bool:
+        """True if `path` was recorded and has not changed since."""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(path))
+        if entry is None:
+            return False
+        return self._signature(path) == (entry.get("size"), entry.get("mtime_ns"))
+
+    def record(self, paths: Sequence[str], status: str, **details: object) -> None:
+        """Mark `paths` as handled with `status` ("ok", "failed" or "baseline")."""
+        with self._lock:
+            for path in paths:
+                signature = self._signature(path)
+                if signature is None:
+                    continue
+                self._entries[os.path.abspath(path)] = {
+                    "size": signature[0], "mtime_ns": signature[1], "status": status,
+                    "processed_at": time.time(), **details,
+                }
+            self._save()
+
+    def latest(self) -> Optional[str]:
+        """Most recently processed screenshot that still exists, if any."""
+        with self._lock:
+            done = sorted(
+                ((entry["processed_at"], path) for path, entry in self._entries.items() if entry.get("status") == "ok"),
+                reverse=True,
+            )
+        return next((path for _, path in done if os.path.isfile(path)), None)
+
+    def _save(self) -> None:
+        # Forget files that no longer exist so the manifest does not grow forever
+        self._entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=1)
+        os.replace(tmp_path, self.path)